@@ -7,6 +7,7 @@ from .models import (
     SubCourseCategory,
 )
 from utilities.mixins import (
+    CompiledSerializerMixin,
     DynamicFieldsSerializerMixin,
 )
 
@@ -20,7 +21,7 @@ class ChangeCourseCategorySerializer(serializers.ModelSerializer):
         fields = ("id", "name", "is_deleted", "created_by", "updated_by", "created_at", "updated_at")
 
 
-class RetrieveCourseCategorySerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
+class RetrieveCourseCategorySerializer(CompiledSerializerMixin, DynamicFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer class for getting course category.
     """
@@ -43,7 +44,8 @@ class RetrieveCourseCategorySerializer(DynamicFieldsSerializerMixin, serializers
             category_name=F("category__name"),
             value=F("id")
         )
-        return RetrieveCourseSubCategorySerializer(sub_category, many=True, fields=self.context.get("sub_category", None)).data
+        return self.get_nested_serializer("sub_category", RetrieveCourseSubCategorySerializer, many=True,
+                                          fields=self.context.get("sub_category", None)).to_representation(sub_category)
 
     class Meta:
         model = CourseCategory
@@ -59,7 +61,7 @@ class ChangeCourseSubCategorySerializer(serializers.ModelSerializer):
         fields = ("id", "name", "category", "is_deleted", "created_by", "updated_by", "created_at", "updated_at")
 
 
-class RetrieveCourseSubCategorySerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
+class RetrieveCourseSubCategorySerializer(CompiledSerializerMixin, DynamicFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer class for getting course sub-category.
     """
@@ -0,0 +1,19 @@
+"""
+File for rendering the category tree again when categories or sub-categories change.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CourseCategory, SubCourseCategory
+from .tree import invalidate_category_tree
+
+
+@receiver(post_save, sender=CourseCategory)
+@receiver(post_delete, sender=CourseCategory)
+@receiver(post_save, sender=SubCourseCategory)
+@receiver(post_delete, sender=SubCourseCategory)
+def category_changed(sender, instance, **kwargs):
+    """
+    Function to render the category tree again after a category or sub-category changed.
+    """
+    invalidate_category_tree()
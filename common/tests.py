@@ -1,3 +1,228 @@
-from django.test import TestCase
+import itertools
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import reverse
+
+from common.models import CourseCategory, SubCourseCategory
+from courses.views import ChapterListAPIView
+from users.models import CustomUser
+from utilities.middleware import ReadReplicaMiddleware
+from utilities.pool import ConnectionPool, PoolTimeout, get_pool, pools
+from utilities.routers import Routing, checked_replicas, current_routing, is_replica_healthy
+from utilities.testing import QueryBudgetTestCase
+
+
+class CategoryQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Class for checking the category endpoints run as many queries whatever the number of categories.
+    """
+
+    def grow_categories(self, size):
+        """
+        Method to grow the categories to size, each with a sub category and a course.
+        """
+        for _number in range(CourseCategory.objects.count(), size):
+            self.category = CourseCategory.objects.create(name="Category", created_by=self.seller, updated_by=self.seller)
+            self.sub_category = SubCourseCategory.objects.create(
+                name="Sub category", category=self.category, created_by=self.seller, updated_by=self.seller,
+            )
+            self.add_courses(1)
+
+    def test_category_list(self):
+        self.assertQueriesDoNotGrow(reverse("get-course-category-list"), grow=self.grow_categories)
+
+    def test_sub_category_list(self):
+        self.assertQueriesDoNotGrow(reverse("get-course-sub-category-list"), grow=self.grow_categories)
+        self.assertQueriesDoNotGrow(
+            reverse("get-course-sub-category-list") + "?category={}".format(self.category.id), grow=self.grow_categories,
+        )
+
+
+@mock.patch("utilities.routers.get_replica_aliases", return_value=["replica"])
+class ReadReplicaRoutingTests(SimpleTestCase):
+    """
+    Class for checking reads go to a healthy replica unless the client wrote recently or the cache is not shared.
+    """
+
+    def setUp(self):
+        cache.clear()
+        checked_replicas.clear()
+        self.factory = RequestFactory()
+        self.view = ChapterListAPIView.as_view()
+        patcher = mock.patch("utilities.routers.is_cache_shared", return_value=True)
+        self.is_cache_shared = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("utilities.routers.connections")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handle(self, method="get", client="client", write=False):
+        """
+        Method to pass a request of a client through the middleware and get the alias its reads were sent to.
+        """
+        aliases = []
+
+        def get_response(request):
+            middleware.process_view(request, self.view, (), {})
+            routing = current_routing.get()
+            aliases.append(routing.get_read_alias())
+            if write:
+                routing.wrote = True
+            return HttpResponse()
+
+        middleware = ReadReplicaMiddleware(get_response)
+        middleware(getattr(self.factory, method)("/", HTTP_AUTHORIZATION="Bearer {}".format(client)))
+        return aliases[0]
+
+    def test_reads_from_replica(self, _get_replica_aliases):
+        self.assertEqual(self.handle(), "replica")
+        self.assertIsNone(self.handle(method="post"))
+
+    def test_sticks_after_write(self, _get_replica_aliases):
+        self.assertIsNone(self.handle(method="post"))
+        self.assertIsNone(self.handle())
+        self.assertEqual(self.handle(client="other"), "replica")
+
+    def test_sticks_after_write_on_safe_request(self, _get_replica_aliases):
+        self.assertEqual(self.handle(write=True), "replica")
+        self.assertIsNone(self.handle())
+
+    def test_primary_without_shared_cache(self, _get_replica_aliases):
+        self.is_cache_shared.return_value = False
+        self.assertIsNone(self.handle())
+
+    def test_write_in_request_moves_reads_to_primary(self, _get_replica_aliases):
+        routing = Routing("client")
+        routing.use_replica = True
+        self.assertEqual(routing.get_read_alias(), "replica")
+        routing.wrote = True
+        self.assertIsNone(routing.get_read_alias())
+
+    def test_unhealthy_replica(self, _get_replica_aliases):
+        request = self.factory.get("/")
+        request.routing = Routing("client")
+        request.routing.replica = "replica"
+        ReadReplicaMiddleware(None).process_exception(request, OperationalError())
+        self.assertFalse(is_replica_healthy("replica"))
+        checked_replicas.clear()
+        self.assertFalse(is_replica_healthy("replica"))
+        self.assertIsNone(self.handle())
+        routing = Routing("client")
+        routing.use_replica = True
+        routing.get_read_alias()
+        self.assertEqual(routing.replica, DEFAULT_DB_ALIAS)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """
+    Class for checking connections are checked out, released, recycled and dropped after a fork.
+    """
+
+    def setUp(self):
+        self.numbers = itertools.count(1)
+        self.closed = []
+
+    def get_pool(self, **options):
+        """
+        Method to get a pool of numbered fake connections recording the ones it closes.
+        """
+        options.setdefault("timeout", 0.05)
+        return ConnectionPool(connect=lambda: next(self.numbers), close=self.closed.append, **options)
+
+    def test_checkout_and_release(self):
+        pool = self.get_pool(min_size=1, max_size=2)
+        self.assertEqual(pool.acquire(), (1, False))
+        self.assertEqual(pool.acquire(), (2, True))
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(1)
+        self.assertEqual(pool.acquire(), (1, False))
+        stats = pool.get_stats()
+        self.assertEqual((stats["size"], stats["in_use"], stats["peak_in_use"], stats["timeouts"]), (2, 2, 2, 1))
+        self.assertEqual(self.closed, [])
+
+    def test_waits_for_release(self):
+        pool = self.get_pool(max_size=1, timeout=5)
+        connection, _is_new = pool.acquire()
+        releaser = threading.Timer(0.05, pool.release, (connection,))
+        releaser.start()
+        self.assertEqual(pool.acquire(), (connection, False))
+        releaser.join()
+        self.assertEqual(pool.get_stats()["waits"], 1)
+
+    def test_discard_and_lifetime(self):
+        pool = self.get_pool(max_size=2, max_lifetime=60)
+        first, _is_new = pool.acquire()
+        second, _is_new = pool.acquire()
+        pool.release(first, discard=True)
+        pool.in_use[id(second)].created_at -= 60
+        pool.release(second)
+        self.assertEqual(self.closed, [first, second])
+        self.assertEqual(pool.get_stats()["size"], 0)
+
+    def test_failed_check_and_idle(self):
+        failing = set()
+
+        def check(connection):
+            if connection in failing:
+                raise OSError("gone")
+
+        pool = self.get_pool(check=check, check_interval=0, max_idle=60)
+        first, _is_new = pool.acquire()
+        pool.release(first)
+        failing.add(first)
+        self.assertEqual(pool.acquire(), (2, True))
+        self.assertEqual(self.closed, [first])
+        pool.release(2)
+        pool.idle[0].last_used -= 60
+        self.assertEqual(pool.acquire(), (3, True))
+        self.assertEqual(self.closed, [first, 2])
+
+    def test_fork(self):
+        pool = self.get_pool(min_size=1)
+        parent_connection, _is_new = pool.acquire()
+        with mock.patch("utilities.pool.os.getpid", return_value=pool.pid + 1):
+            pool.release(parent_connection)
+            self.assertEqual(pool.acquire(), (2, False))
+            self.assertEqual(pool.get_stats()["size"], 1)
+        self.assertIn(parent_connection, pool.inherited)
+        self.assertEqual(self.closed, [])
+
+    def test_pool_by_connection_parameters(self):
+        self.addCleanup(pools.pop, "pool-test", None)
+        first = get_pool("pool-test", {"NAME": "first"}, self.get_pool)
+        self.assertIs(get_pool("pool-test", {"NAME": "first"}, self.get_pool), first)
+        idle, _is_new = first.acquire()
+        in_use, _is_new = first.acquire()
+        first.release(idle)
+        second = get_pool("pool-test", {"NAME": "second"}, self.get_pool)
+        self.assertIsNot(second, first)
+        self.assertEqual(self.closed, [idle])
+        first.release(in_use)
+        self.assertEqual(self.closed, [idle, in_use])
+
+
+class ProcessStatsTests(QueryBudgetTestCase):
+    """
+    Class for checking the counters of the process are only shown to staff users.
+    """
+
+    def test_staff_only(self):
+        self.addCleanup(pools.pop, "pool-test", None)
+        get_pool("pool-test", {"NAME": "stats"}, lambda: ConnectionPool(connect=object))
+        staff = self.create_user("staff@example.com", self.buyer_role)
+        CustomUser.objects.filter(id=staff.id).update(is_staff=True)
+        response, record = self.request(reverse("get-process-stats"), token=self.get_token(staff))
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinBudget(response, record)
+        data = response.json()["data"]
+        self.assertEqual(data["pools"]["pool-test"]["max_size"], 10)
+        self.assertEqual(data["queries"]["GetProcessStatsAPIView"]["over_budget"], 0)
+        self.assertGreaterEqual(data["queries"]["GetProcessStatsAPIView"]["requests"], 1)
+        response, _record = self.request(reverse("get-process-stats"), token=self.get_token(self.buyer))
+        self.assertEqual(response.status_code, 403)
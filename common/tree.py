@@ -0,0 +1,165 @@
+"""
+File for the in-process tree of course categories, their sub-categories and published course counts.
+"""
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from courses.models import Courses
+from .models import CourseCategory, SubCourseCategory
+from .serializers import RetrieveCourseCategorySerializer, RetrieveCourseSubCategorySerializer
+from utilities.cache import bound_staleness, bump_cache_version, get_cache_version
+
+
+def select_fields(row, fields):
+    """
+    Function to get a copy of a serialized row with only the given fields, like DynamicFieldsSerializerMixin.
+    """
+    return {field_name: value for field_name, value in row.items() if field_name in fields}
+
+
+class CategoryTree(object):
+    """
+    Class for serving the serialized category and sub-category lists without a query.
+
+    The lists are rendered once per process with the serializers of the list
+    views and rendered again when the shared version is bumped after a category,
+    a sub-category or the status or category of a course changed, or every
+    refresh_interval seconds in case a change was missed. The rows are shared by
+    every request and must not be modified.
+    """
+    version_name = "category_tree"
+    refresh_interval = 60
+    miss_reload_interval = 1
+
+    def __init__(self):
+        """
+        Constructor function for setting up an empty tree.
+        """
+        self.lock = threading.Lock()
+        self.version = None
+        self.loaded_at = 0
+        self.categories = []
+        self.sub_categories = []
+        self.category_ids = frozenset()
+
+    def load(self):
+        """
+        Method to render every category with its sub-categories and published course count, in three queries.
+        """
+        version = get_cache_version(self.version_name)
+        sub_categories = RetrieveCourseSubCategorySerializer(
+            SubCourseCategory.objects.annotate(category_name=F("category__name"), value=F("id")).order_by("name"),
+            many=True,
+        ).data
+        course_counts = dict(
+            Courses.objects.filter(course_status="PUBLISHED").order_by().values("category").annotate(
+                count=Count("id")
+            ).values_list("category", "count")
+        )
+
+        sub_categories_by_category = {}
+        for sub_category in sorted(sub_categories, key=lambda row: row["id"]):
+            sub_categories_by_category.setdefault(sub_category["category"], []).append(sub_category)
+
+        computed_fields = ("sub_category", "available_course_count")
+        field_names = list(RetrieveCourseCategorySerializer().fields)
+        categories = []
+        for category in RetrieveCourseCategorySerializer(
+            CourseCategory.objects.annotate(value=F("id")).order_by("name"), many=True,
+            fields=[field_name for field_name in field_names if field_name not in computed_fields],
+        ).data:
+            computed = {
+                "sub_category": sub_categories_by_category.get(category["id"], []),
+                "available_course_count": course_counts.get(category["id"], 0),
+            }
+            categories.append({
+                field_name: computed[field_name] if field_name in computed else category[field_name]
+                for field_name in field_names
+            })
+
+        self.categories = categories
+        self.sub_categories = list(sub_categories)
+        self.category_ids = frozenset(category["id"] for category in categories)
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """
+        Method to render the tree again when it was changed in this or another process or it is due.
+        """
+        if not self.is_stale():
+            return
+        with self.lock:
+            if self.is_stale():
+                self.load()
+
+    def is_stale(self):
+        """
+        Method to tell if the tree was changed in this or another process or is due for a reload.
+        """
+        return (
+            self.version != get_cache_version(self.version_name)
+            or time.monotonic() - self.loaded_at >= bound_staleness(self.refresh_interval)
+        )
+
+    def invalidate(self):
+        """
+        Method to render the tree again in this and every other process on their next lookup.
+        """
+        self.version = None
+        bump_cache_version(self.version_name)
+
+    def has_category(self, category_id):
+        """
+        Method to check if a category exists, reloading at most once a second when another process may have created it.
+        """
+        self.ensure_fresh()
+        if category_id not in self.category_ids:
+            with self.lock:
+                if time.monotonic() - self.loaded_at >= self.miss_reload_interval:
+                    self.load()
+        return category_id in self.category_ids
+
+    def get_categories(self, fields=None, sub_category_fields=None):
+        """
+        Method to get the serialized categories with only the requested fields and sub-category fields.
+        """
+        self.ensure_fresh()
+        if fields is None and sub_category_fields is None:
+            return self.categories
+
+        categories = []
+        for category in self.categories:
+            row = dict(category) if fields is None else select_fields(category, fields)
+            if sub_category_fields is not None and "sub_category" in row:
+                row["sub_category"] = [
+                    select_fields(sub_category, sub_category_fields) for sub_category in row["sub_category"]
+                ]
+            categories.append(row)
+        return categories
+
+    def get_sub_categories(self, fields=None, category_id=None):
+        """
+        Method to get the serialized sub-categories, of one category when given, with only the requested fields.
+        """
+        self.ensure_fresh()
+        sub_categories = self.sub_categories
+        if category_id is not None:
+            sub_categories = [sub_category for sub_category in sub_categories if sub_category["category"] == category_id]
+        if fields is not None:
+            sub_categories = [select_fields(sub_category, fields) for sub_category in sub_categories]
+        return sub_categories
+
+
+category_tree = CategoryTree()
+
+
+def invalidate_category_tree():
+    """
+    Function to render the category tree again, now and once the transaction commits.
+    """
+    category_tree.invalidate()
+    transaction.on_commit(category_tree.invalidate)
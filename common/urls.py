@@ -3,10 +3,12 @@ from django.urls import path
 from .views import (
     GetCourseCategoryListAPIView,
     GetCourseSubCategoryListAPIView,
+    GetProcessStatsAPIView,
 )
 
 
 urlpatterns = [
     path("getCourseCategoryList", GetCourseCategoryListAPIView.as_view(), name="get-course-category-list"),
     path("getCourseSubCategoryList", GetCourseSubCategoryListAPIView.as_view(), name="get-course-sub-category-list"),
+    path("getProcessStats", GetProcessStatsAPIView.as_view(), name="get-process-stats"),
 ]
@@ -1,14 +1,23 @@
+import os
+
 from django.db.models import F
 from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import status
 from rest_framework.generics import ListAPIView
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from common.models import CourseCategory, SubCourseCategory
 from common.serializers import RetrieveCourseCategorySerializer, RetrieveCourseSubCategorySerializer
+from common.tree import category_tree
 from utilities import messages
+from utilities.authentication import CachedJWTAuthentication
 from utilities.mixins import DynamicFieldsViewMixin
+from utilities.permissions import IsTokenValid
+from utilities.pool import get_pool_stats
+from utilities.queries import query_stats
 from utilities.utils import ResponseInfo
 
 
@@ -18,6 +27,7 @@ class GetCourseCategoryListAPIView(DynamicFieldsViewMixin, ListAPIView):
     """
     permission_classes = ()
     authentication_classes = ()
+    use_read_replica = True
     serializer_class = RetrieveCourseCategorySerializer
 
     def __init__(self, **kwargs):
@@ -40,9 +50,9 @@ class GetCourseCategoryListAPIView(DynamicFieldsViewMixin, ListAPIView):
         """
         GET Method for getting course Category list.
         """
-        category_serializer = super().list(request, *args, **kwargs)
-
-        self.response_format["data"] = category_serializer.data
+        self.response_format["data"] = category_tree.get_categories(
+            self.get_requested_fields(), self.get_nested_fields().get("sub_category", None)
+        )
         self.response_format["error"] = None
         self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
         self.response_format["message"] = [messages.SUCCESS]
@@ -55,6 +65,7 @@ class GetCourseSubCategoryListAPIView(DynamicFieldsViewMixin, ListAPIView):
     """
     permission_classes = ()
     authentication_classes = ()
+    use_read_replica = True
     serializer_class = RetrieveCourseSubCategorySerializer
     filter_backends = (DjangoFilterBackend, )
     filterset_fields = ("category",)
@@ -76,13 +87,64 @@ class GetCourseSubCategoryListAPIView(DynamicFieldsViewMixin, ListAPIView):
             value=F("id"),
         ).order_by("name")
 
+    def get_tree_sub_categories(self):
+        """
+        Method to get the sub-categories from the category tree, None when the category filter is not a known category.
+        """
+        category = self.request.query_params.get("category", "")
+        category_id = None
+        if category:
+            try:
+                category_id = int(category)
+            except ValueError:
+                return None
+            if not category_tree.has_category(category_id):
+                return None
+        return category_tree.get_sub_categories(self.get_requested_fields(), category_id)
+
     def get(self, request, *args, **kwargs):
         """
         GET Method for getting course sub-Category list.
         """
-        category_serializer = super().list(request, *args, **kwargs)
+        sub_categories = self.get_tree_sub_categories()
+        if sub_categories is None:
+            # let the filter backend answer for filters the tree cannot check.
+            sub_categories = super().list(request, *args, **kwargs).data
+
+        self.response_format["data"] = sub_categories
+        self.response_format["error"] = None
+        self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
+        self.response_format["message"] = [messages.SUCCESS]
+        return Response(self.response_format, status=self.status_code)
+
+
+class GetProcessStatsAPIView(APIView):
+    """
+    Class for creating api for getting the counters of the process serving the request, for staff users.
 
-        self.response_format["data"] = category_serializer.data
+    Every worker process keeps its own counters, so the pid tells the responses
+    of different workers apart.
+    """
+    permission_classes = (IsAuthenticated, IsTokenValid, IsAdminUser)
+    authentication_classes = (CachedJWTAuthentication,)
+
+    def __init__(self, **kwargs):
+        """
+         Constructor function for formatting the web response to return.
+        """
+        self.status_code = status.HTTP_200_OK
+        self.response_format = ResponseInfo().response
+        super(GetProcessStatsAPIView, self).__init__(**kwargs)
+
+    def get(self, request, *args, **kwargs):
+        """
+        GET Method for getting the connection pool and query counters of the process.
+        """
+        self.response_format["data"] = {
+            "pid": os.getpid(),
+            "pools": get_pool_stats(),
+            "queries": query_stats.get(),
+        }
         self.response_format["error"] = None
         self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
         self.response_format["message"] = [messages.SUCCESS]
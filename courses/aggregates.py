@@ -0,0 +1,136 @@
+"""
+File for maintaining the aggregate columns stored on courses and seller profiles.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import Courses, CourseChapter, CourseLesson, CourseRatings, EnrolledCourses
+from users.models import SellerProfile
+
+
+def apply_rating_change(course_id, rating, sign):
+    """
+    Function to add (sign 1) or remove (sign -1) one rating from the aggregates of a course.
+
+    The update is a single statement of F() expressions so concurrent ratings never
+    lose each other. The average comes first in the SET clause and is computed from
+    the old values, because MySQL evaluates assignments left to right.
+    """
+    values = {
+        "rating": Coalesce(
+            Cast(F("rating_sum") + sign * rating, FloatField()) / NullIf(F("rating_count") + sign, Value(0)),
+            Value(0.0), output_field=FloatField(),
+        ),
+        "rating_count": F("rating_count") + sign,
+        "rating_sum": F("rating_sum") + sign * rating,
+    }
+    star_field = Courses.rating_star_fields.get(rating)
+    if star_field:
+        values[star_field] = F(star_field) + sign
+    Courses.objects.filter(id=course_id).update(**values)
+
+
+def refresh_rating_aggregates(course_ids=None):
+    """
+    Function to recompute the rating aggregates of the given courses, or of all courses, from their ratings.
+    """
+    courses = Courses.objects.all() if course_ids is None else Courses.objects.filter(id__in=course_ids)
+    ratings = CourseRatings.objects.filter(course__in=courses.values("id")).order_by().values(
+        "course", "rating"
+    ).annotate(count=Count("id"))
+
+    stars = defaultdict(dict)
+    for row in ratings:
+        stars[row["course"]][row["rating"]] = row["count"]
+
+    update_courses = []
+    for course in courses.only("id"):
+        course_stars = stars.get(course.id, {})
+        course.rating_count = sum(course_stars.values())
+        course.rating_sum = sum(rating * count for rating, count in course_stars.items())
+        course.rating = course.rating_sum / course.rating_count if course.rating_count else 0
+        for rating, field in Courses.rating_star_fields.items():
+            setattr(course, field, course_stars.get(rating, 0))
+        update_courses.append(course)
+    # only the rating columns were computed, the deferred structure columns must neither be loaded nor written back.
+    Courses.objects.bulk_update(
+        update_courses, ("rating", "rating_count", "rating_sum", *Courses.rating_star_fields.values()), batch_size=500,
+    )
+
+
+def refresh_structure_summary(chapter_ids=(), course_ids=()):
+    """
+    Function to recompute the duration and lesson counts of chapters and the duration, chapter and lesson counts of courses.
+
+    Each level is refreshed by one UPDATE with correlated subqueries, so the
+    summary never depends on values read into Python.
+    """
+    if chapter_ids:
+        lessons = CourseLesson.objects.filter(chapter=OuterRef("id")).order_by().values("chapter")
+        CourseChapter.objects.filter(id__in=chapter_ids).update(
+            duration=Subquery(lessons.annotate(total=Sum("duration")).values("total")[:1]),
+            lessons_count=Coalesce(Subquery(lessons.annotate(count=Count("id")).values("count")[:1]), 0),
+        )
+
+    if course_ids:
+        lessons = CourseLesson.objects.filter(chapter__course=OuterRef("id")).order_by().values("chapter__course")
+        chapters = CourseChapter.objects.filter(course=OuterRef("id")).order_by().values("course")
+        Courses.objects.filter(id__in=course_ids).update(
+            duration=Subquery(lessons.annotate(total=Sum("duration")).values("total")[:1]),
+            lessons_count=Coalesce(Subquery(lessons.annotate(count=Count("id")).values("count")[:1]), 0),
+            chapters_count=Coalesce(Subquery(chapters.annotate(count=Count("id")).values("count")[:1]), 0),
+        )
+
+
+def get_course_seller_profiles(course_id, published=False):
+    """
+    Function to get the seller profiles of the seller of a course, only while it is published when asked.
+    """
+    courses = Courses.objects.filter(id=course_id)
+    if published:
+        courses = courses.filter(course_status="PUBLISHED")
+    return SellerProfile.objects.filter(user__in=courses.values("seller"))
+
+
+def apply_seller_rating_change(course_id, rating, sign):
+    """
+    Function to add (sign 1) or remove (sign -1) one rating of a published course from the statistics of its seller.
+    """
+    get_course_seller_profiles(course_id, published=True).update(
+        rating=Coalesce(
+            Cast(F("rating_sum") + sign * rating, FloatField()) / NullIf(F("rating_count") + sign, Value(0)),
+            Value(0.0), output_field=FloatField(),
+        ),
+        rating_count=F("rating_count") + sign,
+        rating_sum=F("rating_sum") + sign * rating,
+    )
+
+
+def apply_seller_enrollment_change(course_id, sign):
+    """
+    Function to add (sign 1) or remove (sign -1) one enrolled student from the statistics of the seller of a course.
+    """
+    get_course_seller_profiles(course_id).update(student_count=F("student_count") + sign)
+
+
+def refresh_seller_statistics(seller_ids=None):
+    """
+    Function to recompute the rating, student and published course statistics of the given sellers, or of all sellers.
+    """
+    profiles = SellerProfile.objects.all() if seller_ids is None else SellerProfile.objects.filter(user__in=seller_ids)
+    courses = Courses.objects.filter(seller=OuterRef("user"), course_status="PUBLISHED").order_by().values("seller")
+    students = EnrolledCourses.objects.filter(course__seller=OuterRef("user")).order_by().values("course__seller")
+    profiles.update(
+        rating_sum=Coalesce(Subquery(courses.annotate(total=Sum("rating_sum")).values("total")[:1]), 0),
+        rating_count=Coalesce(Subquery(courses.annotate(total=Sum("rating_count")).values("total")[:1]), 0),
+        courses_count=Coalesce(Subquery(courses.annotate(count=Count("id")).values("count")[:1]), 0),
+        student_count=Coalesce(Subquery(students.annotate(count=Count("id")).values("count")[:1]), 0),
+    )
+    profiles.update(
+        rating=Coalesce(
+            Cast(F("rating_sum"), FloatField()) / NullIf(F("rating_count"), Value(0)),
+            Value(0.0), output_field=FloatField(),
+        ),
+    )
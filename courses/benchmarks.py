@@ -0,0 +1,489 @@
+"""
+File for generating a synthetic catalog and benchmarking the API endpoints against it in-process.
+"""
+import json
+import math
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from .aggregates import refresh_rating_aggregates, refresh_seller_statistics, refresh_structure_summary
+from .index import course_index
+from .models import Courses, CourseChapter, CourseLesson, CourseRatings, EnrolledCourses
+from common.models import CourseCategory, SubCourseCategory
+from common.tree import invalidate_category_tree
+from users.models import CustomUser, RolesPermission, SellerProfile
+from users.storefront import invalidate_seller_storefront
+from utilities.queries import record_queries
+from utilities.utils import get_tokens_for_user
+
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+
+def get_seller_email(number):
+    """
+    Function to get the email of a generated seller.
+    """
+    return "benchmark-seller-{}@example.com".format(number)
+
+
+def get_buyer_email(number):
+    """
+    Function to get the email of a generated buyer.
+    """
+    return "benchmark-buyer-{}@example.com".format(number)
+
+
+class CatalogGenerator(object):
+    """
+    Class for generating the same synthetic catalog for a scale and seed with bulk inserts.
+
+    Every row is built from a random generator seeded with seed, so two runs at
+    the same scale produce the same catalog. As bulk_create sends no signals, the
+    aggregates of courses, chapters and sellers are recomputed at the end and the
+    in-process caches depending on them are invalidated.
+    """
+    # rows generated at scale 1, sellers, buyers and categories grow with the scale.
+    sellers = 20
+    buyers = 100
+    categories = 5
+    sub_categories_per_category = 3
+    courses_per_seller = 10
+    chapters_per_course = 4
+    lessons_per_chapter = 5
+    enrollments_per_buyer = 5
+    ratings_per_buyer = 3
+
+    def __init__(self, scale=1, seed=0, batch_size=1000):
+        """
+        Constructor function for setting the scale, seed and insert batch size of the catalog.
+        """
+        self.scale = scale
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+
+    def get_count(self, count):
+        """
+        Method to get the number of rows generated at the scale of the catalog.
+        """
+        return max(int(count * self.scale), 1)
+
+    def is_generated(self):
+        """
+        Method to check if the catalog was already generated in the database.
+        """
+        return CustomUser.objects.filter(email=get_seller_email(0)).exists()
+
+    def get_role(self, role_name, role_type):
+        """
+        Method to get a role of a role type, created when there is none.
+        """
+        role, _created = RolesPermission.objects.get_or_create(role_name=role_name, defaults={"role_type": [role_type]})
+        return role
+
+    def create_users(self, emails, role, password):
+        """
+        Method to insert users with the given emails and get their ids by email.
+        """
+        now = timezone.now()
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                email=email, first_name="Benchmark", last_name="User{}".format(number), password=password,
+                status="ACTIVE", role_permission=role, date_joined=now,
+            )
+            for number, email in enumerate(emails)
+        ], batch_size=self.batch_size)
+        # bulk_create does not set primary keys on MySQL, so they are read back by the unique emails.
+        user_ids = dict(CustomUser.objects.filter(email__in=emails).values_list("email", "id"))
+        return [user_ids[email] for email in emails]
+
+    def create_categories(self, admin_id):
+        """
+        Method to insert the categories with their sub categories and get the sub category ids by category id.
+        """
+        sub_categories = {}
+        for number in range(self.get_count(self.categories)):
+            category = CourseCategory.objects.create(
+                name="Category {}".format(number), created_by_id=admin_id, updated_by_id=admin_id,
+            )
+            sub_categories[category.id] = [
+                SubCourseCategory.objects.create(
+                    name="Sub category {}.{}".format(number, sub_number), category=category,
+                    created_by_id=admin_id, updated_by_id=admin_id,
+                ).id
+                for sub_number in range(self.sub_categories_per_category)
+            ]
+        return sub_categories
+
+    def create_courses(self, seller_ids, sub_categories):
+        """
+        Method to insert the courses of every seller and get the ids of the courses and of the published ones.
+        """
+        statuses = ["PUBLISHED"] * 8 + ["DRAFT", "UN_PUBLISHED"]
+        category_ids = sorted(sub_categories)
+        courses = []
+        for seller_id in seller_ids:
+            for number in range(self.courses_per_seller):
+                category_id = self.random.choice(category_ids)
+                courses.append(Courses(
+                    slug_name="benchmark-course-{}-{}".format(seller_id, number),
+                    title="Benchmark course {} of seller {}".format(number, seller_id),
+                    seller_id=seller_id,
+                    category_id=category_id,
+                    sub_category_id=self.random.choice(sub_categories[category_id]),
+                    course_status=self.random.choice(statuses),
+                    sale_price=self.random.randint(5, 200),
+                    created_by_id=seller_id,
+                    updated_by_id=seller_id,
+                ))
+        Courses.objects.bulk_create(courses, batch_size=self.batch_size)
+        rows = Courses.objects.filter(slug_name__in=[course.slug_name for course in courses]).values_list(
+            "id", "seller", "course_status"
+        ).order_by("id")
+        course_ids, published_ids, course_sellers = [], [], {}
+        for course_id, seller_id, course_status in rows:
+            course_ids.append(course_id)
+            course_sellers[course_id] = seller_id
+            if course_status == "PUBLISHED":
+                published_ids.append(course_id)
+        return course_ids, published_ids, course_sellers
+
+    def create_structure(self, course_sellers):
+        """
+        Method to insert the chapters and lessons of every course and get the chapter ids.
+        """
+        CourseChapter.objects.bulk_create([
+            CourseChapter(
+                title="Chapter {}".format(order_no), course_id=course_id, order_no=order_no,
+                created_by_id=seller_id, updated_by_id=seller_id,
+            )
+            for course_id, seller_id in course_sellers.items()
+            for order_no in range(self.chapters_per_course)
+        ], batch_size=self.batch_size)
+
+        chapter_ids = []
+        lessons = []
+        for chapter_id, course_id in CourseChapter.objects.filter(course__in=course_sellers).values_list(
+            "id", "course"
+        ).order_by("id"):
+            chapter_ids.append(chapter_id)
+            seller_id = course_sellers[course_id]
+            lessons.extend(
+                CourseLesson(
+                    chapter_id=chapter_id, title="Lesson {}".format(order_no),
+                    video="benchmark/{}/{}/{}.mp4".format(course_id, chapter_id, order_no), order_no=order_no,
+                    duration=timedelta(seconds=self.random.randint(60, 1800)),
+                    created_by_id=seller_id, updated_by_id=seller_id,
+                )
+                for order_no in range(self.lessons_per_chapter)
+            )
+            if len(lessons) >= self.batch_size:
+                CourseLesson.objects.bulk_create(lessons, batch_size=self.batch_size)
+                lessons = []
+        CourseLesson.objects.bulk_create(lessons, batch_size=self.batch_size)
+        return chapter_ids
+
+    def create_enrollments(self, buyer_ids, published_ids):
+        """
+        Method to insert the enrollments of every buyer in published courses and ratings of some of them.
+        """
+        enrollments = []
+        ratings = []
+        for buyer_id in buyer_ids:
+            course_ids = self.random.sample(published_ids, min(self.enrollments_per_buyer, len(published_ids)))
+            for position, course_id in enumerate(course_ids):
+                enrollments.append(EnrolledCourses(
+                    course_id=course_id, user_id=buyer_id, created_by_id=buyer_id, updated_by_id=buyer_id,
+                ))
+                if position < self.ratings_per_buyer:
+                    ratings.append(CourseRatings(
+                        course_id=course_id, user_id=buyer_id, rating=self.random.randint(1, 5),
+                        title="Rating of buyer {}".format(buyer_id), created_by_id=buyer_id, updated_by_id=buyer_id,
+                    ))
+        EnrolledCourses.objects.bulk_create(enrollments, batch_size=self.batch_size)
+        CourseRatings.objects.bulk_create(ratings, batch_size=self.batch_size)
+
+    def run(self):
+        """
+        Method to generate the catalog in one transaction and get the number of rows of every model.
+        """
+        password = make_password(BENCHMARK_PASSWORD)
+        with transaction.atomic():
+            seller_role = self.get_role("Seller", "SELLER")
+            buyer_role = self.get_role("Buyer", "BUYER")
+            seller_ids = self.create_users(
+                [get_seller_email(number) for number in range(self.get_count(self.sellers))], seller_role, password,
+            )
+            buyer_ids = self.create_users(
+                [get_buyer_email(number) for number in range(self.get_count(self.buyers))], buyer_role, password,
+            )
+            SellerProfile.objects.bulk_create([
+                SellerProfile(
+                    user_id=seller_id, slug_name="benchmark-seller-{}".format(number), designation="Teacher",
+                    created_by_id=seller_id, updated_by_id=seller_id,
+                )
+                for number, seller_id in enumerate(seller_ids)
+            ], batch_size=self.batch_size)
+
+            sub_categories = self.create_categories(seller_ids[0])
+            course_ids, published_ids, course_sellers = self.create_courses(seller_ids, sub_categories)
+            chapter_ids = self.create_structure(course_sellers)
+            self.create_enrollments(buyer_ids, published_ids)
+
+            refresh_structure_summary(chapter_ids=chapter_ids, course_ids=course_ids)
+            refresh_rating_aggregates(course_ids)
+            refresh_seller_statistics(seller_ids)
+            invalidate_seller_storefront(*seller_ids)
+            invalidate_category_tree()
+            transaction.on_commit(lambda: course_index.refresh_courses(course_ids))
+        return self.get_counts()
+
+    def get_counts(self):
+        """
+        Method to get the number of rows of every model of the catalog.
+        """
+        return {
+            model.__name__: model.objects.count()
+            for model in (
+                CustomUser, SellerProfile, CourseCategory, SubCourseCategory, Courses, CourseChapter, CourseLesson,
+                CourseRatings, EnrolledCourses,
+            )
+        }
+
+
+def get_percentile(sorted_values, percentile):
+    """
+    Function to get the nearest rank percentile of sorted values.
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(percentile / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def get_routes(prefixes):
+    """
+    Function to get the URL patterns included under the given prefixes, with the prefix they were included at.
+    """
+    routes = []
+    for resolver in get_resolver().url_patterns:
+        prefix = str(resolver.pattern)
+        if isinstance(resolver, URLResolver) and prefix in prefixes:
+            routes.extend((prefix, pattern) for pattern in resolver.url_patterns if isinstance(pattern, URLPattern))
+    return routes
+
+
+class EndpointBenchmark(object):
+    """
+    Class for timing the requests of every route under the benchmarked prefixes through the full middleware stack.
+
+    Every scenario is requested warmup times, then timed for requests requests
+    with the queries of each recorded, then requested memory_requests more times
+    under tracemalloc for its peak allocation, as tracing slows requests down.
+    A scenario failing its first request is reported with its status and not timed.
+    """
+    prefixes = ("api/courses/", "api/users/", "api/common/")
+
+    # requests made for each route by URL name, routes not listed are requested once with GET.
+    scenarios = {
+        "list-course": [
+            {}, {"query": "pagination=true&page_size=20"}, {"query": "pagination=cursor&page_size=20"},
+        ],
+        "list-seller-course": [
+            {}, {"query": "pagination=true&page_size=20"}, {"query": "pagination=true&page_size=20", "user": "buyer"},
+        ],
+        "chapterL-lst": [
+            {"query": "pagination=true&page_size=20"}, {"query": "stream=true"},
+            {"query": "pagination=true&page_size=20", "user": "buyer"},
+        ],
+        "lesson-list": [
+            {"query": "pagination=true&page_size=20"}, {"query": "pagination=true&page_size=100"},
+        ],
+        "login": [
+            {"method": "post", "data": {"email": get_buyer_email(0), "password": BENCHMARK_PASSWORD, "role": "USER"}},
+        ],
+        "get-seller-list": [
+            {}, {"query": "pagination=true&page_size=20"},
+        ],
+        "get-seller-details": [
+            {"kwargs": {"slug": "benchmark-seller-0"}}, {"kwargs": {"slug": "benchmark-seller-0"}, "user": "buyer"},
+        ],
+    }
+
+    def __init__(self, requests=100, warmup=5, memory_requests=5):
+        """
+        Constructor function for setting how many times every scenario is requested.
+        """
+        self.requests = requests
+        self.warmup = warmup
+        self.memory_requests = memory_requests
+        self.tokens = {}
+
+    def get_token(self, user):
+        """
+        Method to get an access token of a generated user.
+        """
+        if user not in self.tokens:
+            email = get_buyer_email(0) if user == "buyer" else get_seller_email(0)
+            self.tokens[user] = get_tokens_for_user(CustomUser.objects.get(email=email))["access"]
+        return self.tokens[user]
+
+    def get_scenarios(self):
+        """
+        Method to get the name, method, path, body and user of every scenario, and the routes which cannot be requested.
+        """
+        scenarios = []
+        skipped = []
+        for prefix, pattern in get_routes(self.prefixes):
+            route_scenarios = self.scenarios.get(pattern.name)
+            if route_scenarios is None:
+                if pattern.pattern.converters:
+                    skipped.append(prefix + str(pattern.pattern))
+                    continue
+                route_scenarios = [{}]
+            for scenario in route_scenarios:
+                path = reverse(pattern.name, kwargs=scenario.get("kwargs"))
+                if scenario.get("query"):
+                    path = "{}?{}".format(path, scenario["query"])
+                method = scenario.get("method", "get").upper()
+                name = "{} {}".format(method, path)
+                if scenario.get("user"):
+                    name = "{} as {}".format(name, scenario["user"])
+                scenarios.append({
+                    "name": name, "url_name": pattern.name, "method": method, "path": path,
+                    "data": scenario.get("data"), "user": scenario.get("user"),
+                })
+        return scenarios, skipped
+
+    def get_caller(self, scenario):
+        """
+        Method to get a function making the request of a scenario and reading its whole body.
+        """
+        client = Client(raise_request_exception=False)
+        headers = {}
+        if scenario["user"]:
+            headers["HTTP_AUTHORIZATION"] = "Bearer {}".format(self.get_token(scenario["user"]))
+        body = json.dumps(scenario["data"]) if scenario["data"] is not None else ""
+
+        def call():
+            response = client.generic(
+                scenario["method"], scenario["path"], body, content_type="application/json", **headers
+            )
+            if response.streaming:
+                b"".join(response.streaming_content)
+            return response
+        return call
+
+    def measure(self, scenario):
+        """
+        Method to get the latency percentiles, throughput, query counts and peak memory of a scenario.
+        """
+        call = self.get_caller(scenario)
+        response = call()
+        result = {"url_name": scenario["url_name"], "method": scenario["method"], "status": response.status_code}
+        if response.status_code >= 500:
+            result["error"] = "The first request failed, the scenario was not timed."
+            return result
+        for _number in range(max(self.warmup - 1, 0)):
+            call()
+
+        latencies = []
+        query_counts = []
+        query_time = 0.0
+        for _number in range(self.requests):
+            with record_queries() as record:
+                started = time.perf_counter()
+                call()
+                latencies.append(time.perf_counter() - started)
+            query_counts.append(record.count)
+            query_time += record.time
+
+        peak_memory = 0
+        if self.memory_requests:
+            tracemalloc.start()
+            try:
+                for _number in range(self.memory_requests):
+                    tracemalloc.reset_peak()
+                    baseline, _peak = tracemalloc.get_traced_memory()
+                    call()
+                    peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1] - baseline)
+            finally:
+                tracemalloc.stop()
+
+        latencies.sort()
+        total = sum(latencies)
+        result.update({
+            "requests": len(latencies),
+            "latency_ms": {
+                "p50": get_percentile(latencies, 50) * 1000,
+                "p95": get_percentile(latencies, 95) * 1000,
+                "p99": get_percentile(latencies, 99) * 1000,
+                "mean": total / len(latencies) * 1000,
+                "min": latencies[0] * 1000,
+                "max": latencies[-1] * 1000,
+            },
+            "throughput_rps": len(latencies) / total if total else None,
+            "queries": max(query_counts),
+            "queries_min": min(query_counts),
+            "query_time_ms": query_time / len(latencies) * 1000,
+            "peak_memory_kb": peak_memory / 1024 if self.memory_requests else None,
+        })
+        return result
+
+    def run(self):
+        """
+        Method to measure every scenario and get the results by scenario name with the skipped routes.
+        """
+        scenarios, skipped = self.get_scenarios()
+        return {scenario["name"]: self.measure(scenario) for scenario in scenarios}, skipped
+
+
+def get_change_percent(before, after):
+    """
+    Function to get how much a value changed in percent of its value before, None when it was 0.
+    """
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Function to compare the routes of a benchmark with a baseline and get the changes and the regressed routes.
+
+    A route regressed when its p95 latency grew or its throughput dropped by more
+    than threshold percent, or when it ran more queries.
+    """
+    routes = {}
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or "latency_ms" not in base or "latency_ms" not in result:
+            continue
+        changes = {
+            "{}_change_percent".format(percentile): get_change_percent(
+                base["latency_ms"][percentile], result["latency_ms"][percentile]
+            )
+            for percentile in ("p50", "p95", "p99")
+        }
+        changes["throughput_change_percent"] = get_change_percent(base["throughput_rps"], result["throughput_rps"])
+        changes["queries_change"] = result["queries"] - base["queries"]
+        if base.get("peak_memory_kb") is not None and result.get("peak_memory_kb") is not None:
+            changes["peak_memory_change_percent"] = get_change_percent(base["peak_memory_kb"], result["peak_memory_kb"])
+        changes["regressed"] = (
+            (changes["p95_change_percent"] or 0) > threshold
+            or (changes["throughput_change_percent"] or 0) < -threshold
+            or changes["queries_change"] > 0
+        )
+        if changes["regressed"]:
+            regressions.append(name)
+        routes[name] = changes
+    return {"threshold_percent": threshold, "routes": routes, "regressions": regressions}
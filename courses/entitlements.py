@@ -0,0 +1,95 @@
+"""
+File for resolving which course videos the caller of a request may watch.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import EnrolledCourses
+from users.roles import has_role
+from utilities.cache import bound_staleness
+
+
+class Entitlements(object):
+    """
+    Class for the video entitlements of a user.
+    """
+
+    def __init__(self, user_id, is_super_admin, is_seller, enrolled_course_ids):
+        """
+        Constructor function for setting the role and enrolled courses of the user.
+        """
+        self.user_id = user_id
+        self.is_super_admin = is_super_admin
+        self.is_seller = is_seller
+        self.enrolled_course_ids = enrolled_course_ids
+
+    def can_watch(self, course_id, seller_id):
+        """
+        Method to check if the user may watch the videos of a course.
+        """
+        return (
+            self.is_super_admin
+            or (self.is_seller and seller_id == self.user_id)
+            or course_id in self.enrolled_course_ids
+        )
+
+
+def get_enrolled_cache_key(user_id):
+    """
+    Function to get the cache key of the enrolled course ids of a user.
+    """
+    return "enrolled_courses:{}".format(user_id)
+
+
+def get_entitlement_timeout():
+    """
+    Function to get the seconds the enrolled course ids of a user are cached for, 0 when caching is disabled.
+
+    An enrollment handled by another process only drops its cached ids when the
+    cache is shared, otherwise they are kept for LOCAL_CACHE_STALE_SECONDS at most.
+    """
+    return bound_staleness(getattr(settings, "ENTITLEMENT_CACHE_TIMEOUT", 0) or 0)
+
+
+def get_enrolled_course_ids(user_id):
+    """
+    Function to get the ids of the courses a user is enrolled in, cached per user when configured.
+    """
+    timeout = get_entitlement_timeout()
+    if timeout:
+        course_ids = cache.get(get_enrolled_cache_key(user_id))
+        if course_ids is not None:
+            return course_ids
+
+    course_ids = frozenset(EnrolledCourses.objects.filter(user=user_id).values_list("course", flat=True))
+    if timeout:
+        cache.set(get_enrolled_cache_key(user_id), course_ids, timeout)
+    return course_ids
+
+
+def invalidate_enrolled_course_ids(user_id):
+    """
+    Function to drop the cached enrolled course ids of a user.
+    """
+    cache.delete(get_enrolled_cache_key(user_id))
+
+
+def get_entitlements(request):
+    """
+    Function to get the entitlements of the caller of a request, resolved once per request.
+    """
+    if request is None or not request.user.is_authenticated:
+        return None
+
+    entitlements = getattr(request, "_entitlements", None)
+    if entitlements is None:
+        user = request.user
+        is_super_admin = has_role(user, "SUPER_ADMIN")
+        entitlements = Entitlements(
+            user_id=user.id,
+            is_super_admin=is_super_admin,
+            is_seller=has_role(user, "SELLER"),
+            enrolled_course_ids=frozenset() if is_super_admin else get_enrolled_course_ids(user.id),
+        )
+        request._entitlements = entitlements
+    return entitlements
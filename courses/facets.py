@@ -0,0 +1,195 @@
+"""
+File for computing the facet counts of the course filter list.
+"""
+from collections import Counter
+
+from django.db.models import Case, CharField, Count, F, Q, Value, When
+from django.db.models.functions import Concat
+from django.utils.dateparse import parse_duration
+
+from .models import Courses
+from common.models import CourseCategory, SubCourseCategory
+from users.models import SellerProfile
+from utilities.constants import DurationFacets, DurationTypes, RatingFacets
+
+
+class CourseFacetEngine(object):
+    """
+    Class for computing category, rating, seller and duration facets of a filtered course queryset.
+
+    All counts come from one grouped pass over the filtered courses, which are
+    selected with a subquery instead of a list of ids.
+    """
+
+    def __init__(self, queryset=None, dimensions=None):
+        """
+        Constructor function for setting the filtered course queryset and the facet labels.
+        """
+        self.queryset = queryset
+        self.dimensions = dimensions
+
+    @staticmethod
+    def get_dimensions():
+        """
+        Method to get the categories, sub categories and sellers the facets are labelled with.
+        """
+        return {
+            "category": list(CourseCategory.objects.order_by("name").values_list("id", "name")),
+            "sub_category": list(SubCourseCategory.objects.order_by("id").values_list("id", "name", "category")),
+            "seller": list(SellerProfile.objects.annotate(
+                label=Concat(F('user__first_name'), Value(" "), F('user__last_name'), output_field=CharField()),
+            ).order_by("label").values_list("label", "user")),
+        }
+
+    def get_rating_bucket(self):
+        """
+        Method to get the expression putting a course into the highest rating facet it reaches.
+        """
+        return Case(
+            *[When(Q(rating__gte=value), then=Value(label)) for label, value in RatingFacets],
+            default=Value(None), output_field=CharField(),
+        )
+
+    def get_duration_bucket(self):
+        """
+        Method to get the expression putting a course into its duration facet.
+        """
+        conditions = []
+        for _label, value in DurationFacets:
+            duration = DurationTypes[value]
+            condition = Q(duration__isnull=False)
+            if duration.get("min"):
+                condition &= Q(duration__gte=parse_duration(duration["min"]))
+            if duration.get("max"):
+                condition &= Q(duration__lt=parse_duration(duration["max"]))
+            conditions.append(When(condition, then=Value(value)))
+        return Case(*conditions, default=Value(None), output_field=CharField())
+
+    def get_counts(self):
+        """
+        Method to get the course count of every category, sub category, seller, rating and duration bucket.
+        """
+        rows = Courses.objects.filter(id__in=self.queryset.values("id")).annotate(
+            rating_bucket=self.get_rating_bucket(),
+            duration_bucket=self.get_duration_bucket(),
+        ).values(
+            "category", "sub_category", "seller", "rating_bucket", "duration_bucket"
+        ).annotate(count=Count("id")).order_by()
+
+        counts = {
+            "total": 0,
+            "category": Counter(),
+            "sub_category": Counter(),
+            "seller": Counter(),
+            "rating": Counter(),
+            "duration": Counter(),
+        }
+        for row in rows:
+            counts["total"] += row["count"]
+            counts["category"][row["category"]] += row["count"]
+            counts["sub_category"][row["sub_category"]] += row["count"]
+            counts["seller"][row["seller"]] += row["count"]
+            counts["rating"][row["rating_bucket"]] += row["count"]
+            counts["duration"][row["duration_bucket"]] += row["count"]
+        return counts
+
+    def get_category(self, counts):
+        """
+        Method to get category list with sub categories and course count
+        """
+        subcategory_map = {}
+        for subcategory_id, name, category_id in self.dimensions["sub_category"]:
+            subcategory_map.setdefault(category_id, []).append({
+                "label": name,
+                "value": subcategory_id,
+                "count": counts["sub_category"][subcategory_id],
+            })
+
+        category = []
+        for category_id, name in self.dimensions["category"]:
+            category.append({
+                "label": name,
+                "value": category_id,
+                "count": counts["category"][category_id],
+                "subcategory": subcategory_map.get(category_id, []),
+            })
+
+        category.insert(0, {
+            "label": 'All',
+            "value": 0,
+            "count": sum(category_obj["count"] for category_obj in category)
+        })
+        return category
+
+    def get_rating(self, counts):
+        """
+        Method to get rating list with the count of courses rated at least each value
+        """
+        data = [
+            {
+                "label": 'All',
+                "value": 0,
+                "count": counts["total"]
+            }
+        ]
+        count = 0
+        for label, value in RatingFacets:
+            count += counts["rating"][label]
+            data.append({
+                "label": label,
+                "value": value,
+                "count": count,
+            })
+        return data
+
+    def get_seller(self, counts):
+        """
+        Method to get seller list with course count
+        """
+        seller = [
+            {
+                "label": label,
+                "value": seller_id,
+                "count": counts["seller"][seller_id],
+            } for label, seller_id in self.dimensions["seller"]
+        ]
+
+        seller.insert(0, {
+            "label": "All",
+            "value": 0,
+            "count": sum(seller_obj["count"] for seller_obj in seller)
+        })
+        return seller
+
+    def get_duration(self, counts):
+        """
+        Method to get duration list with course count
+        """
+        data = [
+            {
+                "label": label,
+                "value": value,
+                "count": counts["duration"][value]
+            } for label, value in DurationFacets
+        ]
+        data.insert(0, {
+            "label": "All",
+            "value": 0,
+            "count": sum(duration["count"] for duration in data)
+        })
+        return data
+
+    def get_facets(self, counts=None):
+        """
+        Method to get all facets of the filtered courses, or of already computed counts.
+        """
+        if counts is None:
+            counts = self.get_counts()
+        if self.dimensions is None:
+            self.dimensions = self.get_dimensions()
+        return {
+            "category": self.get_category(counts),
+            "rating": self.get_rating(counts),
+            "seller": self.get_seller(counts),
+            "duration": self.get_duration(counts),
+        }
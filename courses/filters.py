@@ -1,6 +1,8 @@
 import django_filters
+from django.conf import settings
 from django.utils.dateparse import parse_duration
 
+from .index import course_index
 from .models import Courses
 from utilities.constants import DurationTypes
 
@@ -15,6 +17,22 @@ class CourseFilter(django_filters.FilterSet):
     seller = django_filters.CharFilter(method="filter_seller")
     duration = django_filters.CharFilter(method="filter_duration")
 
+    def filter_queryset(self, queryset):
+        """
+        function to filter published courses with the course index, or in the database when the index can not answer
+        or matches more courses than fit in a short id list
+        """
+        if course_index.is_enabled():
+            bits = course_index.get_filter_bits(self.form.cleaned_data)
+            if bits is not None:
+                if bits == course_index.all_bits:
+                    return queryset
+                if not bits:
+                    return queryset.none()
+                if bits.bit_count() <= getattr(settings, "COURSE_INDEX_MAX_FILTER_IDS", 1000):
+                    return queryset.filter(id__in=course_index.get_course_ids(bits))
+        return super().filter_queryset(queryset)
+
     def filter_category(self, queryset, _name, value):
         """
         function to filter course category
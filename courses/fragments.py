@@ -0,0 +1,113 @@
+"""
+File for caching the rendered JSON of each course of a list under the versions of the data it shows.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from users.storefront import get_storefront_version_name
+from utilities.cache import bound_staleness, bump_cache_version, get_cache_versions
+
+
+CATEGORY_VERSION_NAME = "course_categories"
+
+
+def get_fragment_timeout():
+    """
+    Function to get the seconds a rendered course is cached for, 0 when caching is disabled.
+
+    A change handled by another process only drops the rendered course when the
+    cache is shared, otherwise it is kept for LOCAL_CACHE_STALE_SECONDS at most.
+    """
+    return bound_staleness(getattr(settings, "COURSE_FRAGMENT_CACHE_TIMEOUT", 0) or 0)
+
+
+def get_course_version_name(course_id):
+    """
+    Function to get the name of the content version of a course, its chapters, lessons and ratings.
+    """
+    return "course_fragment:{}".format(course_id)
+
+
+def invalidate_course_fragments(*course_ids):
+    """
+    Function to expire the rendered JSON of courses, now and once the transaction commits.
+    """
+    course_ids = {course_id for course_id in course_ids if course_id}
+
+    def bump():
+        for course_id in course_ids:
+            bump_cache_version(get_course_version_name(course_id))
+
+    if course_ids:
+        bump()
+        transaction.on_commit(bump)
+
+
+def invalidate_category_fragments():
+    """
+    Function to expire the rendered JSON of every course after a category changed, now and once the transaction commits.
+    """
+    bump_cache_version(CATEGORY_VERSION_NAME)
+    transaction.on_commit(lambda: bump_cache_version(CATEGORY_VERSION_NAME))
+
+
+class CourseFragmentCache(object):
+    """
+    Class for getting the rendered JSON of a list of courses, serializing only the courses missing from the cache.
+
+    A fragment is keyed by the course, the versions of the course, its seller and
+    the categories, and the variant of the request, which names the requested
+    fields. Any change to one of them makes a new key, so a fragment is never
+    stale; reviewer names are only refreshed when the fragment times out.
+    """
+
+    def __init__(self, variant, timeout=None):
+        """
+        Constructor function for setting the variant of the request and the seconds fragments are cached for.
+        """
+        self.variant = hashlib.md5(variant.encode()).hexdigest()
+        self.timeout = get_fragment_timeout() if timeout is None else timeout
+
+    def get_keys(self, courses):
+        """
+        Method to get the cache key of the fragment of every course, reading all versions in one round trip.
+        """
+        names = {CATEGORY_VERSION_NAME}
+        for course in courses:
+            names.add(get_course_version_name(course.id))
+            names.add(get_storefront_version_name(course.seller_id))
+        versions = get_cache_versions(names)
+
+        return {
+            course.id: "course_fragment:{}:{}:{}:{}:{}".format(
+                course.id,
+                versions[get_course_version_name(course.id)],
+                versions[get_storefront_version_name(course.seller_id)],
+                versions[CATEGORY_VERSION_NAME],
+                self.variant,
+            )
+            for course in courses
+        }
+
+    def render(self, courses, serialize):
+        """
+        Method to get the JSON array of the courses, rendering the missing ones with serialize and caching them.
+        """
+        courses = list(courses)
+        keys = self.get_keys(courses)
+        fragments = cache.get_many(keys.values())
+
+        missing = [course for course in courses if keys[course.id] not in fragments]
+        if missing:
+            renderer = JSONRenderer()
+            rendered = {
+                keys[course.id]: renderer.render(data) for course, data in zip(missing, serialize(missing))
+            }
+            cache.set_many(rendered, self.timeout)
+            fragments.update(rendered)
+
+        return b"[" + b",".join(fragments[keys[course.id]] for course in courses) + b"]"
@@ -0,0 +1,376 @@
+"""
+File for bulk importing courses, chapters and lessons from streamed CSV or JSONL rows.
+"""
+import csv
+import json
+import random
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.text import slugify
+
+from .aggregates import refresh_seller_statistics, refresh_structure_summary
+from .index import course_index
+from .models import Courses, CourseChapter, CourseLesson
+from common.models import CourseCategory, SubCourseCategory
+from common.tree import invalidate_category_tree
+from users.models import CustomUser
+from users.roles import get_role_mask, role_registry
+from users.storefront import invalidate_seller_storefront
+from utilities import messages
+from utilities.constants import CourseStatusChoices
+
+
+IMPORT_COLUMNS = (
+    "course_key", "seller_email", "title", "category", "sub_category", "course_status", "sale_price",
+    "chapter_order", "chapter_title", "lesson_order", "lesson_title", "video", "duration",
+)
+CHAPTER_COLUMNS = ("chapter_order", "chapter_title")
+LESSON_COLUMNS = ("lesson_order", "lesson_title", "video", "duration")
+
+
+def read_csv_rows(path):
+    """
+    Function to stream the rows of a CSV file as (row number, row, error) tuples.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        header = tuple(column.strip() for column in next(reader, ()))
+        if header != IMPORT_COLUMNS:
+            raise ValueError(messages.CSV_COLUMN_ERROR.format(path))
+        for number, cells in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in cells):
+                continue
+            if len(cells) != len(IMPORT_COLUMNS):
+                yield number, None, messages.CSV_COLUMN_MISS_MATCH_AT_ROW.format(number)
+                continue
+            yield number, dict(zip(IMPORT_COLUMNS, (cell.strip() for cell in cells))), None
+
+
+def read_jsonl_rows(path):
+    """
+    Function to stream the rows of a JSONL file as (row number, row, error) tuples.
+    """
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                values = json.loads(line)
+            except ValueError:
+                values = None
+            if not isinstance(values, dict):
+                yield number, None, messages.INVALID_JSON_AT_ROW.format(number)
+                continue
+            yield number, {
+                column: "" if values.get(column) is None else str(values[column]).strip() for column in IMPORT_COLUMNS
+            }, None
+
+
+class CourseImporter(object):
+    """
+    Class for importing rows of courses, chapters and lessons in batches.
+
+    Each row names its course by a course_key which is local to the import; the
+    first row of a course carries its fields, and rows may add a chapter, a lesson
+    or both. Every batch is written with bulk_create inside its own transaction,
+    after which the stored summaries, seller statistics, course index and
+    storefronts of the touched courses are refreshed, since bulk_create sends no
+    signals. Invalid rows are skipped and reported.
+    """
+    slug_attempts = 3
+
+    def __init__(self, batch_size=1000):
+        """
+        Constructor function for setting the batch size and the state kept across batches.
+        """
+        self.batch_size = batch_size
+        self.errors = []
+        self.course_ids = {}
+        self.course_sellers = {}
+        self.failed_course_keys = set()
+        self.chapter_ids = {}
+        self.sellers = {}
+        self.categories = {}
+        self.sub_categories = {}
+        self.created = {"courses": 0, "chapters": 0, "lessons": 0}
+
+    def run(self, rows):
+        """
+        Method to import a stream of (row number, row, error) tuples.
+        """
+        batch = []
+        for number, row, error in rows:
+            if error:
+                self.errors.append(error)
+                continue
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+
+    def load_lookups(self, rows):
+        """
+        Method to load the sellers, categories and sub categories named by a batch which were not loaded yet.
+        """
+        emails = {row["seller_email"] for _number, row in rows if row["seller_email"]} - set(self.sellers)
+        if emails:
+            seller_mask = get_role_mask(("SELLER",))
+            for email, user_id, role_id in CustomUser.objects.filter(email__in=emails).values_list(
+                "email", "id", "role_permission"
+            ):
+                if role_registry.get_mask(role_id) & seller_mask:
+                    self.sellers[email] = user_id
+            for email in emails:
+                self.sellers.setdefault(email, None)
+
+        names = {row["category"] for _number, row in rows if row["category"]} - set(self.categories)
+        if names:
+            for name, category_id in CourseCategory.objects.filter(name__in=names).order_by("-id").values_list(
+                "name", "id"
+            ):
+                self.categories[name] = category_id
+            for name in names:
+                self.categories.setdefault(name, None)
+
+        names = {row["sub_category"] for _number, row in rows if row["sub_category"]}
+        if names:
+            for category_id, name, sub_category_id in SubCourseCategory.objects.filter(name__in=names).order_by(
+                "-id"
+            ).values_list("category", "name", "id"):
+                self.sub_categories[(category_id, name)] = sub_category_id
+
+    def clean_value(self, model, field_name, value, number):
+        """
+        Method to convert a cell with a model field, reporting it when invalid.
+        """
+        try:
+            return model._meta.get_field(field_name).clean(value, None)
+        except ValidationError:
+            self.errors.append(messages.INVALID_VALUE_AT_ROW.format(field_name, number))
+            raise
+
+    def require(self, row, columns, number):
+        """
+        Method to check that the columns of a row are filled, reporting each empty one.
+        """
+        missing = [column for column in columns if not row[column]]
+        for column in missing:
+            self.errors.append(messages.THIS_REQUIRED_FIELD_AT_ROW.format(column, number))
+        return not missing
+
+    def build_course(self, number, row):
+        """
+        Method to build an unsaved course from the row which opens it, or None when the row is invalid.
+        """
+        if not self.require(row, ("seller_email", "title", "course_status"), number):
+            return None
+
+        seller_id = self.sellers.get(row["seller_email"])
+        if seller_id is None:
+            self.errors.append(messages.DOES_NOT_EXISTS_AT_ROW.format("Seller", number))
+            return None
+
+        statuses = [choice for choice, _label in CourseStatusChoices]
+        if row["course_status"] not in statuses:
+            self.errors.append(messages.CHOICES.format("course_status", ", ".join(statuses), number))
+            return None
+
+        category_id = sub_category_id = None
+        if row["category"]:
+            category_id = self.categories.get(row["category"])
+            if category_id is None:
+                self.errors.append(messages.DOES_NOT_EXISTS_AT_ROW.format("Category", number))
+                return None
+        if row["sub_category"]:
+            sub_category_id = self.sub_categories.get((category_id, row["sub_category"]))
+            if sub_category_id is None:
+                self.errors.append(messages.DOES_NOT_EXISTS_AT_ROW.format("Sub category", number))
+                return None
+
+        try:
+            title = self.clean_value(Courses, "title", row["title"], number)
+            sale_price = self.clean_value(Courses, "sale_price", row["sale_price"], number) if row["sale_price"] else None
+        except ValidationError:
+            return None
+
+        return Courses(
+            seller_id=seller_id,
+            title=title,
+            category_id=category_id,
+            sub_category_id=sub_category_id,
+            course_status=row["course_status"],
+            sale_price=sale_price,
+            created_by_id=seller_id,
+            updated_by_id=seller_id,
+        )
+
+    def allocate_slugs(self, courses):
+        """
+        Method to give new courses unique slugs in the form Courses.save uses, checking each round in one query.
+        """
+        taken = set()
+        remaining = list(courses)
+        attempt = 0
+        while remaining:
+            # titles which keep colliding get a wider random suffix.
+            upper = 999 if attempt < self.slug_attempts else 999999
+            candidates = [slugify(course.title, "") + "-" + str(random.randint(1, upper)) for course in remaining]
+            taken.update(Courses.objects.filter(slug_name__in=set(candidates)).values_list("slug_name", flat=True))
+
+            colliding = []
+            for course, slug in zip(remaining, candidates):
+                if slug in taken:
+                    colliding.append(course)
+                else:
+                    course.slug_name = slug
+                    taken.add(slug)
+            remaining = colliding
+            attempt += 1
+
+    def clean_rows(self, rows):
+        """
+        Method to validate a batch and build its new courses, getting the rows with chapter or lesson cells.
+        """
+        new_courses = {}
+        structure_rows = []
+        for number, row in rows:
+            if not self.require(row, ("course_key",), number):
+                continue
+            key = row["course_key"]
+            if key not in self.course_ids and key not in new_courses:
+                if key in self.failed_course_keys:
+                    self.errors.append(messages.DOES_NOT_EXISTS_AT_ROW.format("Course", number))
+                    continue
+                course = self.build_course(number, row)
+                if course is None:
+                    self.failed_course_keys.add(key)
+                    continue
+                new_courses[key] = course
+
+            has_lesson = any(row[column] for column in LESSON_COLUMNS)
+            if not has_lesson and not any(row[column] for column in CHAPTER_COLUMNS):
+                continue
+            if not self.require(row, ("chapter_order",) + (LESSON_COLUMNS if has_lesson else ()), number):
+                continue
+            try:
+                chapter_order = self.clean_value(CourseChapter, "order_no", row["chapter_order"], number)
+                lesson = None
+                if has_lesson:
+                    lesson = {
+                        "order_no": self.clean_value(CourseLesson, "order_no", row["lesson_order"], number),
+                        "title": self.clean_value(CourseLesson, "title", row["lesson_title"], number),
+                        "video": self.clean_value(CourseLesson, "video", row["video"], number),
+                        "duration": self.clean_value(CourseLesson, "duration", row["duration"], number),
+                    }
+            except ValidationError:
+                continue
+            structure_rows.append((number, key, chapter_order, row["chapter_title"], lesson))
+        return new_courses, structure_rows
+
+    def create_courses(self, new_courses):
+        """
+        Method to insert the new courses of a batch and remember their ids by course key.
+        """
+        if not new_courses:
+            return
+        self.allocate_slugs(new_courses.values())
+        Courses.objects.bulk_create(new_courses.values(), batch_size=self.batch_size)
+        # bulk_create does not set primary keys on MySQL, so they are read back by the unique slugs.
+        course_ids = dict(Courses.objects.filter(
+            slug_name__in=[course.slug_name for course in new_courses.values()]
+        ).values_list("slug_name", "id"))
+        for key, course in new_courses.items():
+            self.course_ids[key] = course_ids[course.slug_name]
+            self.course_sellers[key] = course.seller_id
+        self.created["courses"] += len(new_courses)
+
+    def create_chapters(self, structure_rows):
+        """
+        Method to insert the chapters first named by a batch and remember their ids by course key and order.
+        """
+        new_chapters = {}
+        for number, key, chapter_order, chapter_title, _lesson in structure_rows:
+            chapter_key = (key, chapter_order)
+            if key not in self.course_ids or chapter_key in self.chapter_ids or chapter_key in new_chapters:
+                continue
+            if not chapter_title:
+                self.errors.append(messages.THIS_REQUIRED_FIELD_AT_ROW.format("chapter_title", number))
+                continue
+            try:
+                title = self.clean_value(CourseChapter, "title", chapter_title, number)
+            except ValidationError:
+                continue
+            seller_id = self.course_sellers[key]
+            new_chapters[chapter_key] = CourseChapter(
+                course_id=self.course_ids[key],
+                title=title,
+                order_no=chapter_order,
+                created_by_id=seller_id,
+                updated_by_id=seller_id,
+            )
+        if not new_chapters:
+            return
+
+        CourseChapter.objects.bulk_create(new_chapters.values(), batch_size=self.batch_size)
+        course_keys = {self.course_ids[key]: key for key, _order in new_chapters}
+        for course_id, order_no, chapter_id in CourseChapter.objects.filter(
+            course__in=course_keys, order_no__in={order for _key, order in new_chapters}
+        ).values_list("course", "order_no", "id"):
+            chapter_key = (course_keys[course_id], order_no)
+            if chapter_key in new_chapters:
+                self.chapter_ids[chapter_key] = chapter_id
+        self.created["chapters"] += len(new_chapters)
+
+    def create_lessons(self, structure_rows):
+        """
+        Method to insert the lessons of a batch, getting the ids of the chapters they were added to.
+        """
+        lessons = []
+        chapter_ids = set()
+        for number, key, chapter_order, _chapter_title, lesson in structure_rows:
+            if lesson is None:
+                continue
+            if key not in self.course_ids:
+                self.errors.append(messages.DOES_NOT_EXISTS_AT_ROW.format("Course", number))
+                continue
+            chapter_id = self.chapter_ids.get((key, chapter_order))
+            if chapter_id is None:
+                self.errors.append(messages.DOES_NOT_EXISTS_AT_ROW.format("Chapter", number))
+                continue
+            seller_id = self.course_sellers[key]
+            lessons.append(CourseLesson(
+                chapter_id=chapter_id, created_by_id=seller_id, updated_by_id=seller_id, **lesson
+            ))
+            chapter_ids.add(chapter_id)
+        CourseLesson.objects.bulk_create(lessons, batch_size=self.batch_size)
+        self.created["lessons"] += len(lessons)
+        return chapter_ids
+
+    def import_batch(self, rows):
+        """
+        Method to write one batch in a transaction and refresh what depends on the touched courses.
+        """
+        self.load_lookups(rows)
+        with transaction.atomic():
+            new_courses, structure_rows = self.clean_rows(rows)
+            self.create_courses(new_courses)
+            self.create_chapters(structure_rows)
+            chapter_ids = self.create_lessons(structure_rows)
+
+            course_keys = set(new_courses) | {key for _number, key, _order, _title, _lesson in structure_rows}
+            course_ids = {self.course_ids[key] for key in course_keys if key in self.course_ids}
+            seller_ids = {self.course_sellers[key] for key in course_keys if key in self.course_ids}
+            chapter_ids.update(
+                self.chapter_ids[(key, order)] for _number, key, order, _title, _lesson in structure_rows
+                if (key, order) in self.chapter_ids
+            )
+            refresh_structure_summary(chapter_ids=chapter_ids, course_ids=course_ids)
+            refresh_seller_statistics(seller_ids)
+            invalidate_seller_storefront(*seller_ids)
+            if new_courses:
+                invalidate_category_tree()
+            if course_ids:
+                transaction.on_commit(lambda: course_index.refresh_courses(course_ids))
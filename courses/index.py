@@ -0,0 +1,299 @@
+"""
+File for the in-memory bitmap index of published courses.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils.dateparse import parse_duration
+
+from .facets import CourseFacetEngine
+from .models import Courses
+from utilities.cache import bound_staleness, bump_cache_version, get_cache_version
+from utilities.constants import DurationTypes, RatingFacets
+
+
+class CourseIndex(object):
+    """
+    Class for keeping a process local bitmap index of the published courses.
+
+    Every course gets a bit position and every attribute value keeps an int whose
+    set bits are the courses having that value, so filters are answered by
+    intersecting bitsets and facet counts by counting bits. The index is built on
+    first use, updated in place when this process changes a course and rebuilt
+    when another process has changed one, which is tracked by a version in the
+    shared cache, or every refresh_interval seconds in case a change was missed.
+    """
+    version_name = "course_index"
+    refresh_interval = 300
+    attributes = ("category", "sub_category", "seller", "rating", "duration", "duration_filter")
+    id_filters = (
+        ("category", "category"),
+        ("subcategory", "sub_category"),
+        ("seller", "seller"),
+    )
+
+    def __init__(self):
+        """
+        Constructor function for setting up an empty index.
+        """
+        self.lock = threading.RLock()
+        self.version = None
+        self.built_at = 0
+        self.dimensions = None
+        self.pending_course_ids = set()
+        self.durations = [
+            (value, parse_duration(DurationTypes[value]["min"]) if DurationTypes[value].get("min") else None,
+             parse_duration(DurationTypes[value]["max"]) if DurationTypes[value].get("max") else None)
+            for value in DurationTypes
+        ]
+        self.reset()
+
+    def reset(self):
+        """
+        Method to empty the index.
+        """
+        self.positions = {}
+        self.course_ids = {}
+        self.course_values = {}
+        self.free_positions = []
+        self.next_position = 0
+        self.all_bits = 0
+        self.bitsets = {name: defaultdict(int) for name in self.attributes}
+
+    @staticmethod
+    def is_enabled():
+        """
+        Method to check if filters and facets may be answered from the index.
+        """
+        return getattr(settings, "COURSE_INDEX_ENABLED", True)
+
+    @staticmethod
+    def get_course_rows(queryset):
+        """
+        Method to get the indexed attributes of the published courses of a queryset.
+        """
+        return queryset.filter(course_status="PUBLISHED").order_by().values_list(
+            "id", "category", "sub_category", "seller", "rating", "duration"
+        )
+
+    def get_keys(self, values):
+        """
+        Method to get the bitsets a course with the given attribute values belongs to.
+        """
+        _course_id, category_id, sub_category_id, seller_id, rating, duration = values
+        keys = [("category", category_id), ("sub_category", sub_category_id), ("seller", seller_id)]
+
+        rating_bucket = None
+        if rating:
+            for label, value in RatingFacets:
+                if rating >= value:
+                    rating_bucket = label
+                    break
+        keys.append(("rating", rating_bucket))
+
+        duration_bucket = None
+        if duration is not None:
+            for value, min_duration, max_duration in self.durations:
+                if min_duration is not None and duration < min_duration:
+                    continue
+                if max_duration is not None and duration > max_duration:
+                    continue
+                keys.append(("duration_filter", value))
+                if duration_bucket is None and (max_duration is None or duration < max_duration):
+                    duration_bucket = value
+        keys.append(("duration", duration_bucket))
+        return keys
+
+    def add(self, values):
+        """
+        Method to add a course row to the index.
+        """
+        course_id = values[0]
+        if course_id in self.positions:
+            self.remove(course_id)
+
+        if self.free_positions:
+            position = self.free_positions.pop()
+        else:
+            position = self.next_position
+            self.next_position += 1
+
+        bit = 1 << position
+        self.positions[course_id] = position
+        self.course_ids[position] = course_id
+        self.course_values[course_id] = values
+        self.all_bits |= bit
+        for name, key in self.get_keys(values):
+            self.bitsets[name][key] |= bit
+
+    def remove(self, course_id):
+        """
+        Method to remove a course from the index.
+        """
+        position = self.positions.pop(course_id, None)
+        if position is None:
+            return
+
+        bit = 1 << position
+        for name, key in self.get_keys(self.course_values.pop(course_id)):
+            bits = self.bitsets[name][key] & ~bit
+            if bits:
+                self.bitsets[name][key] = bits
+            else:
+                del self.bitsets[name][key]
+        del self.course_ids[position]
+        self.all_bits &= ~bit
+        self.free_positions.append(position)
+
+    def rebuild(self):
+        """
+        Method to build the index from the database.
+        """
+        with self.lock:
+            version = get_cache_version(self.version_name)
+            self.reset()
+            for values in self.get_course_rows(Courses.objects.all()):
+                self.add(values)
+            self.pending_course_ids = set()
+            self.dimensions = None
+            self.version = version
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """
+        Method to rebuild the index if it was never built, another process has changed the courses or it is due.
+        """
+        if (
+            self.version != get_cache_version(self.version_name)
+            or time.monotonic() - self.built_at >= bound_staleness(self.refresh_interval)
+        ):
+            self.rebuild()
+        if self.pending_course_ids:
+            self.apply_pending()
+        if self.dimensions is None:
+            with self.lock:
+                if self.dimensions is None:
+                    self.dimensions = CourseFacetEngine.get_dimensions()
+
+    def _publish_change(self):
+        """
+        Method to bump the shared version and tell if this process may apply the change in place.
+        """
+        version = bump_cache_version(self.version_name)
+        if self.version is not None and version == self.version + 1:
+            self.version = version
+            return True
+        self.version = None
+        return False
+
+    def refresh_courses(self, course_ids):
+        """
+        Method to mark the given courses for reloading after they or their lessons or ratings changed.
+        """
+        with self.lock:
+            if self._publish_change():
+                self.pending_course_ids.update(course_ids)
+
+    def apply_pending(self):
+        """
+        Method to reload all courses marked for reloading in one query.
+        """
+        with self.lock:
+            course_ids, self.pending_course_ids = self.pending_course_ids, set()
+            for course_id in course_ids:
+                self.remove(course_id)
+            for values in self.get_course_rows(Courses.objects.filter(id__in=course_ids)):
+                self.add(values)
+
+    def refresh_dimensions(self):
+        """
+        Method to reload the facet labels after a category, sub category or seller changed.
+        """
+        with self.lock:
+            self._publish_change()
+            self.dimensions = None
+
+    def get_rating_bits(self, rating):
+        """
+        Method to get the courses rated at least the given value.
+        """
+        bits = 0
+        for label, value in RatingFacets:
+            if Decimal(str(value)) == rating:
+                for bucket_label, bucket_value in RatingFacets:
+                    if bucket_value >= value:
+                        bits |= self.bitsets["rating"].get(bucket_label, 0)
+                return bits
+
+        for course_id, values in self.course_values.items():
+            if values[4] >= rating:
+                bits |= 1 << self.positions[course_id]
+        return bits
+
+    def get_filter_bits(self, data):
+        """
+        Method to get the courses matching the cleaned data of a CourseFilter.
+
+        None is returned when a value can not be answered from the index, so the
+        caller falls back to filtering in the database.
+        """
+        self.ensure_fresh()
+        with self.lock:
+            bits = self.all_bits
+            for param, name in self.id_filters:
+                value = data.get(param)
+                if not value:
+                    continue
+                try:
+                    ids = {int(value_id) for value_id in value.split(",")}
+                except ValueError:
+                    return None
+                selected = 0
+                for value_id in ids:
+                    selected |= self.bitsets[name].get(value_id, 0)
+                bits &= selected
+
+            rating = data.get("rating")
+            if rating is not None:
+                bits &= self.get_rating_bits(rating)
+
+            duration = data.get("duration")
+            if duration and duration in DurationTypes:
+                bits &= self.bitsets["duration_filter"].get(duration, 0)
+            return bits
+
+    def get_course_ids(self, bits):
+        """
+        Method to get the ids of the courses set in a bitset.
+        """
+        course_ids = []
+        with self.lock:
+            while bits:
+                lowest = bits & -bits
+                course_ids.append(self.course_ids[lowest.bit_length() - 1])
+                bits ^= lowest
+        return course_ids
+
+    def get_counts(self, bits):
+        """
+        Method to get the facet counts of the courses set in a bitset.
+        """
+        counts = {"total": bits.bit_count()}
+        with self.lock:
+            for name in ("category", "sub_category", "seller", "rating", "duration"):
+                counts[name] = Counter({
+                    key: (bits & value_bits).bit_count() for key, value_bits in self.bitsets[name].items()
+                })
+        return counts
+
+    def get_facets(self, bits):
+        """
+        Method to get all facets of the courses set in a bitset.
+        """
+        return CourseFacetEngine(dimensions=self.dimensions).get_facets(self.get_counts(bits))
+
+
+course_index = CourseIndex()
@@ -0,0 +1,105 @@
+"""
+File for batch loading the related data of a page of courses.
+"""
+from collections import defaultdict
+
+from django.db.models import F, Prefetch, prefetch_related_objects
+
+from .models import (
+    CourseLesson,
+    CourseRatings,
+    CourseChapter,
+)
+from users.models import SellerProfile
+
+
+class CourseBatchLoader(object):
+    """
+    Class for loading the related data of a list of courses in a fixed number of queries.
+
+    Every relation is loaded lazily for the whole list on first access, so fields
+    which are not requested never cost a query.
+    """
+
+    def __init__(self, courses, context=None):
+        """
+        Constructor function for setting the courses to load data for.
+        """
+        self.courses = list(courses)
+        self.course_map = {course.id: course for course in self.courses}
+        self.context = context if context is not None else {}
+        self._chapters = None
+        self._reviews = None
+        self._seller_profiles = None
+        self._categories_loaded = False
+
+    def has_course(self, course_id):
+        """
+        Method to check if the course is part of this loader.
+        """
+        return course_id in self.course_map
+
+    def _requires(self, context_key, field_names):
+        """
+        Method to check if the nested serializer of context_key renders any of field_names.
+        """
+        fields = self.context.get(context_key, None)
+        return fields is None or bool(set(field_names) & set(fields))
+
+    def load_categories(self):
+        """
+        Method to load category and sub category of all courses.
+        """
+        if not self._categories_loaded:
+            prefetch_related_objects(self.courses, "category", "sub_category")
+            self._categories_loaded = True
+
+    def get_chapters(self, course_id):
+        """
+        Method to get the chapters of a course ordered by order_no.
+        """
+        if self._chapters is None:
+            chapters = CourseChapter.objects.filter(course__in=list(self.course_map)).order_by("order_no")
+            if self._requires("chapters", ("lessons",)):
+                chapters = chapters.prefetch_related(
+                    Prefetch("chappter_lesson", queryset=CourseLesson.objects.order_by("order_no"),
+                             to_attr="ordered_lessons")
+                )
+
+            self._chapters = defaultdict(list)
+            for chapter in chapters:
+                chapter.course = self.course_map[chapter.course_id]
+                self._chapters[chapter.course_id].append(chapter)
+        return self._chapters.get(course_id, [])
+
+    def get_reviews(self, course_id):
+        """
+        Method to get the reviews of a course, latest first.
+        """
+        if self._reviews is None:
+            reviews = CourseRatings.objects.filter(course__in=list(self.course_map)).annotate(
+                user_first_name=F("user__first_name"),
+                user_last_name=F("user__last_name"),
+                user_profile_image=F("user__profile_image"),
+                user_profile_image_key=F("user__profile_image"),
+            ).order_by("-created_at")
+
+            self._reviews = defaultdict(list)
+            for review in reviews:
+                self._reviews[review.course_id].append(review)
+        return self._reviews.get(course_id, [])
+
+    def get_seller_profile(self, seller_id):
+        """
+        Method to get the seller profile of a course seller.
+        """
+        if self._seller_profiles is None:
+            seller_ids = {course.seller_id for course in self.courses}
+            seller_profiles = SellerProfile.objects.filter(user__in=seller_ids).select_related("user").annotate(
+                user_first_name=F("user__first_name"),
+                user_last_name=F("user__last_name"),
+                user_profile_image=F("user__profile_image"),
+                user_profile_image_key=F("user__profile_image"),
+            )
+            self._seller_profiles = {profile.user_id: profile for profile in seller_profiles}
+        return self._seller_profiles.get(seller_id)
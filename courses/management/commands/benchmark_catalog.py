@@ -0,0 +1,117 @@
+"""
+File for the command benchmarking the API endpoints against a synthetic catalog.
+"""
+import json
+import platform
+import time
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from courses.benchmarks import CatalogGenerator, EndpointBenchmark, compare_results
+
+
+class Command(BaseCommand):
+    """
+    Class for generating a synthetic catalog in a throwaway database and benchmarking every API route against it.
+    """
+    help = (
+        "Generate a deterministic synthetic catalog in a test database and report the latency percentiles, "
+        "throughput, query counts and peak memory of every API route as JSON."
+    )
+
+    def add_arguments(self, parser):
+        """
+        Method to add the arguments of the command.
+        """
+        parser.add_argument("--scale", type=float, default=1, help="Multiplier of the number of sellers and buyers.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--requests", type=int, default=100, help="Timed requests of every scenario.")
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--memory-requests", type=int, default=5, help="Requests traced for peak memory.")
+        parser.add_argument("--output", help="File the results are written to, printed when not given.")
+        parser.add_argument("--baseline", help="File of earlier results to compare with.")
+        parser.add_argument("--threshold", type=float, default=10, help="Percent a route may slow down by.")
+        parser.add_argument("--fail-on-regression", action="store_true")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test database and its catalog.")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive")
+
+    def load_baseline(self, path):
+        """
+        Method to read the results of an earlier run.
+        """
+        try:
+            with open(path) as baseline_file:
+                return json.load(baseline_file)
+        except (OSError, ValueError) as error:
+            raise CommandError("Baseline {} cannot be read: {}".format(path, error))
+
+    def benchmark(self, options):
+        """
+        Method to generate the catalog when it is missing and measure every route.
+        """
+        generator = CatalogGenerator(scale=options["scale"], seed=options["seed"], batch_size=options["batch_size"])
+        started = time.perf_counter()
+        if generator.is_generated():
+            dataset = generator.get_counts()
+            self.stderr.write("Reusing the catalog of the kept test database.")
+        else:
+            dataset = generator.run()
+            self.stderr.write("Catalog generated in {:.1f} seconds.".format(time.perf_counter() - started))
+
+        cache.clear()
+        benchmark = EndpointBenchmark(
+            requests=options["requests"], warmup=options["warmup"], memory_requests=options["memory_requests"],
+        )
+        routes, skipped = benchmark.run()
+        return {
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+            },
+            "options": {
+                name: options[name] for name in ("scale", "seed", "requests", "warmup", "memory_requests")
+            },
+            "dataset": dataset,
+            "routes": routes,
+            "skipped_routes": skipped,
+        }
+
+    def handle(self, *args, **options):
+        """
+        Method to run the benchmark in a test database, compare it with the baseline and write the results.
+        """
+        baseline = self.load_baseline(options["baseline"]) if options["baseline"] else None
+        verbosity = options["verbosity"]
+        old_name = settings.DATABASES[connection.alias]["NAME"]
+        connection.creation.create_test_db(
+            verbosity=verbosity, autoclobber=not options["interactive"], keepdb=options["keepdb"],
+        )
+        try:
+            # replicas and the debug query log would measure another database and a growing log.
+            with override_settings(DEBUG=False, REPLICA_DATABASES=()):
+                results = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=options["keepdb"])
+
+        if baseline is not None:
+            results["comparison"] = compare_results(results["routes"], baseline.get("routes", {}), options["threshold"])
+            results["comparison"]["baseline"] = options["baseline"]
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                output_file.write(output + "\n")
+            self.stderr.write("Results written to {}.".format(options["output"]))
+        else:
+            self.stdout.write(output)
+
+        regressions = results.get("comparison", {}).get("regressions")
+        if regressions and options["fail_on_regression"]:
+            raise CommandError("Routes regressed against the baseline: {}".format(", ".join(regressions)))
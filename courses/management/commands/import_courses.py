@@ -0,0 +1,53 @@
+"""
+File for the command bulk importing courses, chapters and lessons.
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.importers import CourseImporter, read_csv_rows, read_jsonl_rows
+
+
+class Command(BaseCommand):
+    """
+    Class for streaming CSV or JSONL files of courses, chapters and lessons into the database.
+    """
+    help = "Import courses, chapters and lessons from CSV or JSONL files in batches."
+
+    def add_arguments(self, parser):
+        """
+        Method to add the arguments of the command.
+        """
+        parser.add_argument("paths", nargs="+")
+        parser.add_argument("--format", choices=("csv", "jsonl"), default=None)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def get_rows(self, path, file_format):
+        """
+        Method to get the row reader of a file, from its extension when no format is given.
+        """
+        if not os.path.isfile(path):
+            raise CommandError("File {} does not exist.".format(path))
+        file_format = file_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        return read_csv_rows(path) if file_format == "csv" else read_jsonl_rows(path)
+
+    def handle(self, *args, **options):
+        """
+        Method to import every file and print the created rows and the row errors.
+        """
+        started = time.perf_counter()
+        for path in options["paths"]:
+            importer = CourseImporter(batch_size=options["batch_size"])
+            try:
+                importer.run(self.get_rows(path, options["format"]))
+            except ValueError as error:
+                raise CommandError(str(error))
+
+            for error in importer.errors:
+                self.stderr.write(error)
+            self.stdout.write("{}: {} courses, {} chapters and {} lessons imported with {} errors.".format(
+                path, importer.created["courses"], importer.created["chapters"], importer.created["lessons"],
+                len(importer.errors),
+            ))
+        self.stdout.write("Finished in {:.1f} seconds.".format(time.perf_counter() - started))
@@ -0,0 +1,91 @@
+# Generated by Django 5.0.1 on 2024-04-02 10:15
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+RATING_STAR_FIELDS = {
+    1: "rating_one_count",
+    2: "rating_two_count",
+    3: "rating_three_count",
+    4: "rating_four_count",
+    5: "rating_five_count",
+}
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    """
+    Function to compute the rating aggregates of the existing courses.
+    """
+    Courses = apps.get_model("courses", "Courses")
+    CourseRatings = apps.get_model("courses", "CourseRatings")
+
+    stars = defaultdict(dict)
+    for row in CourseRatings.objects.order_by().values("course", "rating").annotate(count=Count("id")):
+        stars[row["course"]][row["rating"]] = row["count"]
+
+    courses = []
+    for course in Courses.objects.filter(id__in=list(stars)).only("id"):
+        course_stars = stars[course.id]
+        course.rating_count = sum(course_stars.values())
+        course.rating_sum = sum(rating * count for rating, count in course_stars.items())
+        course.rating = course.rating_sum / course.rating_count
+        for rating, field in RATING_STAR_FIELDS.items():
+            setattr(course, field, course_stars.get(rating, 0))
+        courses.append(course)
+    Courses.objects.bulk_update(
+        courses, ["rating", "rating_count", "rating_sum"] + list(RATING_STAR_FIELDS.values()), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courses',
+            name='rating',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='rating_one_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='rating_two_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='rating_three_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='rating_four_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='rating_five_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.1 on 2024-04-05 09:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_structure_summary(apps, schema_editor):
+    """
+    Function to compute the duration and counts of the existing chapters and courses.
+    """
+    Courses = apps.get_model("courses", "Courses")
+    CourseChapter = apps.get_model("courses", "CourseChapter")
+    CourseLesson = apps.get_model("courses", "CourseLesson")
+
+    lessons = CourseLesson.objects.filter(chapter=OuterRef("id")).order_by().values("chapter")
+    CourseChapter.objects.update(
+        duration=Subquery(lessons.annotate(total=Sum("duration")).values("total")[:1]),
+        lessons_count=Coalesce(Subquery(lessons.annotate(count=Count("id")).values("count")[:1]), 0),
+    )
+
+    lessons = CourseLesson.objects.filter(chapter__course=OuterRef("id")).order_by().values("chapter__course")
+    chapters = CourseChapter.objects.filter(course=OuterRef("id")).order_by().values("course")
+    Courses.objects.update(
+        duration=Subquery(lessons.annotate(total=Sum("duration")).values("total")[:1]),
+        lessons_count=Coalesce(Subquery(lessons.annotate(count=Count("id")).values("count")[:1]), 0),
+        chapters_count=Coalesce(Subquery(chapters.annotate(count=Count("id")).values("count")[:1]), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_courses_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courses',
+            name='duration',
+            field=models.DurationField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='chapters_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursechapter',
+            name='duration',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='coursechapter',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_structure_summary, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 import random
 
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 from common.models import (
     CourseCategory,
@@ -24,6 +24,29 @@ class Courses(CustomModelMixin):
     sub_category = models.ForeignKey(SubCourseCategory, null=True, blank=False, on_delete=models.CASCADE)
     course_status = models.CharField(max_length=50, null=False, blank=False, choices=CourseStatusChoices)
     sale_price = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=False)
+    rating = models.FloatField(null=False, blank=False, default=0, db_index=True)
+    rating_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    rating_sum = models.PositiveIntegerField(null=False, blank=False, default=0)
+    rating_one_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    rating_two_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    rating_three_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    rating_four_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    rating_five_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    duration = models.DurationField(null=True, blank=True, db_index=True)
+    chapters_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    lessons_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+
+    rating_star_fields = {
+        1: "rating_one_count",
+        2: "rating_two_count",
+        3: "rating_three_count",
+        4: "rating_four_count",
+        5: "rating_five_count",
+    }
+    aggregate_fields = (
+        "rating", "rating_count", "rating_sum", "rating_one_count", "rating_two_count", "rating_three_count",
+        "rating_four_count", "rating_five_count", "duration", "chapters_count", "lessons_count",
+    )
 
     def save(self, *args, **kwargs):
 
@@ -42,6 +65,15 @@ class CourseChapter(CustomModelMixin):
     title = models.CharField(max_length=500, null=False, blank=False)
     course = models.ForeignKey(Courses, null=False, blank=False, on_delete=models.CASCADE, related_name="course_chapter")
     order_no = models.IntegerField(null=False, blank=False)
+    duration = models.DurationField(null=True, blank=True)
+    lessons_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+
+    aggregate_fields = ("duration", "lessons_count")
+
+    def save(self, *args, **kwargs):
+        # keep the structure summary of the course in the same transaction as the chapter.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
 
 
 class CourseLesson(CustomModelMixin):
@@ -54,6 +86,11 @@ class CourseLesson(CustomModelMixin):
     order_no = models.IntegerField(null=False, blank=False)
     duration = models.DurationField(null=False, blank=False)
 
+    def save(self, *args, **kwargs):
+        # keep the structure summary of the chapter and course in the same transaction as the lesson.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
 
 class CourseRatings(CustomModelMixin):
     """
@@ -65,6 +102,11 @@ class CourseRatings(CustomModelMixin):
     title = models.CharField(max_length=500, null=False, blank=False)
     description = models.TextField(null=True, blank=False)
 
+    def save(self, *args, **kwargs):
+        # keep the rating aggregates of the course in the same transaction as the rating.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
 
 class EnrolledCourses(CustomModelMixin):
     """
@@ -1,13 +1,15 @@
-from datetime import timedelta, datetime
+from datetime import datetime
 from rest_framework import serializers
-from django.db.models import F, Sum
+from django.db import models
+from django.db.models import prefetch_related_objects
 
+from .entitlements import get_entitlements
+from .loaders import CourseBatchLoader
 from .models import (
     Courses,
     CourseLesson,
     CourseRatings,
     CourseChapter,
-    EnrolledCourses,
 )
 from users.serializers import (
     RetrieveSellerSerializer,
@@ -16,12 +18,12 @@ from common.serializers import (
     RetrieveCourseCategorySerializer,
     RetrieveCourseSubCategorySerializer,
 )
-from utilities.permissions import (
-    IsSellerPermission,
-    IsSuperAdminPermission,
+from utilities.mixins import (
+    CompiledSerializerMixin,
+    DynamicFieldsSerializerMixin,
+    PreSignedUrlListSerializer,
+    PreSignedUrlSerializerMixin,
 )
-from utilities.aws import generate_pre_signed_url
-from utilities.mixins import DynamicFieldsSerializerMixin
 
 
 class ChangeCourseSerializer(serializers.ModelSerializer):
@@ -34,8 +36,8 @@ class ChangeCourseSerializer(serializers.ModelSerializer):
         """
         Method to update is available for published
         """
-        chapters_count = CourseChapter.objects.filter(course=obj.id).count()
-        lesson_count = CourseLesson.objects.filter(chapter__course=obj.id).count()
+        chapters_count = obj.chapters_count
+        lesson_count = obj.lessons_count
         if obj.title and obj.short_description and obj.description and obj.what_student_learn and obj.requirements and obj.level and obj.audio_language and obj.category and obj.sub_category and obj.course_thumbnail_image and obj.course_thumbnail_video and obj.course_price and obj.sale_price and chapters_count > 0 and lesson_count > 0 and (
                 obj.course_status == "DRAFT" or obj.course_status == "UN_PUBLISHED"):
             return True
@@ -52,7 +54,24 @@ class ChangeCourseSerializer(serializers.ModelSerializer):
         }
 
 
-class RetrieveCourseSerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
+class RetrieveCourseListSerializer(serializers.ListSerializer):
+    """
+    List serializer class for loading the related data of all courses at once.
+    """
+
+    def to_representation(self, data):
+        """
+        Method to attach a batch loader for the courses before serializing them.
+        """
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        courses = list(iterable)
+        if "seller" in self.child.fields:
+            prefetch_related_objects(courses, "seller")
+        self.context["course_loader"] = CourseBatchLoader(courses, self.context)
+        return super().to_representation(courses)
+
+
+class RetrieveCourseSerializer(CompiledSerializerMixin, DynamicFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer class for getting courses.
     """
@@ -67,62 +86,68 @@ class RetrieveCourseSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
     lesson_count = serializers.SerializerMethodField(read_only=True)
     is_available_for_published = serializers.SerializerMethodField(read_only=True)
 
+    def get_course_loader(self, obj):
+        """
+        Method to get the batch loader holding the related data of the course.
+        """
+        loader = self.context.get("course_loader", None)
+        if loader is None or not loader.has_course(obj.id):
+            loader = self.context["course_loader"] = CourseBatchLoader([obj], self.context)
+        return loader
+
     def get_lesson_count(self, obj):
         """
         Method to get chapter count
         """
-        lesson_count = CourseLesson.objects.filter(chapter__course=obj.id).count()
-        return lesson_count
+        return obj.lessons_count
 
     def get_category_obj(self, obj):
         """
         Method to get category_obj
         """
+        self.get_course_loader(obj).load_categories()
         category_obj = obj.category
         if category_obj:
-            return RetrieveCourseCategorySerializer(category_obj, many=False,
-                                                    fields=self.context.get("category_obj", None)).data
+            return self.get_nested_serializer("category_obj", RetrieveCourseCategorySerializer,
+                                              fields=self.context.get("category_obj", None)).to_representation(category_obj)
         return None
 
     def get_sub_category_obj(self, obj):
         """
         Method to get sub_category_obj
         """
+        self.get_course_loader(obj).load_categories()
         sub_category_obj = obj.sub_category
         if sub_category_obj:
-            return RetrieveCourseSubCategorySerializer(sub_category_obj, many=False,
-                                                       fields=self.context.get("sub_category_obj", None)).data
+            return self.get_nested_serializer("sub_category_obj", RetrieveCourseSubCategorySerializer,
+                                              fields=self.context.get("sub_category_obj", None)).to_representation(sub_category_obj)
         return None
 
     def get_chapters(self, obj):
         """
         Method to get chapters
         """
-        chapters = CourseChapter.objects.filter(course=obj.id).order_by("order_no")
+        chapters = self.get_course_loader(obj).get_chapters(obj.id)
         if chapters:
-            return RetrieveChapterSerializer(chapters, many=True, fields=self.context.get("chapters", None),
-                                             context=self.context).data
+            return self.get_nested_serializer("chapters", RetrieveChapterSerializer, many=True,
+                                              fields=self.context.get("chapters", None),
+                                              context=self.context).to_representation(chapters)
         return None
 
     def get_chapters_count(self, obj):
         """
         Method to get chapter count
         """
-        chapters_count = CourseChapter.objects.filter(course=obj.id).count()
-        return chapters_count
+        return obj.chapters_count
 
     def get_seller_obj(self, obj):
         """
         Method to get seller
         """
-        seller = obj.seller.seller_user.annotate(
-            user_first_name=F("user__first_name"),
-            user_last_name=F("user__last_name"),
-            user_profile_image=F("user__profile_image"),
-            user_profile_image_key=F("user__profile_image"),
-        ).get()
+        seller = self.get_course_loader(obj).get_seller_profile(obj.seller_id)
         if seller:
-            return RetrieveSellerSerializer(seller, many=False, fields=self.context.get("seller_obj", None)).data
+            return self.get_nested_serializer("seller_obj", RetrieveSellerSerializer,
+                                              fields=self.context.get("seller_obj", None)).to_representation(seller)
         return None
 
     def get_ratings_obj(self, obj):
@@ -130,32 +155,23 @@ class RetrieveCourseSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
         Method to get rating_obj
         """
         # list of reviews
-        reviews = CourseRatings.objects.filter(course=obj.id).annotate(
-            user_first_name=F("user__first_name"),
-            user_last_name=F("user__last_name"),
-            user_profile_image=F("user__profile_image"),
-            user_profile_image_key=F("user__profile_image"),
-        ).order_by("-created_at")
-
-        # calculate total number of ratings and reviews.
-        list_stars_rating = list(reviews.values_list("rating", flat=True))
-        sum_of_rating_star = sum(list_stars_rating)
-        length_of_rating_star = len(list_stars_rating)
+        reviews = self.get_course_loader(obj).get_reviews(obj.id)
+
+        # total number of ratings and reviews are kept on the course.
+        length_of_rating_star = obj.rating_count
         if length_of_rating_star > 0:
-            total_rating = round(sum_of_rating_star / length_of_rating_star, 2)
+            total_rating = round(obj.rating_sum / length_of_rating_star, 2)
         else:
             total_rating = 0
 
         # calculate all 5 star individual percentage.
-        all_star_count = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
         all_star_percentage = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
         if length_of_rating_star != 0:
-            for rating_star in list_stars_rating:
-                all_star_count[rating_star] += 1
-            for key, value in all_star_count.items():
-                all_star_percentage[key] = int((value / length_of_rating_star) * 100)
+            for key, field in Courses.rating_star_fields.items():
+                all_star_percentage[key] = int((getattr(obj, field) / length_of_rating_star) * 100)
 
-        reviews_list = RetrieveRatingSerializer(reviews, many=True, fields=self.context.get("review_obj", None)).data
+        reviews_list = self.get_nested_serializer("reviews_obj", RetrieveRatingSerializer, many=True,
+                                                  fields=self.context.get("review_obj", None)).to_representation(reviews)
         return {
             "total_rating": total_rating,
             "total_reviews_count": length_of_rating_star,
@@ -167,9 +183,9 @@ class RetrieveCourseSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
         """
         Method to get course duration.
         """
-        time_list = CourseLesson.objects.filter(chapter__course=obj.id).aggregate(total=Sum('duration'))
-        if time_list["total"]:
-            d = datetime(1, 1, 1) + time_list["total"]
+        total_duration = obj.duration
+        if total_duration:
+            d = datetime(1, 1, 1) + total_duration
             if d.day - 1 == 0:
                 total_time_as_time = "{0}:{1}:{2}".format(d.hour, d.minute, d.second)
             else:
@@ -201,6 +217,7 @@ class RetrieveCourseSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
                   "chapters", "chapters_count", "lesson_count", "ratings_obj", "enrolled_user_count", "course_duration",
                   "is_popular_badge", "is_new_badge", "is_available_for_published", "is_best_seller_badge",
                   "course_views")
+        list_serializer_class = RetrieveCourseListSerializer
 
 
 class ChangeChapterSerializer(serializers.ModelSerializer):
@@ -214,7 +231,7 @@ class ChangeChapterSerializer(serializers.ModelSerializer):
                   "updated_by", "created_at", "updated_at")
 
 
-class RetrieveChapterSerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
+class RetrieveChapterSerializer(CompiledSerializerMixin, DynamicFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer class for retrieve chapters.
     """
@@ -225,19 +242,20 @@ class RetrieveChapterSerializer(DynamicFieldsSerializerMixin, serializers.ModelS
         """
         Method to get lesson list.
         """
-        lessons = obj.chappter_lesson.all().order_by("order_no")
-        return RetrieveLessonSerializer(lessons, many=True, fields=self.context.get("lessons", None),
-                                        context=self.context).data
+        lessons = getattr(obj, "ordered_lessons", None)
+        if lessons is None:
+            lessons = obj.chappter_lesson.all().order_by("order_no")
+        return self.get_nested_serializer("lessons", RetrieveLessonSerializer, many=True,
+                                          fields=self.context.get("lessons", None),
+                                          context=self.context).to_representation(lessons)
 
     def get_lesson_summary(self, obj):
         """
         Method to get lesson summary.
         """
-        time_list = obj.chappter_lesson.all().values_list("duration", flat=True)
-        duration_in_sec = obj.chappter_lesson.all().aggregate(total=Sum('duration'))
-
-        if duration_in_sec["total"]:
-            d = datetime(1, 1, 1) + duration_in_sec["total"]
+        total_duration = obj.duration
+        if total_duration:
+            d = datetime(1, 1, 1) + total_duration
             if d.day - 1 == 0:
                 total_time_as_time = "{0}:{1}:{2}".format(d.hour, d.minute, d.second)
             else:
@@ -248,7 +266,7 @@ class RetrieveChapterSerializer(DynamicFieldsSerializerMixin, serializers.ModelS
             total_time_as_time = "00:00"
         return {
             "lessons_duration": total_time_as_time,
-            "lesson_count": len(time_list)
+            "lesson_count": obj.lessons_count
         }
 
     class Meta:
@@ -268,7 +286,8 @@ class ChangeLessonSerializer(serializers.ModelSerializer):
                   "updated_by", "created_at", "updated_at")
 
 
-class RetrieveLessonSerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
+class RetrieveLessonSerializer(PreSignedUrlSerializerMixin, CompiledSerializerMixin, DynamicFieldsSerializerMixin,
+                               serializers.ModelSerializer):
     """
     Serializer class for saving and updating lessons.
     """
@@ -289,35 +308,28 @@ class RetrieveLessonSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
         """
         Method to get video with proper permission.
         """
-        request = self.context.get("request", None)
-        if request and request.user.is_authenticated:
-            is_allowed = False
-            # check for super admin.
-            super_admin_perm = IsSuperAdminPermission()
-            if super_admin_perm.has_permission(request, self):
-                is_allowed = True
-
-            # check seller permission.
-            seller_perm = IsSellerPermission()
-            if not is_allowed and seller_perm.has_permission(request,
-                                                             self) and obj.chapter.course.seller.id == request.user.id:
-                is_allowed = True
-
-            if not is_allowed and EnrolledCourses.objects.filter(course=obj.chapter.course.id,
-                                                                 user=request.user.id).first():
-                is_allowed = True
-
-            if is_allowed:
+        entitlements = get_entitlements(self.context.get("request", None))
+        if entitlements:
+            # super admins, the seller of the course and enrolled users may watch.
+            course = obj.chapter.course
+            if entitlements.can_watch(course.id, course.seller_id):
                 return {
                     "url": obj.video,
-                    "key": generate_pre_signed_url(obj.video)
+                    "key": self.get_pre_signed_url(obj.video)
                 }
         return {}
 
+    def get_media_key(self, obj):
+        """
+        Method to get the media key signed for the lesson.
+        """
+        return obj.video
+
     class Meta:
         model = CourseLesson
         fields = ("id", "chapter", "title", "video_obj", "order_no", "duration", "is_deleted", "created_by",
                   "updated_by", "created_at", "updated_at")
+        list_serializer_class = PreSignedUrlListSerializer
 
 
 class ChangeRatingSerializer(serializers.ModelSerializer):
@@ -331,7 +343,8 @@ class ChangeRatingSerializer(serializers.ModelSerializer):
                   "updated_by", "created_at", "updated_at")
 
 
-class RetrieveRatingSerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
+class RetrieveRatingSerializer(PreSignedUrlSerializerMixin, CompiledSerializerMixin, DynamicFieldsSerializerMixin,
+                               serializers.ModelSerializer):
     """
     Serializer class for getting rating.
     """
@@ -344,10 +357,17 @@ class RetrieveRatingSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
         """
         Method to get profile_image.
         """
-        return generate_pre_signed_url(obj.user_profile_image)
+        return self.get_pre_signed_url(obj.user_profile_image)
+
+    def get_media_key(self, obj):
+        """
+        Method to get the media key signed for the rating.
+        """
+        return getattr(obj, "user_profile_image", None)
 
     class Meta:
         model = CourseRatings
         fields = ("id", "course", "user", "rating", "title", "description", "is_deleted", "created_by",
                   "updated_by", "created_at", "updated_at", "user_first_name", "user_last_name", "user_profile_image",
                   "user_profile_image_key")
+        list_serializer_class = PreSignedUrlListSerializer
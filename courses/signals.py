@@ -0,0 +1,259 @@
+"""
+File for keeping derived course data in sync with model changes.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .aggregates import (
+    apply_rating_change,
+    apply_seller_enrollment_change,
+    apply_seller_rating_change,
+    refresh_seller_statistics,
+    refresh_structure_summary,
+)
+from .fragments import invalidate_category_fragments, invalidate_course_fragments
+from .index import course_index
+from .entitlements import invalidate_enrolled_course_ids
+from .models import Courses, CourseChapter, CourseLesson, CourseRatings, EnrolledCourses
+from common.models import CourseCategory, SubCourseCategory
+from common.tree import invalidate_category_tree
+from users.models import CustomUser, SellerProfile
+from users.storefront import invalidate_seller_storefront
+
+
+def refresh_course_index(*course_ids):
+    """
+    Function to refresh the given courses in the course index once the transaction commits.
+    """
+    course_ids = {course_id for course_id in course_ids if course_id}
+    if course_ids:
+        transaction.on_commit(lambda: course_index.refresh_courses(course_ids))
+
+
+def invalidate_course_storefronts(*course_ids):
+    """
+    Function to expire the cached storefronts of the sellers of the given courses.
+    """
+    course_ids = {course_id for course_id in course_ids if course_id}
+    if course_ids:
+        invalidate_seller_storefront(*Courses.objects.filter(id__in=course_ids).values_list("seller", flat=True))
+
+
+def get_chapter_course_id(chapter_id):
+    """
+    Function to get the course id of a chapter.
+    """
+    return CourseChapter.objects.filter(id=chapter_id).values_list("course", flat=True).first()
+
+
+def is_deleted_with(origin, *parents):
+    """
+    Function to check if a delete cascades from one of the parent models, which refresh on their own.
+    """
+    if origin is None:
+        return False
+    model = getattr(origin, "model", None) or type(origin)
+    return issubclass(model, parents)
+
+
+@receiver(pre_save, sender=CourseChapter)
+def remember_previous_course(sender, instance, **kwargs):
+    """
+    Function to remember the course a chapter belonged to before it is saved.
+    """
+    instance._previous_course_id = None
+    if instance.pk is not None:
+        instance._previous_course_id = CourseChapter.objects.filter(id=instance.pk).values_list(
+            "course", flat=True
+        ).first()
+
+
+@receiver(pre_save, sender=CourseLesson)
+def remember_previous_chapter(sender, instance, **kwargs):
+    """
+    Function to remember the chapter, course and duration of a lesson before it is saved.
+    """
+    instance._previous_lesson = None
+    if instance.pk is not None:
+        instance._previous_lesson = CourseLesson.objects.filter(id=instance.pk).values_list(
+            "chapter", "chapter__course", "duration"
+        ).first()
+
+
+@receiver(pre_save, sender=Courses)
+def remember_previous_seller(sender, instance, **kwargs):
+    """
+    Function to remember the seller, status and category of a course before it is saved.
+    """
+    instance._previous_seller = None
+    if instance.pk is not None:
+        instance._previous_seller = Courses.objects.filter(id=instance.pk).values_list(
+            "seller", "course_status", "category"
+        ).first()
+
+
+@receiver(post_save, sender=Courses)
+@receiver(post_delete, sender=Courses)
+def course_changed(sender, instance, **kwargs):
+    """
+    Function to refresh a course in the course index, the statistics of its seller and the category tree when it moved or was (un)published.
+    """
+    refresh_course_index(instance.id)
+    invalidate_course_fragments(instance.id)
+    previous = getattr(instance, "_previous_seller", None)
+    invalidate_seller_storefront(instance.seller_id, previous and previous[0])
+    if previous is None or previous[:2] != (instance.seller_id, instance.course_status) or kwargs.get("created") is None:
+        refresh_seller_statistics({seller_id for seller_id in (instance.seller_id, previous and previous[0]) if seller_id})
+    if previous is None or previous[1:] != (instance.course_status, instance.category_id) or kwargs.get("created") is None:
+        invalidate_category_tree()
+
+
+@receiver(post_save, sender=CourseChapter)
+@receiver(post_delete, sender=CourseChapter)
+def chapter_changed(sender, instance, origin=None, **kwargs):
+    """
+    Function to refresh the structure summary and course index entry of the course of a chapter.
+    """
+    if is_deleted_with(origin, Courses):
+        return
+    previous_course_id = getattr(instance, "_previous_course_id", None)
+    invalidate_course_fragments(instance.course_id, previous_course_id)
+    # only a save may leave the summary unchanged, an instance saved earlier can still be deleted.
+    if "created" in kwargs and not kwargs["created"] and previous_course_id == instance.course_id:
+        return
+
+    course_ids = {course_id for course_id in (instance.course_id, previous_course_id) if course_id}
+    refresh_structure_summary(course_ids=course_ids)
+    refresh_course_index(*course_ids)
+    invalidate_course_storefronts(*course_ids)
+
+
+@receiver(post_save, sender=CourseLesson)
+@receiver(post_delete, sender=CourseLesson)
+def lesson_changed(sender, instance, origin=None, **kwargs):
+    """
+    Function to refresh the structure summary and course index entry of the chapter and course of a lesson.
+    """
+    if is_deleted_with(origin, Courses, CourseChapter):
+        return
+    previous = getattr(instance, "_previous_lesson", None)
+    course_id = get_chapter_course_id(instance.chapter_id)
+    invalidate_course_fragments(course_id, previous and previous[1])
+    if "created" in kwargs and previous and previous[0] == instance.chapter_id and previous[2] == instance.duration:
+        return
+
+    chapter_ids = {instance.chapter_id}
+    course_ids = {course_id}
+    if previous:
+        chapter_ids.add(previous[0])
+        course_ids.add(previous[1])
+    course_ids.discard(None)
+    refresh_structure_summary(chapter_ids=chapter_ids, course_ids=course_ids)
+    refresh_course_index(*course_ids)
+    invalidate_course_storefronts(*course_ids)
+
+
+@receiver(pre_save, sender=CourseRatings)
+def remember_previous_rating(sender, instance, **kwargs):
+    """
+    Function to remember the course and value of a rating before it is saved.
+    """
+    instance._previous_rating = None
+    if instance.pk is not None:
+        instance._previous_rating = CourseRatings.objects.filter(id=instance.pk).values_list(
+            "course", "rating"
+        ).first()
+
+
+@receiver(post_save, sender=CourseRatings)
+def rating_saved(sender, instance, **kwargs):
+    """
+    Function to update the rating aggregates and the course index after a rating is saved.
+    """
+    previous = getattr(instance, "_previous_rating", None)
+    invalidate_course_fragments(instance.course_id, previous and previous[0])
+    if previous == (instance.course_id, instance.rating):
+        return
+    if previous:
+        apply_rating_change(previous[0], previous[1], -1)
+        apply_seller_rating_change(previous[0], previous[1], -1)
+    apply_rating_change(instance.course_id, instance.rating, 1)
+    apply_seller_rating_change(instance.course_id, instance.rating, 1)
+    refresh_course_index(instance.course_id, previous[0] if previous else None)
+    invalidate_course_storefronts(instance.course_id, previous[0] if previous else None)
+
+
+@receiver(post_delete, sender=CourseRatings)
+def rating_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Function to update the rating aggregates and the course index after a rating is deleted.
+    """
+    if is_deleted_with(origin, Courses):
+        return
+    apply_rating_change(instance.course_id, instance.rating, -1)
+    apply_seller_rating_change(instance.course_id, instance.rating, -1)
+    refresh_course_index(instance.course_id)
+    invalidate_course_fragments(instance.course_id)
+    invalidate_course_storefronts(instance.course_id)
+
+
+@receiver(post_save, sender=CourseCategory)
+@receiver(post_delete, sender=CourseCategory)
+@receiver(post_save, sender=SubCourseCategory)
+@receiver(post_delete, sender=SubCourseCategory)
+@receiver(post_save, sender=SellerProfile)
+@receiver(post_delete, sender=SellerProfile)
+def facet_label_changed(sender, instance, **kwargs):
+    """
+    Function to refresh the facet labels of the course index and the rendered courses showing a category.
+    """
+    if sender in (CourseCategory, SubCourseCategory):
+        invalidate_category_fragments()
+    transaction.on_commit(course_index.refresh_dimensions)
+
+
+@receiver(post_save, sender=CustomUser)
+def seller_name_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Function to refresh the facet labels of the course index when a seller is renamed.
+    """
+    if created or (update_fields is not None and not {"first_name", "last_name"} & set(update_fields)):
+        return
+    if SellerProfile.objects.filter(user=instance).exists():
+        transaction.on_commit(course_index.refresh_dimensions)
+
+
+@receiver(pre_save, sender=EnrolledCourses)
+def remember_previous_enrollment(sender, instance, **kwargs):
+    """
+    Function to remember the course of an enrollment before it is saved.
+    """
+    instance._previous_enrolled_course_id = None
+    if instance.pk is not None:
+        instance._previous_enrolled_course_id = EnrolledCourses.objects.filter(id=instance.pk).values_list(
+            "course", flat=True
+        ).first()
+
+
+@receiver(post_save, sender=EnrolledCourses)
+@receiver(post_delete, sender=EnrolledCourses)
+def enrollment_changed(sender, instance, origin=None, **kwargs):
+    """
+    Function to update the student count of the seller and drop the cached enrolled courses of a user after an enrollment changed.
+    """
+    if kwargs.get("created") is None:
+        if not is_deleted_with(origin, Courses):
+            apply_seller_enrollment_change(instance.course_id, -1)
+            invalidate_course_storefronts(instance.course_id)
+    else:
+        previous_course_id = getattr(instance, "_previous_enrolled_course_id", None)
+        if previous_course_id != instance.course_id:
+            if previous_course_id:
+                apply_seller_enrollment_change(previous_course_id, -1)
+            apply_seller_enrollment_change(instance.course_id, 1)
+            invalidate_course_storefronts(instance.course_id, previous_course_id)
+
+    user_id = instance.user_id
+    invalidate_enrolled_course_ids(user_id)
+    transaction.on_commit(lambda: invalidate_enrolled_course_ids(user_id))
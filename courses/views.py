@@ -1,8 +1,7 @@
-from datetime import timedelta
+from uuid import uuid4
 
-from django.db.models import OuterRef, Sum, FloatField, Avg, Subquery, F, Count, Q, IntegerField, Value, CharField
-from django.db.models.functions import Coalesce, Concat
-from django_filters import filters, OrderingFilter
+from django.db.models import Prefetch
+from django.http import HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import status, filters
@@ -10,25 +9,28 @@ from rest_framework import status
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.settings import api_settings
 
-from common.models import CourseCategory, SubCourseCategory
+from courses.facets import CourseFacetEngine
 from courses.filters import CourseFilter
+from courses.fragments import CourseFragmentCache, get_fragment_timeout
+from courses.index import course_index
 from courses.models import CourseChapter, Courses, CourseLesson
 from courses.serializers import RetrieveCourseSerializer, RetrieveChapterSerializer, RetrieveLessonSerializer
-from users.models import SellerProfile
 from utilities import messages
-from utilities.mixins import DynamicFieldsViewMixin
+from utilities.authentication import CachedJWTAuthentication
+from utilities.mixins import DynamicFieldsViewMixin, FieldQueryPlan, StreamingListMixin
 from utilities.permissions import IsTokenValid, IsActiveUserPermission
-from utilities.utils import CustomPagination, ResponseInfo
+from utilities.utils import CustomPagination, KeysetPagination, ResponseInfo
 
 
-class ListCourseAPIView(DynamicFieldsViewMixin, ListAPIView):
+class ListCourseAPIView(StreamingListMixin, DynamicFieldsViewMixin, ListAPIView):
     """
     Class for creating api for listing courses.
     """
     permission_classes = [(IsAuthenticated & IsTokenValid & IsActiveUserPermission) | AllowAny]
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
+    use_read_replica = True
     serializer_class = RetrieveCourseSerializer
     pagination_class = CustomPagination
     filter_backends = (DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter)
@@ -36,6 +38,17 @@ class ListCourseAPIView(DynamicFieldsViewMixin, ListAPIView):
     search_fields = ['title']
     filterset_class = CourseFilter
     ordering_fields = ['sale_price', 'duration', "rating"]
+    field_query_plans = {
+        "seller": FieldQueryPlan(select_related=("seller",)),
+        "seller_obj": FieldQueryPlan(columns=("seller",)),
+        "category_obj": FieldQueryPlan(select_related=("category",)),
+        "sub_category_obj": FieldQueryPlan(select_related=("sub_category",)),
+        "chapters": FieldQueryPlan(),
+        "chapters_count": FieldQueryPlan(columns=("chapters_count",)),
+        "lesson_count": FieldQueryPlan(columns=("lessons_count",)),
+        "ratings_obj": FieldQueryPlan(columns=("rating_count", "rating_sum") + tuple(Courses.rating_star_fields.values())),
+        "course_duration": FieldQueryPlan(columns=("duration",)),
+    }
 
     def __init__(self, **kwargs):
         """
@@ -50,6 +63,9 @@ class ListCourseAPIView(DynamicFieldsViewMixin, ListAPIView):
         Method for get paginated query set.
         """
         pagination = self.request.GET.get("pagination", "False")
+        if pagination == "cursor":
+            self.pagination_class = KeysetPagination
+            return super().paginate_queryset(queryset)
         if pagination == "True" or pagination == "true":
             return super().paginate_queryset(queryset)
         return None
@@ -58,21 +74,59 @@ class ListCourseAPIView(DynamicFieldsViewMixin, ListAPIView):
         """
         Method to get queryset for course.
         """
-        subquery = CourseChapter.objects.filter(
-            course__id=OuterRef('id')
-        ).values('course__id').annotate(
-            total_duration=Sum('chappter_lesson__duration')
-        ).values('total_duration')[:1]
+        return self.plan_queryset(Courses.objects.filter(course_status="PUBLISHED").order_by("created_at"))
+
+    def get_query_columns(self, model):
+        """
+        Method to get the model columns used by the requested fields, with the seller the course fragments are keyed by.
+        """
+        columns = super().get_query_columns(model)
+        if columns is not None and get_fragment_timeout():
+            columns.add("seller")
+        return columns
+
+    def get_fragment_variant(self):
+        """
+        Method to get what the rendered JSON of a course depends on besides its data.
+        """
+        variant = ",".join(sorted(set(self.get_requested_fields() or ("*",))))
+        if "request" in self.get_serializer_context() and self.is_field_requested("chapters__lessons"):
+            # videos of lessons are only shown to the users allowed to watch them.
+            variant += ";user:{}".format(self.request.user.pk)
+        return variant
 
-        return Courses.objects.filter(course_status="PUBLISHED").annotate(
-            rating=Coalesce(Avg("course_rating__rating"), 0, output_field=FloatField()),
-            duration=Subquery(subquery),
-        ).order_by("created_at")
+    def get_fragment_response(self):
+        """
+        Method to get the course list with the cached JSON of each course spliced into the response envelope.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        courses = list(queryset) if page is None else page
+        data = CourseFragmentCache(self.get_fragment_variant()).render(
+            courses, lambda missing: self.get_serializer(missing, many=True).data
+        )
+
+        placeholder = "course_fragments:{}".format(uuid4().hex)
+        self.response_format["data"] = placeholder if page is None else self.get_paginated_response(placeholder).data
+        self.response_format["error"] = None
+        self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
+        self.response_format["message"] = [messages.SUCCESS]
+        content = self.render_json(self.response_format).replace(self.render_json(placeholder), data, 1)
+        return HttpResponse(content, content_type="application/json", status=self.status_code)
 
     def get(self, request, *args, **kwargs):
         """
         GET Method for getting course list.
         """
+        if self.is_streaming_requested():
+            self.response_format["error"] = None
+            self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
+            self.response_format["message"] = [messages.SUCCESS]
+            return self.get_streaming_response(self.filter_queryset(self.get_queryset()), self.response_format)
+
+        if get_fragment_timeout():
+            return self.get_fragment_response()
+
         course_serializer = super().list(request, *args, **kwargs)
 
         self.response_format["data"] = course_serializer.data
@@ -87,7 +141,8 @@ class CourseFilterListAPIView(DynamicFieldsViewMixin, ListAPIView):
     Class for creating api for listing courses.
     """
     permission_classes = [(IsAuthenticated & IsTokenValid & IsActiveUserPermission) | AllowAny]
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
+    use_read_replica = True
     serializer_class = RetrieveCourseSerializer
     pagination_class = CustomPagination
     filter_backends = (DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter)
@@ -113,178 +168,20 @@ class CourseFilterListAPIView(DynamicFieldsViewMixin, ListAPIView):
             return super().paginate_queryset(queryset)
         return None
 
-    def get_category(self, course_id):
-        """
-        Method to get category list
-        """
-        category_list = CourseCategory.objects.all().annotate(
-            label=F('name'),
-            value=F('id'),
-            count=Count("course_category__id", filter=Q(course_category__id__in=course_id)),
-        ).order_by("label").values("label", "value", "count")
-
-        for category in category_list:
-            subcategory_data = SubCourseCategory.objects.filter(category_id=category['value']).annotate(
-                label=F('name'),
-                value=F('id'),
-                count=Count("courses__id", filter=Q(courses__id__in=course_id)),
-            ).values('label', 'value', 'count')
-            category['subcategory'] = list(subcategory_data)
-
-        count = 0
-        category = list(category_list)
-        for category_obj in category:
-            count += category_obj["count"]
-
-        category.insert(0, {
-            "label": 'All',
-            "value": 0,
-            "count": count
-        })
-        return category
-
-    def get_rating(self, course_id):
-        """
-        Method to get rating list
-        """
-        queryset = Courses.objects.filter(id__in=course_id).annotate(
-            rating=Coalesce(Avg("course_rating__rating"), 0, output_field=IntegerField())
-        ).values("rating")
-
-        rating_three = queryset.filter(course_rating__rating__gte=3)
-        rating_three_five = queryset.filter(course_rating__rating__gte=3.5)
-        rating_four = queryset.filter(course_rating__rating__gte=4)
-        rating_four_five = queryset.filter(course_rating__rating__gte=4.5)
-
-        data = [
-            {
-                "label": 'All',
-                "value": 0,
-                "count": queryset.count()
-            },
-            {
-                "label": '4.5',
-                "value": 4.5,
-                "count": rating_four_five.count(),
-            },
-            {
-                "label": '4',
-                "value": 4,
-                "count": rating_four.count(),
-            },
-            {
-                "label": '3.5',
-                "value": 3.5,
-                "count": rating_three_five.count(),
-            },
-            {
-                "label": '3',
-                "value": 3,
-                "count": rating_three.count()
-            }
-        ]
-        return data
-
-    def get_seller(self, course_id):
-        """
-        Method to get seller list with course count
-        """
-        seller = SellerProfile.objects.all().annotate(
-            value=F('user__id'),
-            label=Concat(F('user__first_name'), Value(" "), F('user__last_name'), output_field=CharField()),
-            count=Count('user__course_seller__id', filter=Q(user__course_seller__id__in=course_id))
-        ).order_by("label").values("label", "value", "count")
-
-        count = 0
-        seller = list(seller)
-        for seller_obj in seller:
-            count += seller_obj["count"]
-
-        seller.insert(0, {
-            "label": "All",
-            "value": 0,
-            "count": count
-        })
-        return seller
-
-    def get_duration(self, course_id):
-        """
-        Method to get duration with course count
-        """
-        duration_4_to_compare = timedelta(hours=4, minutes=0, seconds=0)
-        duration_7_to_compare = timedelta(hours=7, minutes=0, seconds=0)
-        duration_20_to_compare = timedelta(hours=20, minutes=0, seconds=0)
-
-        subquery = CourseChapter.objects.filter(
-            course__id=OuterRef('id')
-        ).values('course__id').annotate(
-            total_duration=Sum('chappter_lesson__duration')
-        ).values('total_duration')[:1]
-
-        queryset = Courses.objects.filter(id__in=course_id).annotate(
-            duration=Subquery(subquery),
-        )
-
-        duration_4_less = queryset.filter(duration__lt=duration_4_to_compare)
-
-        duration_4_7_bet = queryset.filter(duration__gte=duration_4_to_compare, duration__lt=duration_7_to_compare)
-
-        duration_7_20_bet = queryset.filter(duration__gte=duration_7_to_compare, duration__lt=duration_20_to_compare)
-
-        duration_20_plus = queryset.filter(duration__gte=duration_20_to_compare)
-
-        data = [
-            {
-                "label": "All",
-                "value": 0,
-                "count": duration_4_less.count() + duration_4_7_bet.count() + duration_7_20_bet.count() + duration_20_plus.count()
-            },
-            {
-                "label": "Less than 4 hours",
-                "value": "4",
-                "count": duration_4_less.count()
-            },
-            {
-                "label": "4 - 7 hours ",
-                "value": "4-7",
-                "count": duration_4_7_bet.count()
-            },
-            {
-                "label": "7 - 20 hours",
-                "value": "7-20",
-                "count": duration_7_20_bet.count()
-            },
-            {
-                "label": "20 + hours",
-                "value": "20",
-                "count": duration_20_plus.count()
-            },
-        ]
-        return data
-
     def get_queryset(self):
         """
         Method to get queryset for course.
         """
-        subquery = CourseChapter.objects.filter(
-            course__id=OuterRef('id')
-        ).values('course__id').annotate(
-            total_duration=Sum('chappter_lesson__duration')
-        ).values('total_duration')[:1]
+        if course_index.is_enabled() and api_settings.SEARCH_PARAM not in self.request.query_params:
+            course_filter = self.filterset_class(self.request.query_params, request=self.request)
+            if course_filter.is_valid():
+                bits = course_index.get_filter_bits(course_filter.form.cleaned_data)
+                if bits is not None:
+                    return course_index.get_facets(bits)
 
-        course = Courses.objects.filter(course_status="PUBLISHED").annotate(
-            rating=Coalesce(Avg("course_rating__rating"), 0, output_field=FloatField()),
-            duration=Subquery(subquery)
-        ).order_by("created_at")
+        course = self.plan_queryset(Courses.objects.filter(course_status="PUBLISHED").order_by("created_at"))
         filter_course = self.filter_queryset(course)
-        course_id = list(filter_course.values_list("id", flat=True))
-        data = {
-            "category": self.get_category(course_id),
-            "rating": self.get_rating(course_id),
-            "seller": self.get_seller(course_id),
-            "duration": self.get_duration(course_id),
-        }
-        return data
+        return CourseFacetEngine(filter_course).get_facets()
 
     def get(self, request, *args, **kwargs):
         """
@@ -299,17 +196,25 @@ class CourseFilterListAPIView(DynamicFieldsViewMixin, ListAPIView):
         return Response(self.response_format, status=self.status_code)
 
 
-class ChapterListAPIView(DynamicFieldsViewMixin, ListAPIView):
+class ChapterListAPIView(StreamingListMixin, DynamicFieldsViewMixin, ListAPIView):
     """
     Class for creating api for listing chapters.
     """
     permission_classes = [(IsAuthenticated & IsTokenValid & IsActiveUserPermission) | AllowAny]
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
+    use_read_replica = True
     serializer_class = RetrieveChapterSerializer
     pagination_class = CustomPagination
-    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_fields = ("course",)
     ordering_fields = ("order_no",)
+    field_query_plans = {
+        "lessons": FieldQueryPlan(prefetch_related=(
+            Prefetch("chappter_lesson", queryset=CourseLesson.objects.order_by("order_no"), to_attr="ordered_lessons"),
+        )),
+        "lesson_summary": FieldQueryPlan(columns=("duration", "lessons_count")),
+        "lessons__video_obj": FieldQueryPlan(select_related=("course",)),
+    }
 
     def __init__(self, **kwargs):
         """
@@ -332,22 +237,27 @@ class ChapterListAPIView(DynamicFieldsViewMixin, ListAPIView):
         """
         Method to get queryset for course.
         """
-        return CourseChapter.objects.all()
+        return self.plan_queryset(CourseChapter.objects.all())
 
     def get_serializer_context(self):
         """
         Method to get serializer context.
         """
+        context = super().get_serializer_context()
         if self.request.user.is_authenticated:
-            return {
-                "request": self.request
-            }
-        return {}
+            context["request"] = self.request
+        return context
 
     def get(self, request, *args, **kwargs):
         """
         GET Method for getting chapter list.
         """
+        if self.is_streaming_requested():
+            self.response_format["error"] = None
+            self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
+            self.response_format["message"] = [messages.SUCCESS]
+            return self.get_streaming_response(self.filter_queryset(self.get_queryset()), self.response_format)
+
         chapter_serializer = super().list(request, *args, **kwargs)
 
         self.response_format["data"] = chapter_serializer.data
@@ -357,17 +267,21 @@ class ChapterListAPIView(DynamicFieldsViewMixin, ListAPIView):
         return Response(self.response_format, status=self.status_code)
 
 
-class LessonListAPIView(DynamicFieldsViewMixin, ListAPIView):
+class LessonListAPIView(StreamingListMixin, DynamicFieldsViewMixin, ListAPIView):
     """
     Class for creating api for listing lessons.
     """
     permission_classes = [(IsAuthenticated & IsTokenValid & IsActiveUserPermission) | AllowAny]  # TODO: Add permission for access lesson video
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
+    use_read_replica = True
     serializer_class = RetrieveLessonSerializer
     pagination_class = CustomPagination
-    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_fields = ("chapter",)
     ordering_fields = ("order_no",)
+    field_query_plans = {
+        "video_obj": FieldQueryPlan(select_related=("chapter__course",)),
+    }
 
     def __init__(self, **kwargs):
         """
@@ -390,12 +304,27 @@ class LessonListAPIView(DynamicFieldsViewMixin, ListAPIView):
         """
         Method to get queryset for lessons.
         """
-        return CourseLesson.objects.all()
+        return self.plan_queryset(CourseLesson.objects.all())
+
+    def get_serializer_context(self):
+        """
+        Method to get serializer context.
+        """
+        context = super().get_serializer_context()
+        if self.request.user.is_authenticated:
+            context["request"] = self.request
+        return context
 
     def get(self, request, *args, **kwargs):
         """
         GET Method for getting lessons list.
         """
+        if self.is_streaming_requested():
+            self.response_format["error"] = None
+            self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
+            self.response_format["message"] = [messages.SUCCESS]
+            return self.get_streaming_response(self.filter_queryset(self.get_queryset()), self.response_format)
+
         lesson_serializer = super().list(request, *args, **kwargs)
 
         self.response_format["data"] = lesson_serializer.data
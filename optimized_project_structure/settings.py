@@ -61,8 +61,11 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'utilities.middleware.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'utilities.middleware.ReadReplicaMiddleware',
+    'utilities.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'optimized_project_structure.urls'
@@ -86,8 +89,8 @@ TEMPLATES = [
 
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTIACTION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'utilities.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS':
         ('django_filters.rest_framework.DjangoFilterBackend',),
@@ -104,15 +107,52 @@ REST_FRAMEWORK = {
 print(os.getenv("DB_NAME"))
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'utilities.mysql_pool',
         'NAME': os.getenv("DB_NAME"),
         'USER': os.getenv("DB_USER"),
         'PASSWORD': os.getenv("DB_PASSWORD"),
         'PORT': os.getenv("DB_PORT"),
-        'HOST': os.getenv("DB_HOST")
+        'HOST': os.getenv("DB_HOST"),
+        # connections are given back to the pool of the process at the end of every request.
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+            'MAX_SIZE': int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            'TIMEOUT': float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            'MAX_IDLE': float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+            'MAX_LIFETIME': float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+            'CHECK_INTERVAL': float(os.getenv("DB_POOL_CHECK_INTERVAL", 10)),
+        },
     }
 }
 
+# Read replicas of the default database as comma separated hosts, read by the views with use_read_replica
+# only when the cache is shared, as it keeps the clients that wrote and the replicas that failed.
+REPLICA_DATABASES = []
+for replica_number, replica_host in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1):
+    DATABASES["replica_{}".format(replica_number)] = dict(DATABASES["default"], HOST=replica_host.strip(), TEST={"MIRROR": "default"})
+    REPLICA_DATABASES.append("replica_{}".format(replica_number))
+
+DATABASE_ROUTERS = ["utilities.routers.ReadReplicaRouter"]
+
+# Seconds a client reads from the primary after it wrote, so it reads its own writes.
+REPLICA_STICKY_SECONDS = 5
+
+# Seconds a replica which failed is skipped for.
+REPLICA_UNHEALTHY_SECONDS = 30
+
+# Cache shared by every worker process, the in-process caches are invalidated through versions kept in it.
+if os.getenv("CACHE_REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("CACHE_REDIS_URL"),
+        }
+    }
+
+# Seconds other processes may use stale cached data for when no shared cache is configured.
+LOCAL_CACHE_STALE_SECONDS = 5
+
 WSGI_APPLICATION = 'optimized_project_structure.wsgi.application'
 
 # Password validation
@@ -175,6 +215,44 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Answer course filters and facets from the in-memory course index.
+COURSE_INDEX_ENABLED = True
+
+# Most courses a filter answered by the course index is sent to the database as an id list, larger matches are filtered in SQL.
+COURSE_INDEX_MAX_FILTER_IDS = 1000
+
+# Seconds the enrolled course ids of a user are cached for video entitlements, 0 to disable.
+ENTITLEMENT_CACHE_TIMEOUT = 300
+
+# Seconds a seller storefront is cached for until its content changes, 0 to disable.
+SELLER_STOREFRONT_CACHE_TIMEOUT = 300
+
+# Seconds the rendered JSON of a course is cached for until its content changes, 0 to disable.
+COURSE_FRAGMENT_CACHE_TIMEOUT = 300
+
+# Record the query count, database time and duplicated statements of every request.
+QUERY_INSTRUMENTATION_ENABLED = True
+
+# Let staff users profile a request with the X-Profile header or the profile parameter, off unless set to "True".
+REQUEST_PROFILER_ENABLED = os.getenv("REQUEST_PROFILER_ENABLED", "False") == "True"
+
+# Most queries each endpoint may run by URL name, whatever the number of rows or the page size.
+QUERY_BUDGETS = {
+    "list-course": 6,
+    "list-seller-course": 6,
+    "chapterL-lst": 7,
+    "lesson-list": 5,
+    "login": 4,
+    "get-seller-list": 4,
+    "get-seller-details": 6,
+    "get-course-category-list": 3,
+    "get-course-sub-category-list": 3,
+    "get-process-stats": 3,
+}
+
+# Threads allowed to check login passwords at the same time, the number of CPUs when not set.
+LOGIN_PASSWORD_WORKERS = int(os.getenv("LOGIN_PASSWORD_WORKERS", 0)) or None
+
 LOGGING_DIR = os.path.join(BASE_DIR, 'log')
 LOGGING = {
    'version': 1,
@@ -232,5 +310,10 @@ LOGGING = {
            'level': 'DEBUG',
            'propagate': True,
        },
+       'utilities': {
+           'handlers': ['debug_logs', 'warning', 'error', 'info', 'critical_logs'],
+           'level': 'DEBUG',
+           'propagate': True,
+       },
    },
 }
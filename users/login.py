@@ -0,0 +1,52 @@
+"""
+File for the login pipeline, which loads a user in one query and checks its password on a bounded pool.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.db.models import OuterRef, Subquery
+
+from .models import CustomUser, SellerProfile
+
+
+def get_password_workers():
+    """
+    Function to get the number of threads allowed to hash passwords at the same time.
+    """
+    return getattr(settings, "LOGIN_PASSWORD_WORKERS", None) or os.cpu_count() or 1
+
+
+password_pool = ThreadPoolExecutor(max_workers=get_password_workers(), thread_name_prefix="login-password")
+
+
+def get_login_user(email):
+    """
+    Function to load a user with its role and seller slug in one query, or None when there is no such user.
+    """
+    seller_slug = SellerProfile.objects.filter(user=OuterRef("id")).order_by("id").values("slug_name")[:1]
+    return CustomUser.objects.select_related("role_permission").annotate(
+        seller_slug=Subquery(seller_slug)
+    ).filter(email=email).first()
+
+
+def verify_password(user, password):
+    """
+    Function to check the password of a user on the password pool, like ModelBackend.authenticate.
+
+    Hashing is CPU bound, so at most LOGIN_PASSWORD_WORKERS checks run at once and
+    a burst of logins queues here instead of taking the CPU from other requests. A
+    missing user still pays for one hash so the response time does not reveal it.
+    """
+    if user is None:
+        password_pool.submit(make_password, password).result()
+        return False
+
+    if not password_pool.submit(check_password, password, user.password).result():
+        return False
+
+    if identify_hasher(user.password).must_update(user.password):
+        user.set_password(password)
+        user.save(update_fields=["password"])
+    return user.is_active
@@ -0,0 +1,73 @@
+"""
+File for the command measuring login throughput.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+
+from users.login import get_password_workers
+from users.views import LoginAPIView
+
+
+class Command(BaseCommand):
+    """
+    Class for posting logins of an existing user to the login view and reporting logins per second per core.
+    """
+    help = "Measure the login throughput of an existing user in logins per second per core."
+
+    def add_arguments(self, parser):
+        """
+        Method to add the arguments of the command.
+        """
+        parser.add_argument("--email", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--role", default="USER")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1)
+
+    def login(self, options):
+        """
+        Method to post one login to the login view and get its status code.
+        """
+        request = APIRequestFactory().post(
+            "/api/users/login",
+            {"email": options["email"], "password": options["password"], "role": options["role"]},
+            format="json",
+        )
+        return LoginAPIView.as_view()(request).status_code
+
+    def login_in_thread(self, options):
+        """
+        Method to post one login from a worker thread, closing the connections it opened.
+        """
+        try:
+            return self.login(options)
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        """
+        Method to run the logins and print the throughput.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            status_code = self.login(options)
+        if status_code != status.HTTP_200_OK:
+            raise CommandError("Login failed with status {}.".format(status_code))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            status_codes = list(executor.map(lambda index: self.login_in_thread(options), range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        cores = min(options["concurrency"], get_password_workers(), os.cpu_count() or 1)
+        rate = len(status_codes) / elapsed
+        self.stdout.write("queries per login: {}".format(len(queries)))
+        self.stdout.write("failed logins: {}".format(sum(code != status.HTTP_200_OK for code in status_codes)))
+        self.stdout.write("logins per second: {:.1f}".format(rate))
+        self.stdout.write("logins per second per core: {:.1f} ({} cores)".format(rate / cores, cores))
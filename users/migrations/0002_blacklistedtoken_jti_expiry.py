@@ -0,0 +1,74 @@
+# Generated by Django 5.0.1 on 2024-04-09 11:20
+
+from datetime import datetime, timezone
+
+import jwt
+from django.db import migrations, models
+
+
+def set_jti_and_expiry(apps, schema_editor):
+    """
+    Function to move the blacklisted tokens to their jti and expiry, dropping the ones which expired.
+    """
+    BlackListedToken = apps.get_model("users", "BlackListedToken")
+    now = datetime.now(timezone.utc)
+    for blacklisted in BlackListedToken.objects.all():
+        try:
+            payload = jwt.decode(blacklisted.token, options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            payload = {}
+        if not payload.get("jti") or not payload.get("exp"):
+            blacklisted.delete()
+            continue
+
+        expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+        if expires_at <= now or BlackListedToken.objects.filter(jti=payload["jti"]).exists():
+            blacklisted.delete()
+            continue
+        blacklisted.jti = payload["jti"]
+        blacklisted.expires_at = expires_at
+        blacklisted.save(update_fields=["jti", "expires_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='jti',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='expires_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(set_jti_and_expiry, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='blacklistedtoken',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='blacklistedtoken',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='jti',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='timestamp',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.1 on 2024-04-11 10:15
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def backfill_seller_statistics(apps, schema_editor):
+    """
+    Function to compute the rating, student and published course statistics of the existing sellers.
+    """
+    SellerProfile = apps.get_model("users", "SellerProfile")
+    Courses = apps.get_model("courses", "Courses")
+    EnrolledCourses = apps.get_model("courses", "EnrolledCourses")
+
+    courses = Courses.objects.filter(seller=OuterRef("user"), course_status="PUBLISHED").order_by().values("seller")
+    students = EnrolledCourses.objects.filter(course__seller=OuterRef("user")).order_by().values("course__seller")
+    SellerProfile.objects.update(
+        rating_sum=Coalesce(Subquery(courses.annotate(total=Sum("rating_sum")).values("total")[:1]), 0),
+        rating_count=Coalesce(Subquery(courses.annotate(total=Sum("rating_count")).values("total")[:1]), 0),
+        courses_count=Coalesce(Subquery(courses.annotate(count=Count("id")).values("count")[:1]), 0),
+        student_count=Coalesce(Subquery(students.annotate(count=Count("id")).values("count")[:1]), 0),
+    )
+    SellerProfile.objects.update(
+        rating=Coalesce(
+            Cast(F("rating_sum"), FloatField()) / NullIf(F("rating_count"), Value(0)),
+            Value(0.0), output_field=FloatField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_blacklistedtoken_jti_expiry'),
+        ('courses', '0004_course_structure_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='courses_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='rating',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='student_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_seller_statistics, migrations.RunPython.noop),
+    ]
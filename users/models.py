@@ -69,14 +69,9 @@ class BlackListedToken(models.Model):
     """
     Class for creating blacklisted tokens which have already been used.
     """
-    token = models.CharField(max_length=500)
-    timestamp = models.DateTimeField(auto_now=True)
-
-    class Meta:
-        """
-        Class container containing information of the model.
-        """
-        unique_together = ("token",)
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    timestamp = models.DateTimeField(auto_now=True, db_index=True)
 
 
 class SellerProfile(CustomModelMixin):
@@ -91,6 +86,13 @@ class SellerProfile(CustomModelMixin):
     twitter_link = models.CharField(max_length=2000, null=True, blank=False)
     instagram_link = models.CharField(max_length=2000, null=True, blank=False)
     linkedin_link = models.CharField(max_length=2000, null=True, blank=False)
+    rating = models.FloatField(null=False, blank=False, default=0, db_index=True)
+    rating_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    rating_sum = models.PositiveIntegerField(null=False, blank=False, default=0)
+    student_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+    courses_count = models.PositiveIntegerField(null=False, blank=False, default=0)
+
+    aggregate_fields = ("rating", "rating_count", "rating_sum", "student_count", "courses_count")
 
     def save(self, *args, **kwargs):
         if self.pk:
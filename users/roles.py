@@ -0,0 +1,173 @@
+"""
+File for the in-process registry of roles and their bitmask checks.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from .models import RolesPermission
+from utilities.cache import bound_staleness, bump_cache_version, get_cache_version
+
+
+ROLE_TYPES = ("SUPER_ADMIN", "SELLER", "BUYER", "STUDENT", "MENTOR")
+ROLE_BITS = {role_type: 1 << position for position, role_type in enumerate(ROLE_TYPES)}
+
+
+def get_role_mask(role_types):
+    """
+    Function to get the bitmask of a list of role types, ignoring the ones which are not known.
+    """
+    mask = 0
+    for role_type in role_types or ():
+        mask |= ROLE_BITS.get(role_type, 0)
+    return mask
+
+
+class Role(namedtuple("Role", ("id", "name", "role_types", "mask"))):
+    """
+    Class for an immutable role entry of the registry.
+    """
+    __slots__ = ()
+
+
+class RoleRegistry(object):
+    """
+    Class for looking up roles by name, role type and id without a query.
+
+    Roles are loaded once per process and reloaded when the shared version is
+    bumped after a role changed, every refresh_interval seconds in case a change
+    was missed, or when a lookup misses a role another process may have created.
+    """
+    version_name = "roles"
+    refresh_interval = 60
+    miss_reload_interval = 1
+
+    def __init__(self):
+        """
+        Constructor function for setting up an empty registry.
+        """
+        self.lock = threading.Lock()
+        self.version = None
+        self.loaded_at = 0
+        self.roles = {}
+        self.roles_by_name = {}
+        self.role_ids_by_type = {}
+
+    def load(self):
+        """
+        Method to load every role and index it by id, name and role type.
+        """
+        version = get_cache_version(self.version_name)
+        roles = {}
+        roles_by_name = {}
+        role_ids_by_type = {}
+        for role_id, name, role_types in RolesPermission.objects.order_by("id").values_list(
+            "id", "role_name", "role_type"
+        ):
+            role_types = tuple(role_types or ())
+            role = Role(id=role_id, name=name, role_types=role_types, mask=get_role_mask(role_types))
+            roles[role_id] = role
+            roles_by_name.setdefault(name, role)
+            for role_type in role_types:
+                role_ids_by_type.setdefault(role_type, []).append(role_id)
+
+        self.roles = roles
+        self.roles_by_name = roles_by_name
+        self.role_ids_by_type = {role_type: tuple(ids) for role_type, ids in role_ids_by_type.items()}
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """
+        Method to reload the roles when another process changed them or they are due.
+        """
+        if not self.is_stale():
+            return
+        with self.lock:
+            if self.is_stale():
+                self.load()
+
+    def is_stale(self):
+        """
+        Method to tell if the roles were changed by another process or are due for a reload.
+        """
+        return (
+            self.version != get_cache_version(self.version_name)
+            or time.monotonic() - self.loaded_at >= bound_staleness(self.refresh_interval)
+        )
+
+    def reload_on_miss(self):
+        """
+        Method to reload the roles after a lookup missed, at most once every miss_reload_interval seconds.
+        """
+        with self.lock:
+            if time.monotonic() - self.loaded_at >= self.miss_reload_interval:
+                self.load()
+
+    def invalidate(self):
+        """
+        Method to reload the roles in this and every other process on their next lookup.
+        """
+        self.version = None
+        bump_cache_version(self.version_name)
+
+    def get_role(self, role_id):
+        """
+        Method to get a role by id, or None when there is no such role.
+        """
+        self.ensure_fresh()
+        if role_id is not None and role_id not in self.roles:
+            self.reload_on_miss()
+        return self.roles.get(role_id)
+
+    def get_role_by_name(self, name):
+        """
+        Method to get a role by name, or None when there is no such role.
+        """
+        self.ensure_fresh()
+        if name not in self.roles_by_name:
+            self.reload_on_miss()
+        return self.roles_by_name.get(name)
+
+    def get_role_ids(self, role_type):
+        """
+        Method to get the ids of the roles having a role type, lowest first.
+        """
+        self.ensure_fresh()
+        if role_type not in self.role_ids_by_type:
+            self.reload_on_miss()
+        return self.role_ids_by_type.get(role_type, ())
+
+    def get_role_id(self, role_type):
+        """
+        Method to get the id of the first role having a role type, or None when there is none.
+        """
+        role_ids = self.get_role_ids(role_type)
+        return role_ids[0] if role_ids else None
+
+    def get_mask(self, role_id):
+        """
+        Method to get the bitmask of the role types of a role.
+        """
+        role = self.get_role(role_id)
+        return role.mask if role is not None else 0
+
+
+role_registry = RoleRegistry()
+
+
+def get_user_role_mask(user):
+    """
+    Function to get the role bitmask of a user, from its principal when it was authenticated with one.
+    """
+    principal = getattr(user, "principal", None)
+    if principal is not None:
+        return principal.role_mask
+    return role_registry.get_mask(getattr(user, "role_permission_id", None))
+
+
+def has_role(user, *role_types):
+    """
+    Function to check if a user has any of the role types.
+    """
+    return bool(get_user_role_mask(user) & get_role_mask(role_types))
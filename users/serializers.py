@@ -1,17 +1,16 @@
 from rest_framework import serializers
-from django.contrib.auth import authenticate
 
 from .models import (
     CustomUser,
     SellerProfile,
     RolesPermission,
 )
+from .login import get_login_user, verify_password
+from .roles import has_role
 from courses.models import (
     Courses,
-    CourseRatings,
-    EnrolledCourses,
 )
-from utilities.mixins import DynamicFieldsSerializerMixin
+from utilities.mixins import CompiledSerializerMixin, DynamicFieldsSerializerMixin
 
 
 class ChangeCustomUserSerializer(serializers.ModelSerializer):
@@ -42,7 +41,7 @@ class ChangeCustomUserSerializer(serializers.ModelSerializer):
         return user
 
 
-class RetrieveCustomUserSerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
+class RetrieveCustomUserSerializer(CompiledSerializerMixin, DynamicFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for retrieving data of custom users or buyer
     """
@@ -75,12 +74,15 @@ class UserLoginSerializer(serializers.Serializer):
         Function for validating and returning the created instance
          based on the validated data of the users.
         """
-        user = authenticate(username=attrs.pop("email"), password=attrs.pop('password'))
+        email = attrs.pop("email")
+        user = self.context.get("user")
+        if user is None or user.email != email:
+            user = get_login_user(email)
 
-        if user:
+        if verify_password(user, attrs.pop("password")):
             if not (
-                    (self.context["role"] == "USER" and ("BUYER" in user.role_permission.role_type or "SELLER" in user.role_permission.role_type))
-                    or (self.context["role"] == "SUPER_ADMIN" and "SUPER_ADMIN" in user.role_permission.role_type)
+                    (self.context["role"] == "USER" and has_role(user, "BUYER", "SELLER"))
+                    or (self.context["role"] == "SUPER_ADMIN" and has_role(user, "SUPER_ADMIN"))
                     # or (self.context["role"] == "MENTOR" and ("MENTOR" in users.role_permission.role_type))
             ):
                 raise serializers.ValidationError(self.error_messages['wrong_platform'])
@@ -130,7 +132,7 @@ class ChangeSellerProfileSerializer(serializers.ModelSerializer):
         return user
 
 
-class RetrieveSellerSerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
+class RetrieveSellerSerializer(CompiledSerializerMixin, DynamicFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer class for retrieving data of sellers.
     """
@@ -138,8 +140,8 @@ class RetrieveSellerSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
     user_last_name = serializers.CharField(read_only=True)
     user_email = serializers.CharField(read_only=True)
     ratings = serializers.SerializerMethodField(read_only=True)
-    student_count = serializers.SerializerMethodField(read_only=True)
-    courses_count = serializers.SerializerMethodField(read_only=True)
+    student_count = serializers.IntegerField(read_only=True)
+    courses_count = serializers.IntegerField(read_only=True)
     courses = serializers.SerializerMethodField(read_only=True)
     seller_id = serializers.SerializerMethodField(read_only=True)
 
@@ -147,17 +149,15 @@ class RetrieveSellerSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
         """
         Method to get seller id.
         """
-        return obj.user.id
+        return obj.user_id
 
     def get_ratings(self, obj):
         """
         Method to get ratings.
         """
-        reviews = CourseRatings.objects.filter(course__seller=obj.user.id, course__course_status="PUBLISHED").order_by("-created_at")
-
-        list_stars_rating = list(reviews.values_list("rating", flat=True))
-        sum_of_rating_star = sum(list_stars_rating)
-        length_of_rating_star = len(list_stars_rating)
+        # ratings of the published courses are kept on the seller profile.
+        sum_of_rating_star = obj.rating_sum
+        length_of_rating_star = obj.rating_count
         if length_of_rating_star > 0:
             total_rating = round(sum_of_rating_star / length_of_rating_star, 2)
         else:
@@ -168,25 +168,20 @@ class RetrieveSellerSerializer(DynamicFieldsSerializerMixin, serializers.ModelSe
             "total_reviews_count": length_of_rating_star,
         }
 
-    def get_student_count(self, obj):
-        """
-        Method to get student count.
-        """
-        return EnrolledCourses.objects.filter(course__seller__id=obj.user.id).count()
-
-    def get_courses_count(self, obj):
-        """
-        Method to get courses count.
-        """
-        return Courses.objects.filter(course_status="PUBLISHED", seller=obj.user.id).count()
-
     def get_courses(self, obj):
         """
         Method to get courses.
         """
         courses = []
         if self.context.get("is_course"):
-            courses = Courses.objects.filter(course_status="PUBLISHED", seller=obj.user.id).order_by("-created_at").values()
+            courses = Courses.objects.filter(course_status="PUBLISHED", seller=obj.user_id).order_by("-created_at", "-id").values(
+                "id", "is_deleted", "created_by_id", "updated_by_id", "created_at", "updated_at", "slug_name", "seller_id",
+                "title", "category_id", "sub_category_id", "course_status", "sale_price",
+            )
+            if self.context.get("course_limit"):
+                offset = self.context.get("course_offset", 0)
+                courses = courses[offset:offset + self.context["course_limit"]]
+            courses = list(courses)
         return courses
 
     class Meta:
@@ -0,0 +1,45 @@
+"""
+File for dropping cached principals, roles and storefronts when users, roles or seller profiles change.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CustomUser, RolesPermission, SellerProfile
+from .roles import role_registry
+from .storefront import forget_slug, invalidate_seller_storefront
+from utilities.authentication import invalidate_principal, invalidate_principals
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    """
+    Function to drop the cached principal and storefront of a user after it changed.
+    """
+    user_id = instance.pk
+    invalidate_principal(user_id)
+    transaction.on_commit(lambda: invalidate_principal(user_id))
+    invalidate_seller_storefront(user_id)
+
+
+@receiver(post_save, sender=RolesPermission)
+@receiver(post_delete, sender=RolesPermission)
+def role_changed(sender, instance, **kwargs):
+    """
+    Function to reload the roles and drop every cached principal after a role changed.
+    """
+    role_registry.invalidate()
+    invalidate_principals()
+    transaction.on_commit(role_registry.invalidate)
+    transaction.on_commit(invalidate_principals)
+
+
+@receiver(post_save, sender=SellerProfile)
+@receiver(post_delete, sender=SellerProfile)
+def seller_profile_changed(sender, instance, **kwargs):
+    """
+    Function to expire the cached storefront of a seller after its profile changed.
+    """
+    forget_slug(instance.slug_name)
+    invalidate_seller_storefront(instance.user_id)
@@ -0,0 +1,94 @@
+"""
+File for caching seller storefronts by slug under a per seller content version.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import SellerProfile
+from utilities.cache import bound_staleness, bump_cache_version, get_cache_version
+
+
+COURSE_PAGE_SIZE = 20
+MAX_COURSE_PAGE_SIZE = 100
+
+
+def get_storefront_timeout():
+    """
+    Function to get the seconds a storefront is cached for, 0 when caching is disabled.
+
+    A change handled by another process only drops the cached storefront when the
+    cache is shared, otherwise it is kept for LOCAL_CACHE_STALE_SECONDS at most.
+    """
+    return bound_staleness(getattr(settings, "SELLER_STOREFRONT_CACHE_TIMEOUT", 0) or 0)
+
+
+def get_slug_cache_key(slug):
+    """
+    Function to get the cache key of the seller id of a slug.
+    """
+    return "seller_slug:{}".format(slug)
+
+
+def get_storefront_version_name(seller_id):
+    """
+    Function to get the name of the content version of the storefront of a seller.
+    """
+    return "seller_storefront:{}".format(seller_id)
+
+
+def get_slug_seller_id(slug):
+    """
+    Function to get the id of the seller owning a slug, or None when there is no such seller.
+    """
+    seller_id = cache.get(get_slug_cache_key(slug))
+    if seller_id is None:
+        seller_id = SellerProfile.objects.filter(slug_name=slug).values_list("user", flat=True).first()
+        if seller_id is not None:
+            cache.set(get_slug_cache_key(slug), seller_id, get_storefront_timeout())
+    return seller_id
+
+
+def forget_slug(slug):
+    """
+    Function to drop the cached seller id of a slug.
+    """
+    cache.delete(get_slug_cache_key(slug))
+
+
+def get_storefront_cache_key(slug, seller_id, *parts):
+    """
+    Function to get the cache key of a rendering of a storefront, from the current version of the seller.
+    """
+    version = get_cache_version(get_storefront_version_name(seller_id))
+    return ":".join(str(part) for part in ("seller_storefront", slug, seller_id, version) + parts)
+
+
+def invalidate_seller_storefront(*seller_ids):
+    """
+    Function to expire the cached storefronts of sellers, now and once the transaction commits.
+    """
+    seller_ids = {seller_id for seller_id in seller_ids if seller_id}
+
+    def bump():
+        for seller_id in seller_ids:
+            bump_cache_version(get_storefront_version_name(seller_id))
+
+    if seller_ids:
+        bump()
+        transaction.on_commit(bump)
+
+
+def get_course_window(query_params):
+    """
+    Function to get the course page and page size asked for, falling back to the defaults on invalid values.
+    """
+    try:
+        page = max(int(query_params.get("course_page", 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        page_size = min(max(int(query_params.get("course_page_size", COURSE_PAGE_SIZE)), 1), MAX_COURSE_PAGE_SIZE)
+    except (TypeError, ValueError):
+        page_size = COURSE_PAGE_SIZE
+    return page, page_size
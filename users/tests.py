@@ -1,3 +1,167 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Courses, CourseRatings, EnrolledCourses
+from users.models import BlackListedToken, SellerProfile
+from users.tokens import TokenRevocationStore
+from utilities.bloom import BloomFilter
+from utilities.testing import QueryBudgetTestCase
+
+
+class SellerQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Class for checking the seller and login endpoints run as many queries whatever the number of sellers and courses.
+    """
+
+    def grow_sellers(self, size):
+        """
+        Method to grow the sellers to size, each with a course.
+        """
+        for number in range(SellerProfile.objects.count(), size):
+            seller = self.create_user("seller{}@example.com".format(number), self.seller_role)
+            self.create_seller_profile(seller, "seller-{}".format(number))
+            self.add_courses(1, seller=seller)
+
+    def test_seller_list(self):
+        self.assertQueriesDoNotGrow(reverse("get-seller-list"), grow=self.grow_sellers)
+        self.assertQueriesDoNotGrow(reverse("get-seller-list") + "?pagination=true&page_size=2", grow=self.grow_sellers)
+
+    def test_seller_details(self):
+        path = reverse("get-seller-details", kwargs={"slug": self.seller_profile.slug_name})
+        self.assertQueriesDoNotGrow(path)
+        self.assertQueriesDoNotGrow(path, token=self.get_token(self.buyer))
+
+    def test_login(self):
+        self.assertQueriesDoNotGrow(
+            reverse("login"), method="post", data={"email": self.buyer.email, "password": "password", "role": "USER"},
+        )
+
+
+class TokenRevocationTests(TestCase):
+    """
+    Class for checking revoked tokens are found through the Bloom filter and picked up by the other processes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.expires_at = timezone.now() + timedelta(hours=1)
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        keys = ["revoked-{}".format(number) for number in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        count = len(bloom)
+        for key in keys:
+            bloom.add(key)
+        self.assertEqual(len(bloom), count)
+        false_positives = sum("unknown-{}".format(number) in bloom for number in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertFalse(bloom.is_full())
+        for number in range(20):
+            bloom.add("extra-{}".format(number))
+        self.assertTrue(bloom.is_full())
+
+    def test_revoke(self):
+        store = TokenRevocationStore()
+        store.revoke("revoked", self.expires_at)
+        self.assertTrue(store.is_revoked("revoked"))
+        self.assertFalse(store.is_revoked(None))
+        with self.assertNumQueries(0):
+            self.assertFalse(store.is_revoked("valid"))
+
+    def test_filter_hit_is_confirmed(self):
+        store = TokenRevocationStore()
+        store.ensure_fresh()
+        store.bloom.add("never-revoked")
+        self.assertFalse(store.is_revoked("never-revoked"))
+
+    def test_revoked_in_another_process(self):
+        store = TokenRevocationStore()
+        other = TokenRevocationStore()
+        other.ensure_fresh()
+        store.revoke("revoked", self.expires_at)
+        self.assertTrue(other.is_revoked("revoked"))
+
+    def test_refresh_without_version_bump(self):
+        store = TokenRevocationStore()
+        store.ensure_fresh()
+        BlackListedToken.objects.create(jti="missed", expires_at=self.expires_at)
+        self.assertFalse(store.is_revoked("missed"))
+        for _number in range(3):
+            store.refreshed_at -= store.refresh_interval
+            self.assertTrue(store.is_revoked("missed"))
+        self.assertEqual(len(store.bloom), 1)
+
+    def test_rebuild_prunes_expired(self):
+        BlackListedToken.objects.create(jti="expired", expires_at=timezone.now() - timedelta(seconds=1))
+        BlackListedToken.objects.create(jti="revoked", expires_at=self.expires_at)
+        store = TokenRevocationStore()
+        store.ensure_fresh()
+        self.assertFalse(BlackListedToken.objects.filter(jti="expired").exists())
+        self.assertFalse(store.is_revoked("expired"))
+        self.assertTrue(store.is_revoked("revoked"))
+
+
+class SellerStatisticsTests(QueryBudgetTestCase):
+    """
+    Class for checking the statistics stored on seller profiles follow their courses, ratings and enrollments.
+    """
+
+    def setUp(self):
+        self.add_courses(2, chapter_count=0, lesson_count=0)
+        self.first, self.second = Courses.objects.order_by("id")
+        self.other_seller = self.create_user("other@example.com", self.seller_role)
+        self.other_profile = self.create_seller_profile(self.other_seller, "other")
+
+    def assertStatistics(self, profile, courses_count, student_count, ratings):
+        """
+        Method to check the stored statistics of a seller profile against its published courses, students and ratings.
+        """
+        profile.refresh_from_db()
+        self.assertEqual((profile.courses_count, profile.student_count), (courses_count, student_count))
+        self.assertEqual((profile.rating_count, profile.rating_sum), (len(ratings), sum(ratings)))
+        self.assertAlmostEqual(profile.rating, sum(ratings) / len(ratings) if ratings else 0)
+
+    def test_ratings_and_enrollments(self):
+        self.assertStatistics(self.seller_profile, 2, 2, [4, 4])
+        rating = CourseRatings.objects.create(
+            course=self.first, user=self.seller, rating=1, title="Rating", created_by=self.seller, updated_by=self.seller,
+        )
+        self.assertStatistics(self.seller_profile, 2, 2, [4, 4, 1])
+        rating.rating = 5
+        rating.save()
+        self.assertStatistics(self.seller_profile, 2, 2, [4, 4, 5])
+        rating.delete()
+        self.assertStatistics(self.seller_profile, 2, 2, [4, 4])
+
+        enrollment = EnrolledCourses.objects.create(
+            course=self.first, user=self.seller, created_by=self.seller, updated_by=self.seller,
+        )
+        self.assertStatistics(self.seller_profile, 2, 3, [4, 4])
+        enrollment.delete()
+        self.assertStatistics(self.seller_profile, 2, 2, [4, 4])
+
+    def test_course_changes(self):
+        self.first.course_status = "DRAFT"
+        self.first.save()
+        self.assertStatistics(self.seller_profile, 1, 2, [4])
+
+        self.second.seller = self.other_seller
+        self.second.save()
+        self.assertStatistics(self.seller_profile, 0, 1, [])
+        self.assertStatistics(self.other_profile, 1, 1, [4])
+
+        enrollment = EnrolledCourses.objects.get(course=self.first)
+        enrollment.course = self.second
+        enrollment.save()
+        self.assertStatistics(self.seller_profile, 0, 0, [])
+        self.assertStatistics(self.other_profile, 1, 2, [4])
 
-# Create your tests here.
+        self.second.delete()
+        self.assertStatistics(self.other_profile, 0, 0, [])
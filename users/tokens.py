@@ -0,0 +1,125 @@
+"""
+File for revoking JWT tokens before they expire.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.utils import timezone as django_timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import BlackListedToken
+from utilities.bloom import BloomFilter
+from utilities.cache import bump_cache_version, get_cache_version
+
+
+class TokenRevocationStore(object):
+    """
+    Class for checking if a token was revoked, fronted by a process local Bloom filter.
+
+    Revoked tokens are stored by jti with their expiry. The filter holds every
+    stored jti, so a token which was never revoked, the common case, is answered
+    without touching the database; a filter hit is confirmed with a lookup. New
+    rows are read incrementally when another process bumps the shared version, or
+    every refresh_interval seconds when the cache is not shared, and the whole
+    filter is rebuilt every rebuild_interval seconds after deleting the rows of
+    tokens which have expired anyway.
+    """
+    version_name = "token_revocations"
+    refresh_interval = 5
+    rebuild_interval = 3600
+    # rows committed late are still picked up by re-reading this many seconds before the last refresh.
+    refresh_overlap = 60
+    min_capacity = 1024
+    error_rate = 0.001
+
+    def __init__(self):
+        """
+        Constructor function for setting up an empty store.
+        """
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.version = None
+        self.refreshed_at = 0
+        self.rebuilt_at = 0
+        self.refreshed_since = None
+
+    def rebuild(self):
+        """
+        Method to prune expired revocations and build the filter from the remaining ones.
+        """
+        now = django_timezone.now()
+        version = get_cache_version(self.version_name)
+        BlackListedToken.objects.filter(expires_at__lte=now).delete()
+        jtis = list(BlackListedToken.objects.values_list("jti", flat=True))
+
+        bloom = BloomFilter(max(self.min_capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self.bloom = bloom
+        self.version = version
+        self.refreshed_since = now
+        self.refreshed_at = self.rebuilt_at = time.monotonic()
+
+    def refresh(self):
+        """
+        Method to add the revocations stored since the last refresh to the filter.
+        """
+        now = django_timezone.now()
+        version = get_cache_version(self.version_name)
+        since = self.refreshed_since - timedelta(seconds=self.refresh_overlap)
+        for jti in BlackListedToken.objects.filter(timestamp__gte=since).values_list("jti", flat=True):
+            self.bloom.add(jti)
+        self.version = version
+        self.refreshed_since = now
+        self.refreshed_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """
+        Method to rebuild or refresh the filter when it is due.
+        """
+        now = time.monotonic()
+        if (
+            self.bloom is not None
+            and now - self.rebuilt_at < self.rebuild_interval
+            and now - self.refreshed_at < self.refresh_interval
+            and self.version == get_cache_version(self.version_name)
+        ):
+            return
+        with self.lock:
+            if self.bloom is None or self.bloom.is_full() or now - self.rebuilt_at >= self.rebuild_interval:
+                self.rebuild()
+            else:
+                self.refresh()
+
+    def is_revoked(self, jti):
+        """
+        Method to check if the token with the jti was revoked.
+        """
+        if not jti:
+            return False
+        self.ensure_fresh()
+        if jti not in self.bloom:
+            return False
+        return BlackListedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, expires_at):
+        """
+        Method to revoke the token with the jti until it expires.
+        """
+        BlackListedToken.objects.get_or_create(jti=jti, defaults={"expires_at": expires_at})
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+        bump_cache_version(self.version_name)
+
+
+token_revocation_store = TokenRevocationStore()
+
+
+def revoke_token(token):
+    """
+    Function to revoke a validated simplejwt token until it expires.
+    """
+    expires_at = datetime.fromtimestamp(token["exp"], tz=timezone.utc)
+    token_revocation_store.revoke(token[jwt_settings.JTI_CLAIM], expires_at)
@@ -1,5 +1,5 @@
-from django.db.models import F, Avg, Q, FloatField
-from django.db.models.functions import Coalesce
+from django.core.cache import cache
+from django.db.models import F
 from rest_framework import status
 from rest_framework.generics import (
     ListAPIView,
@@ -12,9 +12,16 @@ from rest_framework.permissions import (
     IsAuthenticated,
     AllowAny,
 )
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from .filters import SellerFilter
+from .login import get_login_user
+from .storefront import (
+    forget_slug,
+    get_course_window,
+    get_slug_seller_id,
+    get_storefront_cache_key,
+    get_storefront_timeout,
+)
 from .models import (
     CustomUser,
     SellerProfile,
@@ -34,9 +41,10 @@ from utilities.permissions import (
     IsActiveUserPermission,
     IsObjectOwnerPermission,
 )
-from utilities.mixins import DynamicFieldsViewMixin
+from utilities.authentication import CachedJWTAuthentication
+from utilities.mixins import DynamicFieldsViewMixin, FieldQueryPlan, StreamingListMixin
 
-from .models import RolesPermission
+from .roles import has_role, role_registry
 from utilities import messages
 from utilities.utils import ResponseInfo
 
@@ -60,8 +68,7 @@ class CreateBuyerUserAPIView(CreateAPIView):
         """
         POST Method for creating buyer users.
         """
-        buyer_role = RolesPermission.objects.filter(role_type__contains="BUYER").first()
-        request.data["role_permission"] = buyer_role.id
+        request.data["role_permission"] = role_registry.get_role_id("BUYER")
         user_serializer = self.get_serializer(data=request.data)
         if user_serializer.is_valid(raise_exception=True):
             user_serializer.save()
@@ -98,17 +105,19 @@ class LoginAPIView(CreateAPIView):
         try:
             email = request.data.get("email")
             if email:
-                user = CustomUser.objects.get(email=email)
+                user = get_login_user(email)
+                if user is None:
+                    raise CustomUser.DoesNotExist
                 user_type = request.data.get("role")
 
                 if user_type:
-                    user_serializer = self.get_serializer(data=request.data, context={"role": user_type})
+                    user_serializer = self.get_serializer(data=request.data, context={"role": user_type, "user": user})
 
                     if user_serializer.is_valid(raise_exception=True):
                         jwt_token = get_tokens_for_user(user)
-                        if user.status == "INVITED" and ("STUDENT" in user.role_permission.role_type or "MENTOR" in user.role_permission.role_type):
+                        if user.status == "INVITED" and has_role(user, "STUDENT", "MENTOR"):
                             user.status = "ACTIVE"
-                            user.save()
+                            user.save(update_fields=["status"])
 
                         role_permission_serializer = RolePermissionSerializer(user.role_permission, many=False)
 
@@ -124,9 +133,8 @@ class LoginAPIView(CreateAPIView):
                         }
 
                         if role_permission_serializer.data.get("role_type")[0] == "SELLER":
-                            seller_obj = SellerProfile.objects.get(user=user.id)
-                            if seller_obj.slug_name:
-                                data["slug_name"] = seller_obj.slug_name
+                            if user.seller_slug:
+                                data["slug_name"] = user.seller_slug
 
                         self.response_format["data"] = data
                         self.response_format["error"] = None
@@ -169,8 +177,7 @@ class CreateSellerUserAPIView(CreateAPIView):
         """
         POST Method for creating seller users.
         """
-        buyer_role = RolesPermission.objects.filter(role_type__contains="SELLER").first()
-        request.data["role_permission"] = buyer_role.id
+        request.data["role_permission"] = role_registry.get_role_id("SELLER")
         user_serializer = self.get_serializer(data=request.data)
         if user_serializer.is_valid(raise_exception=True):
             seller_profile_serializer = ChangeSellerProfileSerializer(data=request.data)
@@ -185,15 +192,25 @@ class CreateSellerUserAPIView(CreateAPIView):
         return Response(self.response_format)
 
 
-class GetSellerListAPIView(DynamicFieldsViewMixin, ListAPIView):
+class GetSellerListAPIView(StreamingListMixin, DynamicFieldsViewMixin, ListAPIView):
     """
     Class for creating api for getting seller list.
     """
     permission_classes = [(IsAuthenticated & IsTokenValid & IsActiveUserPermission) | AllowAny]
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
+    use_read_replica = True
     serializer_class = RetrieveSellerSerializer
     pagination_class = CustomPagination
     filterset_class = SellerFilter
+    field_query_plans = {
+        "seller_id": FieldQueryPlan(columns=("user",)),
+        "user_first_name": FieldQueryPlan(annotations=("user_first_name",)),
+        "user_last_name": FieldQueryPlan(annotations=("user_last_name",)),
+        "ratings": FieldQueryPlan(columns=("rating_sum", "rating_count")),
+        "student_count": FieldQueryPlan(columns=("student_count",)),
+        "courses_count": FieldQueryPlan(columns=("courses_count",)),
+        "courses": FieldQueryPlan(columns=("user",)),
+    }
 
     def __init__(self, **kwargs):
         """
@@ -203,15 +220,20 @@ class GetSellerListAPIView(DynamicFieldsViewMixin, ListAPIView):
         self.response_format = ResponseInfo().response
         super(GetSellerListAPIView, self).__init__(**kwargs)
 
+    def get_query_annotations(self):
+        """
+        Method to get annotations the seller queryset can be planned with.
+        """
+        return {
+            "user_first_name": F("user__first_name"),
+            "user_last_name": F("user__last_name"),
+        }
+
     def get_queryset(self):
         """migration
         Method to get seller queryset.
         """
-        return SellerProfile.objects.all().annotate(
-            user_first_name=F("user__first_name"),
-            user_last_name=F("user__last_name"),
-            rating=Coalesce(Avg("user__course_seller__course_rating__rating", filter=Q(user__course_seller__course_status="PUBLISHED")), 0, output_field=FloatField()),
-        )
+        return self.plan_queryset(SellerProfile.objects.all())
 
     def paginate_queryset(self, queryset):
         """
@@ -226,6 +248,12 @@ class GetSellerListAPIView(DynamicFieldsViewMixin, ListAPIView):
         """
         GET Method for getting seller list.
         """
+        if self.is_streaming_requested():
+            self.response_format["error"] = None
+            self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
+            self.response_format["message"] = [messages.SUCCESS]
+            return self.get_streaming_response(self.filter_queryset(self.get_queryset()), self.response_format)
+
         seller_serializer = super().list(request, *args, **kwargs)
 
         self.response_format["data"] = seller_serializer.data
@@ -240,7 +268,8 @@ class GetSellerDetailsAPIView(DynamicFieldsViewMixin, RetrieveAPIView):
     Class for creating api for getting seller details.
     """
     permission_classes = [(IsAuthenticated & IsTokenValid & IsActiveUserPermission) | AllowAny]
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
+    use_read_replica = True
     serializer_class = RetrieveSellerSerializer
 
     def __init__(self, **kwargs):
@@ -255,8 +284,11 @@ class GetSellerDetailsAPIView(DynamicFieldsViewMixin, RetrieveAPIView):
         """
         Method to get context for serializer
         """
+        page, page_size = get_course_window(self.request.query_params)
         return {
-            "is_course": True
+            "is_course": True,
+            "course_offset": (page - 1) * page_size,
+            "course_limit": page_size,
         }
 
     def get_queryset(self):
@@ -269,15 +301,49 @@ class GetSellerDetailsAPIView(DynamicFieldsViewMixin, RetrieveAPIView):
             user_email=F("user__email"),
         ).get(slug_name=self.kwargs["slug"])
 
+    def get_storefront(self):
+        """
+        Method to render the storefront of the seller with one page of its courses.
+        """
+        seller_obj = self.get_queryset()
+        data = dict(self.get_serializer(seller_obj, many=False).data)
+
+        page, page_size = get_course_window(self.request.query_params)
+        if "courses" in data:
+            data["courses_pagination"] = {
+                "page": page,
+                "page_size": page_size,
+                "count": seller_obj.courses_count,
+                "has_next": page * page_size < seller_obj.courses_count,
+            }
+        return data
+
     def get(self, request, *args, **kwargs):
         """
-        GET Method for getting seller details.
+        GET Method for getting seller details, served from the cache until the seller content changes.
         """
         try:
-            seller_obj = self.get_queryset()
-            seller_serializer = self.get_serializer(seller_obj, many=False)
-
-            self.response_format["data"] = seller_serializer.data
+            slug = self.kwargs["slug"]
+            timeout = get_storefront_timeout()
+            if not timeout:
+                data = self.get_storefront()
+            else:
+                seller_id = get_slug_seller_id(slug)
+                if seller_id is None:
+                    raise SellerProfile.DoesNotExist
+                cache_key = get_storefront_cache_key(
+                    slug, seller_id, *get_course_window(request.query_params), request.query_params.get("fields", "")
+                )
+                data = cache.get(cache_key)
+                if data is None:
+                    try:
+                        data = self.get_storefront()
+                    except SellerProfile.DoesNotExist:
+                        forget_slug(slug)
+                        raise
+                    cache.set(cache_key, data, timeout)
+
+            self.response_format["data"] = data
             self.response_format["error"] = None
             self.response_format["status_code"] = self.status_code = status.HTTP_200_OK
             self.response_format["message"] = [messages.SUCCESS]
@@ -294,7 +360,7 @@ class UpdateSellerDetailsAPIView(UpdateAPIView):
     Class for creating api for updating seller details.
     """
     permission_classes = [(IsAuthenticated & IsTokenValid & IsActiveUserPermission & IsObjectOwnerPermission)]
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
     serializer_class = ChangeSellerProfileSerializer
 
     def __init__(self, **kwargs):
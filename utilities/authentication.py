@@ -0,0 +1,160 @@
+"""
+File for authenticating requests from a process local cache of principals.
+"""
+import copy
+import os
+from collections import namedtuple
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from users.models import CustomUser, RolesPermission
+from users.roles import get_role_mask
+from utilities.cache import TTLCache, bound_staleness, bump_cache_version, get_cache_version
+
+
+PRINCIPAL_CACHE_TTL = 300
+PRINCIPAL_ROLES_VERSION = "principal_roles"
+
+principal_cache = TTLCache(int(os.environ.get("PRINCIPAL_CACHE_SIZE", 10000)), PRINCIPAL_CACHE_TTL)
+
+
+class Principal(namedtuple("Principal", ("user_id", "is_active", "password", "role_mask", "user_values", "role_values"))):
+    """
+    Class for an immutable snapshot of a user row and its role, from which request users are built.
+    """
+    __slots__ = ()
+
+
+def get_user_fields():
+    """
+    Function to get the names of the concrete user columns kept in a principal.
+    """
+    return [field.attname for field in CustomUser._meta.concrete_fields]
+
+
+def get_role_fields():
+    """
+    Function to get the names of the concrete role columns kept in a principal.
+    """
+    return [field.attname for field in RolesPermission._meta.concrete_fields]
+
+
+def get_principal_version_name(user_id):
+    """
+    Function to get the name of the shared version of the principal of a user.
+    """
+    return "principal:{}".format(user_id)
+
+
+def get_principal_versions(user_id):
+    """
+    Function to get the shared versions a cached principal of a user must match.
+    """
+    return get_cache_version(get_principal_version_name(user_id)), get_cache_version(PRINCIPAL_ROLES_VERSION)
+
+
+def load_principal(user_id):
+    """
+    Function to load the principal of a user with its role in one query, or None when there is no such user.
+    """
+    user_fields = get_user_fields()
+    role_fields = ["role_permission__{}".format(name) for name in get_role_fields()]
+    row = CustomUser.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).values_list(
+        *user_fields, *role_fields
+    ).first()
+    if row is None:
+        return None
+
+    user_values = row[:len(user_fields)]
+    role_values = row[len(user_fields):]
+    user = dict(zip(user_fields, user_values))
+    role_values = role_values if role_values[0] is not None else None
+    role_mask = get_role_mask(role_values[get_role_fields().index("role_type")]) if role_values else 0
+    return Principal(
+        user_id=user["id"],
+        is_active=user["is_active"],
+        password=user["password"],
+        role_mask=role_mask,
+        user_values=tuple(user_values),
+        role_values=tuple(role_values) if role_values else None,
+    )
+
+
+def get_principal(user_id):
+    """
+    Function to get the principal of a user, from the cache while its shared versions are unchanged.
+
+    Versions bumped by another process are only seen through a shared cache, so
+    without one a principal is trusted for LOCAL_CACHE_STALE_SECONDS at most.
+    """
+    versions = get_principal_versions(user_id)
+    cached = principal_cache.get(user_id)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+
+    principal = load_principal(user_id)
+    if principal is not None:
+        principal_cache.set(user_id, (versions, principal), bound_staleness(PRINCIPAL_CACHE_TTL))
+    return principal
+
+
+def build_user(principal):
+    """
+    Function to build a user instance with its role attached from a principal, without a query.
+    """
+    user = CustomUser.from_db(DEFAULT_DB_ALIAS, get_user_fields(), copy.deepcopy(principal.user_values))
+    if principal.role_values is not None:
+        user.role_permission = RolesPermission.from_db(
+            DEFAULT_DB_ALIAS, get_role_fields(), copy.deepcopy(principal.role_values)
+        )
+    user.principal = principal
+    return user
+
+
+def invalidate_principal(user_id):
+    """
+    Function to drop the cached principal of a user in this and every other process.
+    """
+    principal_cache.delete(user_id)
+    bump_cache_version(get_principal_version_name(user_id))
+
+
+def invalidate_principals():
+    """
+    Function to drop every cached principal after a role changed.
+    """
+    principal_cache.clear()
+    bump_cache_version(PRINCIPAL_ROLES_VERSION)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Class for JWT authentication which builds the user and its role from a cached principal.
+    """
+
+    def get_user(self, validated_token):
+        """
+        Method to find the user of a validated token, with the same checks as JWTAuthentication.
+        """
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        principal = get_principal(user_id)
+        if principal is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not principal.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(principal.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return build_user(principal)
@@ -1,6 +1,8 @@
 import os
 import boto3
 
+from utilities.cache import TTLCache
+
 s3_client = boto3.client(
     's3',
     region_name=os.getenv("AWS_S3_REGION"),
@@ -8,25 +10,57 @@ s3_client = boto3.client(
     aws_secret_access_key=os.getenv("AWS_S3_SECRET_KEY"),
 )
 
+PRE_SIGNED_URL_EXPIRY = 86400
+# a cached url is handed out only while it stays valid for at least this many seconds.
+PRE_SIGNED_URL_MIN_VALIDITY = 6 * 3600
+
+pre_signed_url_cache = TTLCache(
+    max_size=int(os.getenv("PRE_SIGNED_URL_CACHE_SIZE", 20000)),
+    ttl=PRE_SIGNED_URL_EXPIRY - PRE_SIGNED_URL_MIN_VALIDITY,
+)
+
+
+def sign_media_key(media_key):
+    """
+    Method to sign a pre-signed url for getting data, without the cache.
+    """
+    return s3_client.generate_presigned_url(
+        ClientMethod='get_object',
+        Params={
+            'Bucket': os.getenv("AWS_S3_BUCKET_NAME"),
+            'Key': media_key,
+            'ResponseContentDisposition': 'inline',
+        },
+        ExpiresIn=PRE_SIGNED_URL_EXPIRY,
+    )
+
 
 def generate_pre_signed_url(media_key):
     """
     Method to get pre-signed url for getting data.
     """
     if media_key:
-        url = s3_client.generate_presigned_url(
-            ClientMethod='get_object',
-            Params={
-                'Bucket': os.getenv("AWS_S3_BUCKET_NAME"),
-                'Key': media_key,
-                'ResponseContentDisposition': 'inline',
-            },
-            ExpiresIn=86400,
-        )
+        url = pre_signed_url_cache.get(media_key)
+        if url is None:
+            url = sign_media_key(media_key)
+            pre_signed_url_cache.set(media_key, url)
         return url
     return None
 
 
+def generate_pre_signed_urls(media_keys):
+    """
+    Method to get pre-signed urls for a list of media keys, signing only the ones not cached.
+    """
+    media_keys = {media_key for media_key in media_keys if media_key}
+    urls = pre_signed_url_cache.get_many(media_keys)
+    signed_urls = {media_key: sign_media_key(media_key) for media_key in media_keys if media_key not in urls}
+    if signed_urls:
+        pre_signed_url_cache.set_many(signed_urls)
+        urls.update(signed_urls)
+    return urls
+
+
 def generate_upload_signed_url(media_key):
     """
     Method to get pre-signed url for uploading data.
@@ -0,0 +1,60 @@
+"""
+File for a Bloom filter used to skip lookups of keys which were never stored.
+"""
+import hashlib
+import math
+
+
+class BloomFilter(object):
+    """
+    Class for a fixed size Bloom filter of strings.
+
+    A key which was added is always reported as present; a key which was not
+    added is reported as present with about error_rate probability while no more
+    than capacity keys were added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Constructor function for sizing the filter for the expected number of keys.
+        """
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))), 8)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, key):
+        """
+        Method to get the bit positions of a key with double hashing.
+        """
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def add(self, key):
+        """
+        Method to add a key to the filter, counting it only when it set a bit so keys added again do not fill it.
+        """
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def is_full(self):
+        """
+        Method to check if more keys were added than the filter was sized for.
+        """
+        return self.count > self.capacity
@@ -0,0 +1,168 @@
+"""
+File for shared cache helpers.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def get_version_key(name):
+    """
+    Function to get the cache key holding the version of a named group of cached data.
+    """
+    return "version:{}".format(name)
+
+
+def get_cache_version(name):
+    """
+    Function to get the current version of a named group of cached data.
+
+    A missing version starts from the current time in milliseconds, so a version
+    evicted from the cache never comes back as a value a process already holds.
+    """
+    key = get_version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def get_cache_versions(names):
+    """
+    Function to get the current versions of named groups of cached data in one round trip.
+    """
+    keys = {get_version_key(name): name for name in names}
+    versions = cache.get_many(keys)
+    for key, name in keys.items():
+        if key not in versions:
+            versions[key] = get_cache_version(name)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_cache_version(name):
+    """
+    Function to invalidate a named group of cached data and get its new version.
+    """
+    key = get_version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        get_cache_version(name)
+        return cache.incr(key)
+
+
+def is_cache_shared():
+    """
+    Function to check if the default cache is shared by every worker process, so a version bumped in one reaches the others.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def bound_staleness(seconds):
+    """
+    Function to get how many seconds data invalidated by version bumps may be used for.
+
+    Without a shared cache the bumps of other processes are never seen, so the
+    seconds are capped to LOCAL_CACHE_STALE_SECONDS to bound how stale they get.
+    """
+    if is_cache_shared():
+        return seconds
+    stale_seconds = getattr(settings, "LOCAL_CACHE_STALE_SECONDS", 5)
+    return stale_seconds if seconds is None else min(seconds, stale_seconds)
+
+
+class TTLCache(object):
+    """
+    Class for a thread safe in-process cache with a size bound, LRU eviction and per entry expiry.
+    """
+
+    def __init__(self, max_size, ttl):
+        """
+        Constructor function for setting the maximum number of entries and their default time to live in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _get(self, key, now):
+        """
+        Method to get a live entry, dropping it when it expired. The lock must be held.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return entry
+        if entry[1] <= now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _set(self, key, value, expires_at):
+        """
+        Method to store an entry and evict the least recently used ones over the bound. The lock must be held.
+        """
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        """
+        Method to get the value of a key, or default when it is missing or expired.
+        """
+        with self.lock:
+            entry = self._get(key, time.monotonic())
+        return default if entry is None else entry[0]
+
+    def get_many(self, keys):
+        """
+        Method to get a dict of the keys which have a live value.
+        """
+        now = time.monotonic()
+        values = {}
+        with self.lock:
+            for key in keys:
+                entry = self._get(key, now)
+                if entry is not None:
+                    values[key] = entry[0]
+        return values
+
+    def set(self, key, value, ttl=None):
+        """
+        Method to store a value for ttl seconds, the cache default when not given.
+        """
+        with self.lock:
+            self._set(key, value, time.monotonic() + (self.ttl if ttl is None else ttl))
+
+    def set_many(self, values, ttl=None):
+        """
+        Method to store a dict of values for ttl seconds, the cache default when not given.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            for key, value in values.items():
+                self._set(key, value, expires_at)
+
+    def delete(self, key):
+        """
+        Method to remove a key.
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """
+        Method to remove every key.
+        """
+        with self.lock:
+            self.entries.clear()
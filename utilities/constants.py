@@ -27,4 +27,16 @@ DurationTypes = {
     "20": {
         "min": "20:00:00"
     }
-}
\ No newline at end of file
+}
+RatingFacets = (
+    ("4.5", 4.5),
+    ("4", 4),
+    ("3.5", 3.5),
+    ("3", 3),
+)
+DurationFacets = (
+    ("Less than 4 hours", "4"),
+    ("4 - 7 hours ", "4-7"),
+    ("7 - 20 hours", "7-20"),
+    ("20 + hours", "20"),
+)
@@ -42,6 +42,8 @@ NOT_PERMISSION = "You do not have permission to perform this action."
 CANNOT_UPDATE_ORG_ADMIN = "You can not update organisation admin role."
 CSV_COLUMN_ERROR = "Columns are not in correct order at {}."
 CSV_COLUMN_MISS_MATCH_ERROR = "Columns and rows doesn't match."
+CSV_COLUMN_MISS_MATCH_AT_ROW = "Columns and rows doesn't match at row number {}."
+INVALID_JSON_AT_ROW = "Invalid JSON at row number {}."
 CHOICES = "{} choices should be {} at row number {}."
 ATTACHED_USER_ERROR = "This {} is associated with a {}, Cannot be deleted."
 LEAVE_APPLIED = "Vacation request has been successfully sent to your manager."
@@ -52,6 +54,7 @@ INVALID_DATE = "Please choose correct Dates."
 CANNOT_LOG_BEFORE_JOINING = "You cannot log time before joining date."
 DATA_ALREADY_EXIST = "{} already exist."
 INVALID_FIELD_AT_ROW = "Invalid {} name at row number {}."
+INVALID_VALUE_AT_ROW = "Invalid {} value at row number {}."
 SAVED = "{} saved successfully."
 PASSWORD_CHANGED = "Password changed successfully."
 BEARER_NOT_FOUND = "Bearer token not found."
@@ -63,3 +66,4 @@ CAN_NOT_UPDATE = "Can not update published {}."
 STATUS_DRAFT = "Only draft {} can't be deleted."
 ENROLL_COURSE = "This {} is enrolled, can't be deleted."
 CAN_NOT_PUBLISH = "All fields required to publish a {}."
+INVALID_CURSOR = "Invalid cursor."
@@ -0,0 +1,225 @@
+"""
+File for the middleware of the project.
+"""
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from users.tokens import token_revocation_store
+from utilities.authentication import CachedJWTAuthentication
+from utilities.profiling import RequestProfile, profiler_lock
+from utilities.queries import get_query_budget, query_stats, record_queries
+from utilities.routers import (
+    Routing,
+    can_read_from_replica,
+    current_routing,
+    get_client_key,
+    mark_replica_unhealthy,
+    stick_to_primary,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ReadReplicaMiddleware(object):
+    """
+    Class for letting the safe requests of views with use_read_replica read from a replica.
+
+    A request that writes keeps its client on the primary for REPLICA_STICKY_SECONDS,
+    and a replica failing a request is skipped for REPLICA_UNHEALTHY_SECONDS. Both
+    are kept in the shared cache, so every request reads from the primary when the
+    cache is process-local.
+    """
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        """
+        Constructor function for setting the next handler of the request.
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """
+        Method to route the queries of the request and remember the clients that wrote.
+        """
+        routing = request.routing = Routing(get_client_key(request))
+        token = current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if routing.wrote or request.method not in self.safe_methods:
+            stick_to_primary(routing.client_key)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Method to allow a replica when the view only reads and the client did not write recently.
+        """
+        view_class = getattr(view_func, "view_class", None)
+        if request.method in self.safe_methods and getattr(view_class, "use_read_replica", False):
+            request.routing.use_replica = can_read_from_replica(request.routing.client_key)
+        return None
+
+    def process_exception(self, request, exception):
+        """
+        Method to skip the replica of the request when it failed with a database error.
+        """
+        replica = getattr(getattr(request, "routing", None), "replica", None)
+        if isinstance(exception, DatabaseError) and replica not in (None, DEFAULT_DB_ALIAS):
+            mark_replica_unhealthy(replica)
+        return None
+
+
+class QueryBudgetMiddleware(object):
+    """
+    Class for recording the queries of every request and logging the requests over the query budget of their endpoint.
+
+    The record of a request is kept on request.query_record and added to the
+    counters of its view class in query_stats, which staff users read from the
+    getProcessStats endpoint. Budgets are set in QUERY_BUDGETS
+    by URL name, and DEBUG responses carry the query count and time in headers.
+    """
+
+    def __init__(self, get_response):
+        """
+        Constructor function for setting the next handler of the request.
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """
+        Method to record the queries of the request, and of its body when it is streamed.
+        """
+        if not getattr(settings, "QUERY_INSTRUMENTATION_ENABLED", False):
+            return self.get_response(request)
+
+        with record_queries() as record:
+            request.query_record = record
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.record_stream(request, response.streaming_content, record)
+        else:
+            self.check_budget(request, record)
+            if settings.DEBUG:
+                response["X-Query-Count"] = record.count
+                response["X-Query-Time"] = "{:.1f}ms".format(record.time * 1000)
+        return response
+
+    def record_stream(self, request, streaming_content, record):
+        """
+        Method to keep recording while the body of a streamed response is rendered.
+        """
+        with record_queries(record):
+            yield from streaming_content
+        self.check_budget(request, record)
+
+    def check_budget(self, request, record):
+        """
+        Method to add the record to the counters of the view and log it when it is over the budget of the endpoint.
+        """
+        resolver_match = getattr(request, "resolver_match", None)
+        if resolver_match is None:
+            return
+        view_class = getattr(resolver_match.func, "view_class", None)
+        view_name = view_class.__name__ if view_class is not None else resolver_match.view_name
+        budget = get_query_budget(resolver_match.url_name)
+        over_budget = budget is not None and record.count > budget
+        query_stats.add(view_name, record, over_budget)
+        if over_budget:
+            logger.warning(
+                "%s %s ran %s queries in %.1fms, over its budget of %s. Duplicated: %s",
+                request.method, request.path, record.count, record.time * 1000, budget, record.get_duplicates(),
+            )
+
+
+class RequestProfilerMiddleware(object):
+    """
+    Class for profiling the requests of staff users which ask for it with the X-Profile header or the profile parameter.
+
+    With the value "log" the summary and the cProfile statistics are written to
+    the profile directory, with any other value the summary is added under
+    "profile" to a JSON object response and written when the response is not one.
+    Only one request of a process is profiled at a time, and requests without
+    the header or parameter only pay for looking them up.
+    """
+    header = "HTTP_X_PROFILE"
+    parameter = "profile"
+
+    def __init__(self, get_response):
+        """
+        Constructor function for setting the next handler of the request.
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """
+        Method to run the request under the profiler when a staff user asked for it.
+        """
+        output = request.META.get(self.header) or request.GET.get(self.parameter)
+        if not output or not getattr(settings, "REQUEST_PROFILER_ENABLED", False) or not self.is_staff(request):
+            return self.get_response(request)
+        if not profiler_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response["X-Profile"] = "busy"
+            return response
+
+        profile = RequestProfile()
+        try:
+            with record_queries(profile.record):
+                profile.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profile.disable()
+        finally:
+            profiler_lock.release()
+        self.attach_summary(request, response, profile, output)
+        return response
+
+    def is_staff(self, request):
+        """
+        Method to check if the user of the request, from its session or its token, is an active staff user.
+
+        A token is checked against the revoked tokens like IsTokenValid, so a
+        staff user who logged out can not profile with the token.
+        """
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            try:
+                authenticated = CachedJWTAuthentication().authenticate(request)
+            except (AuthenticationFailed, InvalidToken):
+                return False
+            if authenticated is None:
+                return False
+            user, token = authenticated
+            if token_revocation_store.is_revoked(token.get(jwt_settings.JTI_CLAIM)):
+                return False
+        return user is not None and user.is_active and user.is_staff
+
+    def attach_summary(self, request, response, profile, output):
+        """
+        Method to add the summary of the profile to the response, or write it and name the file in a header.
+        """
+        summary = profile.get_summary(request, response)
+        response["X-Profile-Time"] = "{:.1f}ms".format(profile.elapsed * 1000)
+        if response.streaming:
+            # the body is rendered after the response is returned, so only its setup was profiled.
+            summary["streamed_body_profiled"] = False
+        elif output != "log" and response.get("Content-Type", "").startswith("application/json"):
+            try:
+                body = json.loads(response.content)
+            except ValueError:
+                body = None
+            if isinstance(body, dict):
+                body["profile"] = summary
+                response.content = json.dumps(body, default=str)
+                if response.has_header("Content-Length"):
+                    response["Content-Length"] = len(response.content)
+                return
+        response["X-Profile-File"] = os.path.basename(profile.write(summary))
@@ -1,5 +1,19 @@
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from utilities.aws import generate_pre_signed_url, generate_pre_signed_urls
+from utilities.cache import TTLCache
 
 
 class CustomModelMixin(models.Model):
@@ -13,9 +27,20 @@ class CustomModelMixin(models.Model):
     created_at = models.DateTimeField(auto_now_add=timezone.now)
     updated_at = models.DateTimeField(auto_now=timezone.now)
 
+    # columns maintained in the database by signals, never written from an instance on update.
+    aggregate_fields = ()
+
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        if self.aggregate_fields and not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.aggregate_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 class DynamicFieldsSerializerMixin(object):
     def __init__(self, *args, **kwargs):
@@ -33,25 +58,340 @@ class DynamicFieldsSerializerMixin(object):
                 self.fields.pop(field_name)
 
 
+def get_value(value):
+    """
+    Function to get a value as it is, the representation of a primary key read from its column.
+    """
+    return value
+
+
+class CompiledRepresentation(object):
+    """
+    Class for the plan of mapping rows to the output of a read-only model serializer, compiled once per field set.
+
+    Every readable field is resolved once to a serializer method, a model column
+    read by its attname or the attribute lookup of the field, so a row is mapped
+    without going through the field machinery of the serializer.
+    """
+    METHOD = "method"
+    COLUMN = "column"
+    ATTRIBUTE = "attribute"
+
+    def __init__(self, serializer):
+        """
+        Constructor function for resolving the readable fields of a serializer.
+        """
+        model = serializer.Meta.model
+        self.entries = tuple(
+            (field_name,) + self.get_entry(model, field)
+            for field_name, field in serializer.fields.items() if not field.write_only
+        )
+
+    def get_entry(self, model, field):
+        """
+        Method to get how a field is read, as (kind, method name, column or source).
+        """
+        if isinstance(field, serializers.SerializerMethodField):
+            return self.METHOD, field.method_name
+        if len(field.source_attrs) == 1:
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is not None and model_field.concrete and not model_field.many_to_many:
+                if not model_field.is_relation or field.source == model_field.attname:
+                    return self.COLUMN, model_field.attname
+                if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+                    return self.COLUMN, model_field.attname
+        return self.ATTRIBUTE, field.source
+
+    def get_readers(self, serializer):
+        """
+        Method to bind the plan to the methods and fields of a serializer, as (name, kind, function, field).
+        """
+        readers = []
+        for field_name, kind, key in self.entries:
+            field = serializer.fields[field_name]
+            if isinstance(field, serializers.DateTimeField) and not hasattr(field, "timezone"):
+                # the current time zone is looked up once per serializer instead of once per value.
+                field.timezone = field.default_timezone()
+            if kind == self.METHOD:
+                readers.append((field_name, kind, getattr(serializer, key), field))
+            elif kind == self.COLUMN and isinstance(field, PrimaryKeyRelatedField):
+                readers.append((field_name, kind, get_value, key))
+            elif kind == self.COLUMN:
+                readers.append((field_name, kind, field.to_representation, key))
+            else:
+                readers.append((field_name, kind, field.to_representation, field))
+        return readers
+
+    def get_value_columns(self, queryset):
+        """
+        Method to get the columns the rows of a queryset are read as values with, None when a field needs the instance.
+        """
+        columns = []
+        for field_name, kind, key in self.entries:
+            if kind == self.COLUMN or (kind == self.ATTRIBUTE and key in queryset.query.annotations):
+                columns.append(key)
+            else:
+                return None
+        return columns
+
+
+# compiled representations by (serializer class, field names), shared by every request of the process.
+compiled_representations = TTLCache(max_size=1024, ttl=24 * 3600)
+
+
+class CompiledSerializerMixin(object):
+    """
+    Mixin class for read-only serializers mapping rows through a representation compiled once per field set.
+
+    The output is the same as the one of Serializer.to_representation. Nested
+    serializers are built once per serializer with get_nested_serializer instead
+    of once per row.
+    """
+
+    def get_compiled_representation(self):
+        """
+        Method to get the compiled representation of the fields of the serializer.
+        """
+        key = (type(self), tuple(self.fields))
+        compiled = compiled_representations.get(key)
+        if compiled is None:
+            compiled = CompiledRepresentation(self)
+            compiled_representations.set(key, compiled)
+        return compiled
+
+    @cached_property
+    def compiled_readers(self):
+        """
+        Method to get the readers of the fields, bound to this serializer.
+        """
+        return self.get_compiled_representation().get_readers(self)
+
+    def get_nested_serializer(self, field_name, serializer_class, **kwargs):
+        """
+        Method to get the serializer of a nested field, built on first use and reused for every row.
+        """
+        nested_serializers = self.__dict__.setdefault("nested_serializers", {})
+        if field_name not in nested_serializers:
+            nested_serializers[field_name] = serializer_class(**kwargs)
+        return nested_serializers[field_name]
+
+    def to_representation(self, instance):
+        """
+        Method to map an instance to the output of the serializer.
+        """
+        ret = {}
+        for field_name, kind, function, key in self.compiled_readers:
+            if kind == CompiledRepresentation.METHOD:
+                ret[field_name] = function(instance)
+                continue
+            if kind == CompiledRepresentation.COLUMN:
+                value = getattr(instance, key)
+                ret[field_name] = None if value is None else function(value)
+                continue
+
+            try:
+                attribute = key.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[field_name] = None if check_for_none is None else function(attribute)
+        return ret
+
+    def get_value_rows(self, queryset):
+        """
+        Method to get the output of the rows of a queryset read as values, None when a field needs the instance.
+        """
+        columns = self.get_compiled_representation().get_value_columns(queryset)
+        if columns is None:
+            return None
+
+        readers = [(field_name, function) for field_name, kind, function, key in self.compiled_readers]
+        return [
+            {
+                field_name: None if value is None else function(value)
+                for (field_name, function), value in zip(readers, row)
+            }
+            for row in queryset.prefetch_related(None).values_list(*columns)
+        ]
+
+
+class PreSignedUrlListSerializer(serializers.ListSerializer):
+    """
+    List serializer class for letting the child sign the media keys of the whole page at once.
+    """
+
+    def to_representation(self, data):
+        """
+        Method to hand the media keys of all rows to the child before serializing them.
+        """
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        rows = list(iterable)
+        self.child.page_media_keys = [self.child.get_media_key(row) for row in rows]
+        self.child.page_signed_urls = None
+        return super().to_representation(rows)
+
+
+class PreSignedUrlSerializerMixin(object):
+    """
+    Mixin class for signing media keys once per page instead of once per row.
+
+    The first url asked for signs every media key of the page in one batch, so a
+    page whose urls are never shown signs nothing.
+    """
+    page_media_keys = ()
+    page_signed_urls = None
+
+    def get_media_key(self, obj):
+        """
+        Method to get the media key of a row.
+        """
+        raise NotImplementedError
+
+    def get_pre_signed_url(self, media_key):
+        """
+        Method to get the pre-signed url of a media key of the page.
+        """
+        if self.page_signed_urls is None and self.page_media_keys:
+            self.page_signed_urls = generate_pre_signed_urls(self.page_media_keys)
+        if self.page_signed_urls and media_key in self.page_signed_urls:
+            return self.page_signed_urls[media_key]
+        return generate_pre_signed_url(media_key)
+
+
+class FieldQueryPlan(object):
+    """
+    Class for describing what a serializer field needs from the queryset.
+    """
+
+    def __init__(self, columns=(), annotations=(), select_related=(), prefetch_related=()):
+        """
+        Constructor function for setting the columns, annotations and relations of a field.
+        """
+        self.columns = tuple(columns)
+        self.annotations = tuple(annotations)
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+
+
 class DynamicFieldsViewMixin(object):
+    # Serializer field name, or nested "parent__child" name, to the FieldQueryPlan it needs.
+    field_query_plans = {}
+
     def get_serializer(self, *args, **kwargs):
         serializer_class = self.get_serializer_class()
 
-        fields = None
+        kwargs["context"] = self.get_serializer_context()
+        kwargs["fields"] = self.get_requested_fields()
+
+        return serializer_class(*args, **kwargs)
+
+    def get_requested_fields(self):
+        """
+        Method to get the requested fields, None when every field is requested.
+        """
         if self.request.method == "GET":
             query_fields = self.request.query_params.get("fields", None)
 
             if query_fields:
-                fields = tuple(query_fields.split(","))
+                return tuple(query_fields.split(","))
+        return None
 
-        kwargs["context"] = self.get_serializer_context()
-        kwargs["fields"] = fields
+    def is_field_requested(self, field_name):
+        """
+        Method to check if a field, or a nested field given as parent__child, is rendered.
+        """
+        fields = self.get_requested_fields()
+        parent, _separator, child = field_name.partition("__")
+        if fields is not None and parent not in fields:
+            return False
+        if child:
+            nested_fields = self.get_nested_fields().get(parent, None)
+            return nested_fields is None or child in nested_fields
+        return True
 
-        return serializer_class(*args, **kwargs)
+    def get_query_annotations(self):
+        """
+        Method to get the annotations the queryset can be planned with.
+        """
+        return {}
 
-    def get_serializer_context(self):
+    def get_filter_terms(self):
         """
-        Method to get the context for serializer.
+        Method to get the query parameter names and ordering terms of the request.
+        """
+        query_params = self.request.query_params
+        terms = set(query_params.keys())
+        for term in query_params.get(api_settings.ORDERING_PARAM, "").split(","):
+            terms.add(term.strip().lstrip("-"))
+        return terms
+
+    def get_query_columns(self, model):
+        """
+        Method to get the model columns used by the requested fields, None when every column is needed.
+        """
+        fields = self.get_requested_fields()
+        if fields is None:
+            return None
+
+        serializer_fields = self.get_serializer_class().Meta.fields
+        columns = set()
+        for field_name in fields:
+            if field_name not in serializer_fields:
+                continue
+            if field_name in self.field_query_plans:
+                columns.update(self.field_query_plans[field_name].columns)
+                continue
+            try:
+                model_field = model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+            columns.add(field_name)
+        return columns
+
+    def plan_queryset(self, queryset):
+        """
+        Method to add only the annotations, joins, prefetches and columns the request uses.
+        """
+        annotations = self.get_query_annotations()
+        required_annotations = self.get_filter_terms()
+        select_related = []
+        prefetch_related = {}
+        for field_name, plan in self.field_query_plans.items():
+            if self.is_field_requested(field_name):
+                required_annotations.update(plan.annotations)
+                select_related.extend(plan.select_related)
+                for lookup in plan.prefetch_related:
+                    prefetch_related[getattr(lookup, "prefetch_to", lookup)] = lookup
+
+        columns = self.get_query_columns(queryset.model)
+        if columns is not None:
+            columns.update(relation.split("__")[0] for relation in select_related)
+            # keep the columns the rows are ordered by, the cursor of keyset pagination reads them.
+            for term in required_annotations:
+                try:
+                    if queryset.model._meta.get_field(term).concrete:
+                        columns.add(term)
+                except FieldDoesNotExist:
+                    continue
+            queryset = queryset.only(*columns)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related.values())
+
+        annotations = {name: expression for name, expression in annotations.items() if name in required_annotations}
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+    def get_nested_fields(self):
+        """
+        Method to get the requested nested fields grouped by their parent field.
         """
         fields = self.request.GET.get("fields")
         if fields:
@@ -66,3 +406,90 @@ class DynamicFieldsViewMixin(object):
                         context_dict[field_list[0]] = [field_list[1]]
             return context_dict
         return {}
+
+    def get_serializer_context(self):
+        """
+        Method to get the context for serializer.
+        """
+        return self.get_nested_fields()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Method to list the rows, read as values when every requested field is a column or an annotation.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        data = None
+        if isinstance(serializer.child, CompiledSerializerMixin):
+            data = serializer.child.get_value_rows(queryset)
+        return Response(serializer.data if data is None else data)
+
+
+class StreamingListMixin(object):
+    """
+    Mixin class for streaming an unpaginated list in the ResponseInfo envelope when stream=true is asked for.
+
+    The queryset is read in chunks of stream_chunk_size rows and each chunk is
+    serialized as a list, so batch loading still works per chunk and memory stays
+    flat however many rows are listed.
+    """
+    stream_chunk_size = 500
+
+    def is_streaming_requested(self):
+        """
+        Method to check if the request asks for a streamed, unpaginated list.
+        """
+        if self.request.GET.get("pagination", "False") in ("True", "true", "cursor"):
+            return False
+        return self.request.GET.get("stream", "False") in ("True", "true")
+
+    def iterate_chunks(self, queryset):
+        """
+        Method to read the queryset in lists of at most stream_chunk_size rows.
+        """
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        chunk = list(islice(rows, self.stream_chunk_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(rows, self.stream_chunk_size))
+
+    def render_json(self, value):
+        """
+        Method to render a value like the JSON renderer of the API, which renders None as an empty body.
+        """
+        return b"null" if value is None else JSONRenderer().render(value)
+
+    def stream_envelope(self, queryset, response_format):
+        """
+        Method to render the envelope piece by piece with the serialized rows in place of its data.
+        """
+        yield b"{"
+        for position, (key, value) in enumerate(response_format.items()):
+            if position:
+                yield b","
+            yield self.render_json(key) + b":"
+            if key != "data":
+                yield self.render_json(value)
+                continue
+
+            yield b"["
+            first = True
+            for chunk in self.iterate_chunks(queryset):
+                for item in self.get_serializer(chunk, many=True).data:
+                    yield self.render_json(item) if first else b"," + self.render_json(item)
+                    first = False
+            yield b"]"
+        yield b"}"
+
+    def get_streaming_response(self, queryset, response_format):
+        """
+        Method to get a streaming JSON response of the rows of a queryset inside the response envelope.
+        """
+        return StreamingHttpResponse(
+            self.stream_envelope(queryset, response_format), content_type="application/json",
+            status=response_format.get("status_code", 200),
+        )
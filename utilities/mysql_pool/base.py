@@ -0,0 +1,18 @@
+"""
+File for the MySQL database backend taking its connections from a per process pool.
+"""
+from django.db.backends.mysql import base
+
+from utilities.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    Class for the MySQL database wrapper with pooled connections.
+    """
+
+    def check_pooled_connection(self, connection):
+        """
+        Method to check an idle connection is still usable, raising when the server does not answer.
+        """
+        connection.ping()
@@ -1,9 +1,11 @@
 from rest_framework import status
 from rest_framework.exceptions import APIException
 from rest_framework.permissions import BasePermission
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 
 from . import messages
-from users.models import BlackListedToken
+from users.roles import has_role
+from users.tokens import token_revocation_store
 
 
 class IsTokenValid(BasePermission):
@@ -17,20 +19,9 @@ class IsTokenValid(BasePermission):
         Function for checking if the caller of this function has
          permission to access particular API.
         """
-        is_allowed_user = True
-        auth_header = request.META.get('HTTP_AUTHORIZATION')
-        if auth_header:
-            key, token = auth_header.split(' ')
-            if key == 'Bearer':
-                try:
-                    is_blacklisted = BlackListedToken.objects.get(token=token)
-                    if is_blacklisted:
-                        is_allowed_user = False
-                except BlackListedToken.DoesNotExist:
-                    is_allowed_user = True
-        else:
-            is_allowed_user = False
-        return is_allowed_user
+        if request.auth is None:
+            return False
+        return not token_revocation_store.is_revoked(request.auth.get(jwt_settings.JTI_CLAIM))
 
 
 class IsActiveUserPermission(BasePermission):
@@ -71,7 +62,7 @@ class IsSuperAdminPermission(BasePermission):
         """
         Function for checking if users is active.
         """
-        return "SUPER_ADMIN" in request.user.role_permission.role_type
+        return has_role(request.user, "SUPER_ADMIN")
 
 
 class IsSellerPermission(BasePermission):
@@ -85,7 +76,7 @@ class IsSellerPermission(BasePermission):
         """
         Function for checking if users is active.
         """
-        return "SELLER" in request.user.role_permission.role_type
+        return has_role(request.user, "SELLER")
 
 
 class IsObjectOwnerPermission(BasePermission):
@@ -0,0 +1,406 @@
+"""
+File for pooling database connections per process, with health checks, idle recycling and usage counters.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """
+    Class for the error raised when no connection was released before the checkout timeout.
+    """
+
+
+class PoolEntry(object):
+    """
+    Class for a connection of a pool with its creation and last use times.
+    """
+    __slots__ = ("connection", "created_at", "last_used")
+
+    def __init__(self, connection, now):
+        """
+        Constructor function for a connection opened now.
+        """
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool(object):
+    """
+    Class for a thread safe pool of at least min_size and at most max_size connections of one process.
+
+    A connection idle for check_interval seconds is checked before it is handed
+    out, one idle for max_idle seconds is closed while the pool is above
+    min_size and one older than max_lifetime seconds is closed when released.
+    A forked child drops the connections it inherited without closing them, as
+    they share their sockets with the parent, and starts an empty pool.
+    """
+
+    def __init__(self, connect, check=None, close=None, min_size=0, max_size=10, timeout=30, max_idle=300,
+                 max_lifetime=3600, check_interval=10):
+        """
+        Constructor function for setting how connections are opened, checked and closed, and the limits of the pool.
+        """
+        self.connect = connect
+        self.check = check
+        self.close = close
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.retired = False
+        self.inherited = []
+        self.pid = None
+        self.ensure_process()
+
+    def ensure_process(self):
+        """
+        Method to start an empty pool in a process forked from the one which filled it.
+        """
+        if self.pid == os.getpid():
+            return
+        if self.pid is not None:
+            # closing would end the sessions of the parent, keep them referenced instead.
+            self.inherited.extend(entry.connection for entry in self.idle)
+            self.inherited.extend(entry.connection for entry in self.in_use.values())
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.in_use = {}
+        self.size = 0
+        self.filled = False
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.closed = 0
+        self.failed_checks = 0
+        self.peak_in_use = 0
+
+    def is_expired(self, entry, now):
+        """
+        Method to check if a connection is older than max_lifetime.
+        """
+        return bool(self.max_lifetime) and now - entry.created_at >= self.max_lifetime
+
+    def is_healthy(self, entry, now):
+        """
+        Method to check an idle connection before it is handed out, skipping the ones used in the last check_interval seconds.
+        """
+        if self.is_expired(entry, now):
+            return False
+        if self.check is None or now - entry.last_used < self.check_interval:
+            return True
+        try:
+            self.check(entry.connection)
+        except Exception:
+            with self.condition:
+                self.failed_checks += 1
+            return False
+        return True
+
+    def open_entry(self):
+        """
+        Method to open a connection for a slot already counted in the size of the pool.
+        """
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created += 1
+        return PoolEntry(connection, time.monotonic())
+
+    def close_entries(self, entries):
+        """
+        Method to close connections which were already removed from the size of the pool.
+        """
+        with self.condition:
+            self.closed += len(entries)
+        for entry in entries:
+            if self.close is not None:
+                try:
+                    self.close(entry.connection)
+                except Exception:
+                    logger.debug("Closing a pooled connection failed.", exc_info=True)
+
+    def take_idle_expired(self, now):
+        """
+        Method to remove the connections idle for max_idle seconds beyond min_size, with the condition held.
+        """
+        expired = []
+        while self.idle and self.size > self.min_size and self.max_idle and now - self.idle[0].last_used >= self.max_idle:
+            expired.append(self.idle.popleft())
+            self.size -= 1
+        return expired
+
+    def fill(self):
+        """
+        Method to open connections up to min_size the first time the process uses the pool.
+        """
+        with self.condition:
+            if self.filled:
+                return
+            self.filled = True
+            missing = max(self.min_size - self.size, 0)
+        for _number in range(missing):
+            with self.condition:
+                self.size += 1
+            entry = self.open_entry()
+            with self.condition:
+                self.idle.append(entry)
+                self.condition.notify()
+
+    def checkout(self):
+        """
+        Method to take an idle connection or a free slot, waiting up to timeout seconds for one.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = timed_out = False
+        with self.condition:
+            self.checkouts += 1
+            expired = self.take_idle_expired(started)
+            while not self.idle and self.size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    timed_out = True
+                    break
+                waited = True
+                self.condition.wait(remaining)
+
+            if waited:
+                wait_time = time.monotonic() - started
+                self.waits += 1
+                self.wait_time_total += wait_time
+                self.wait_time_max = max(self.wait_time_max, wait_time)
+            if timed_out:
+                entry = None
+            elif self.idle:
+                entry = self.idle.pop()
+            else:
+                entry = None
+                self.size += 1
+        self.close_entries(expired)
+        if timed_out:
+            logger.warning("No pooled connection was released in %s seconds, %s in use.", self.timeout, len(self.in_use))
+            raise PoolTimeout("No database connection was released in {} seconds.".format(self.timeout))
+        return entry
+
+    def acquire(self):
+        """
+        Method to get a healthy connection and whether it was just opened.
+        """
+        self.ensure_process()
+        if not self.filled:
+            self.fill()
+        while True:
+            entry = self.checkout()
+            is_new = entry is None
+            if is_new:
+                entry = self.open_entry()
+            elif not self.is_healthy(entry, time.monotonic()):
+                with self.condition:
+                    self.size -= 1
+                    self.condition.notify()
+                self.close_entries([entry])
+                continue
+
+            with self.condition:
+                self.in_use[id(entry.connection)] = entry
+                self.peak_in_use = max(self.peak_in_use, len(self.in_use))
+            return entry.connection, is_new
+
+    def release(self, connection, discard=False):
+        """
+        Method to give a connection back, closing it when discarded or older than max_lifetime.
+        """
+        self.ensure_process()
+        now = time.monotonic()
+        with self.condition:
+            entry = self.in_use.pop(id(connection), None)
+            if entry is None:
+                # a connection inherited from the parent process, closing it would end the session of the parent.
+                self.inherited.append(connection)
+                return
+            if discard or self.retired or self.is_expired(entry, now):
+                self.size -= 1
+            else:
+                entry.last_used = now
+                self.idle.append(entry)
+                entry = None
+            self.condition.notify()
+        if entry is not None:
+            self.close_entries([entry])
+
+    def retire(self):
+        """
+        Method to close the idle connections of a pool replaced by another, the ones in use are closed when released.
+        """
+        self.ensure_process()
+        with self.condition:
+            self.retired = True
+            entries = list(self.idle)
+            self.idle.clear()
+            self.size -= len(entries)
+        self.close_entries(entries)
+
+    def get_stats(self):
+        """
+        Method to get the size, utilisation and wait counters of the pool.
+        """
+        with self.condition:
+            in_use = len(self.in_use)
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilisation": in_use / self.max_size,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_time_total": self.wait_time_total,
+                "wait_time_max": self.wait_time_max,
+                "wait_time_average": self.wait_time_total / self.waits if self.waits else 0.0,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "closed": self.closed,
+                "failed_checks": self.failed_checks,
+            }
+
+
+# pools of the process by database alias, with the key of the connection parameters they were built for.
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_params_key(conn_params):
+    """
+    Function to get a key telling apart the connection parameters of a database alias.
+    """
+    return repr(sorted(conn_params.items(), key=lambda item: item[0]))
+
+
+def get_pool(alias, conn_params, build):
+    """
+    Function to get the pool of a database alias for its connection parameters, built with build on first use.
+
+    A pool built for other parameters, like the database name before a test
+    database replaced it, is retired and replaced by a new one.
+    """
+    params_key = get_params_key(conn_params)
+    key, pool = pools.get(alias, (None, None))
+    if key == params_key:
+        return pool
+    with pools_lock:
+        key, pool = pools.get(alias, (None, None))
+        if key == params_key:
+            return pool
+        retired, pool = pool, build()
+        pools[alias] = (params_key, pool)
+    if retired is not None:
+        retired.retire()
+    return pool
+
+
+def get_pool_stats():
+    """
+    Function to get the counters of every pool of the process by database alias.
+    """
+    return {alias: pool.get_stats() for alias, (_key, pool) in pools.items()}
+
+
+class PooledDatabaseWrapperMixin(object):
+    """
+    Mixin class for database wrappers taking their connections from the pool of their alias instead of opening one per request.
+
+    The pool is configured with the POOL dict of the database settings, with the
+    keys MIN_SIZE, MAX_SIZE, TIMEOUT, MAX_IDLE, MAX_LIFETIME and CHECK_INTERVAL.
+    """
+    pooled_connection_is_new = True
+
+    def check_pooled_connection(self, connection):
+        """
+        Method to check an idle connection is still usable, raising when it is not.
+        """
+        raise NotImplementedError
+
+    def close_pooled_connection(self, connection):
+        """
+        Method to close a connection removed from the pool.
+        """
+        connection.close()
+
+    def build_pool(self, conn_params):
+        """
+        Method to build the pool of the alias from the POOL settings.
+        """
+        options = self.settings_dict.get("POOL", {})
+        open_connection = super(PooledDatabaseWrapperMixin, self).get_new_connection
+        return ConnectionPool(
+            connect=lambda: open_connection(conn_params),
+            check=self.check_pooled_connection,
+            close=self.close_pooled_connection,
+            min_size=options.get("MIN_SIZE", 0),
+            max_size=options.get("MAX_SIZE", 10),
+            timeout=options.get("TIMEOUT", 30),
+            max_idle=options.get("MAX_IDLE", 300),
+            max_lifetime=options.get("MAX_LIFETIME", 3600),
+            check_interval=options.get("CHECK_INTERVAL", 10),
+        )
+
+    def get_new_connection(self, conn_params):
+        """
+        Method to take a connection from the pool of the alias and its connection parameters.
+        """
+        pool = get_pool(self.alias, conn_params, lambda: self.build_pool(conn_params))
+        try:
+            connection, self.pooled_connection_is_new = pool.acquire()
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error))
+        self.connection_pool = pool
+        return connection
+
+    def init_connection_state(self):
+        """
+        Method to set up the session of a connection, once as pooled connections keep their session.
+        """
+        if self.pooled_connection_is_new:
+            super().init_connection_state()
+
+    def _close(self):
+        """
+        Method to give the connection back to the pool it came from, rolled back and in autocommit mode.
+
+        A connection closed inside an atomic block is still used by it, and one
+        which raised a database error may be broken, so neither is handed out again.
+        Other connections are checked when they are next checked out.
+        """
+        if self.connection is None:
+            return
+        discard = self.in_atomic_block or self.errors_occurred
+        if not discard and not self.autocommit:
+            try:
+                self.connection.rollback()
+                self._set_autocommit(True)
+            except (self.Database.Error, DatabaseError):
+                discard = True
+        self.connection_pool.release(self.connection, discard=discard)
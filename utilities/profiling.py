@@ -0,0 +1,204 @@
+"""
+File for profiling single requests of staff users and summarising where their time went.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+
+from utilities.queries import QueryRecord, normalize_sql
+
+
+# functions whose outermost call times a phase of a request, by phase name.
+PROFILE_PHASES = {
+    "filtering": (("rest_framework/generics.py", "filter_queryset"),),
+    "pagination": (("rest_framework/generics.py", "paginate_queryset"),),
+    "serialization": (
+        ("rest_framework/serializers.py", "data"),
+        ("rest_framework/serializers.py", "to_representation"),
+        ("utilities/mixins.py", "get_value_rows"),
+    ),
+    "s3_signing": (
+        ("utilities/aws.py", "sign_media_key"),
+        ("utilities/aws.py", "generate_pre_signed_url"),
+        ("utilities/aws.py", "generate_pre_signed_urls"),
+    ),
+    "rendering": (("rest_framework/renderers.py", "render"),),
+}
+
+# profiled requests of the process, one at a time as only one profiler can be active.
+profiler_lock = threading.Lock()
+
+
+def get_profile_dir():
+    """
+    Function to get the directory profiles are written to.
+    """
+    return getattr(settings, "REQUEST_PROFILER_DIR", os.path.join(settings.LOGGING_DIR, "profile_logs"))
+
+
+class ProfiledQueryRecord(QueryRecord):
+    """
+    Class for a query record which also keeps the time of every statement, for profiled requests only.
+    """
+
+    def __init__(self):
+        """
+        Constructor function for an empty record.
+        """
+        super().__init__()
+        self.statement_times = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Method to time a query and add its time to its statement.
+        """
+        started = time.perf_counter()
+        try:
+            return super().__call__(execute, sql, params, many, context)
+        finally:
+            self.statement_times[normalize_sql(sql)] += time.perf_counter() - started
+
+    def get_slowest(self, limit):
+        """
+        Method to get the statements which took the most time in total, with their count and time.
+        """
+        slowest = sorted(self.statement_times.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            {"sql": sql, "count": self.statements[sql], "time_ms": statement_time * 1000}
+            for sql, statement_time in slowest
+        ]
+
+
+class RequestProfile(object):
+    """
+    Class for running one request under cProfile and summarising its top functions, queries and phases.
+
+    Phase times are the cumulative time of the outermost function of each phase,
+    so a phase run several times side by side is counted by its longest run.
+    """
+
+    def __init__(self, limit=25):
+        """
+        Constructor function for setting how many functions and statements the summary lists.
+        """
+        self.limit = limit
+        self.profiler = cProfile.Profile()
+        self.record = ProfiledQueryRecord()
+        self.elapsed = 0.0
+
+    def enable(self):
+        """
+        Method to start or resume profiling the current thread.
+        """
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def disable(self):
+        """
+        Method to pause profiling and add the time since it was enabled.
+        """
+        self.profiler.disable()
+        self.elapsed += time.perf_counter() - self.started
+
+    def get_stats(self):
+        """
+        Method to get the statistics of the profiled calls.
+        """
+        return pstats.Stats(self.profiler, stream=io.StringIO())
+
+    def get_phases(self, stats):
+        """
+        Method to get the time of every phase in milliseconds.
+        """
+        phases = {}
+        for phase, functions in PROFILE_PHASES.items():
+            phase_time = 0.0
+            for (filename, _line, function_name), (_calls, _primitive, _total, cumulative, _callers) in stats.stats.items():
+                filename = filename.replace(os.sep, "/")
+                if any(filename.endswith(path) and function_name == name for path, name in functions):
+                    phase_time = max(phase_time, cumulative)
+            phases[phase] = phase_time * 1000
+        phases["sql"] = self.record.time * 1000
+        return phases
+
+    def get_functions(self, stats, key):
+        """
+        Method to get the functions taking the most time by a pstats sort key.
+        """
+        rows = sorted(
+            stats.stats.items(), key=lambda item: item[1][3] if key == "cumulative" else item[1][2], reverse=True
+        )
+        return [
+            {
+                "function": "{}:{}({})".format(filename, line, function_name),
+                "calls": calls,
+                "total_ms": total * 1000,
+                "cumulative_ms": cumulative * 1000,
+            }
+            for (filename, line, function_name), (calls, _primitive, total, cumulative, _callers) in rows[:self.limit]
+        ]
+
+    def get_serializer_methods(self, stats):
+        """
+        Method to get the get_ methods of the serializers of the project taking the most time.
+        """
+        methods = [
+            {
+                "function": "{}:{}({})".format(filename, line, function_name),
+                "calls": calls,
+                "cumulative_ms": cumulative * 1000,
+            }
+            for (filename, line, function_name), (calls, _primitive, _total, cumulative, _callers) in stats.stats.items()
+            if filename.endswith("serializers.py") and function_name.startswith("get_")
+            and filename.startswith(str(settings.BASE_DIR))
+        ]
+        return sorted(methods, key=lambda method: method["cumulative_ms"], reverse=True)[:self.limit]
+
+    def get_summary(self, request, response):
+        """
+        Method to get the summary of the profiled request.
+        """
+        stats = self.get_stats()
+        resolver_match = getattr(request, "resolver_match", None)
+        return {
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": resolver_match.view_name if resolver_match is not None else None,
+            "status": response.status_code,
+            "total_ms": self.elapsed * 1000,
+            "phases_ms": self.get_phases(stats),
+            "sql": {
+                "count": self.record.count,
+                "time_ms": self.record.time * 1000,
+                "slowest": self.record.get_slowest(self.limit),
+                "duplicated": self.record.get_duplicates(self.limit),
+            },
+            "serializer_methods": self.get_serializer_methods(stats),
+            "top_cumulative": self.get_functions(stats, "cumulative"),
+            "top_total": self.get_functions(stats, "total"),
+        }
+
+    def write(self, summary):
+        """
+        Method to write the summary and the raw cProfile statistics to the profile directory and get the summary path.
+        """
+        directory = get_profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        name = "{}-{}-{}-{}".format(
+            time.strftime("%Y%m%d-%H%M%S"), uuid.uuid4().hex[:8], summary["method"].lower(),
+            re.sub(r"[^A-Za-z0-9]+", "-", summary["path"].split("?")[0]).strip("-")[:100],
+        )
+        path = os.path.join(directory, name + ".json")
+        with open(path, "w") as summary_file:
+            json.dump(summary, summary_file, indent=2, default=str)
+        self.profiler.dump_stats(os.path.join(directory, name + ".prof"))
+        return path
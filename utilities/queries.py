@@ -0,0 +1,121 @@
+"""
+File for recording the queries of a request and checking them against the query budget of its endpoint.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+# literals are replaced so the same statement with other values counts as a duplicate.
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql):
+    """
+    Function to get the shape of a statement, without its literal values.
+    """
+    return SQL_LITERALS.sub("?", sql)
+
+
+class QueryRecord(object):
+    """
+    Class for the number, total time and statements of the queries of a request.
+    """
+
+    def __init__(self):
+        """
+        Constructor function for an empty record.
+        """
+        self.count = 0
+        self.time = 0.0
+        self.statements = Counter()
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Method to time a query, installed with execute_wrapper on every connection.
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.count += 1
+                self.time += elapsed
+                self.statements[normalize_sql(sql)] += 1
+
+    def get_duplicates(self, limit=5):
+        """
+        Method to get the statements run more than once with how many times they ran, most repeated first.
+        """
+        return [(sql, count) for sql, count in self.statements.most_common(limit) if count > 1]
+
+
+@contextmanager
+def record_queries(record=None):
+    """
+    Function to record the queries run on every database of the thread while the block runs, in a new record when not given.
+    """
+    record = QueryRecord() if record is None else record
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(record))
+        yield record
+
+
+def get_query_budget(url_name):
+    """
+    Function to get the most queries an endpoint may run, None when it has no budget.
+    """
+    return getattr(settings, "QUERY_BUDGETS", {}).get(url_name)
+
+
+class QueryStats(object):
+    """
+    Class for the query counters of every view class of the process.
+    """
+
+    def __init__(self):
+        """
+        Constructor function for empty counters.
+        """
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def add(self, view_name, record, over_budget):
+        """
+        Method to add the record of a request to the counters of its view.
+        """
+        with self.lock:
+            stats = self.views.setdefault(view_name, {
+                "requests": 0, "queries": 0, "max_queries": 0, "time": 0.0, "duplicates": 0, "over_budget": 0,
+            })
+            stats["requests"] += 1
+            stats["queries"] += record.count
+            stats["max_queries"] = max(stats["max_queries"], record.count)
+            stats["time"] += record.time
+            stats["duplicates"] += sum(count - 1 for _sql, count in record.get_duplicates(limit=None))
+            stats["over_budget"] += int(over_budget)
+
+    def get(self):
+        """
+        Method to get a copy of the counters by view class.
+        """
+        with self.lock:
+            return {view_name: dict(stats) for view_name, stats in self.views.items()}
+
+    def clear(self):
+        """
+        Method to reset the counters.
+        """
+        with self.lock:
+            self.views.clear()
+
+
+query_stats = QueryStats()
@@ -0,0 +1,168 @@
+"""
+File for routing the reads of the read-only views to healthy replicas, keeping clients that just wrote on the primary.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from utilities.cache import TTLCache, is_cache_shared
+
+
+# routing of the request being handled, None outside of ReadReplicaMiddleware.
+current_routing = ContextVar("current_routing", default=None)
+
+
+def get_replica_aliases():
+    """
+    Function to get the aliases of the configured replicas.
+    """
+    return [alias for alias in getattr(settings, "REPLICA_DATABASES", ()) if alias in settings.DATABASES]
+
+
+def get_sticky_seconds():
+    """
+    Function to get the seconds a client reads from the primary after it wrote.
+    """
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+
+
+def get_unhealthy_seconds():
+    """
+    Function to get the seconds a replica is skipped for after it failed.
+    """
+    return getattr(settings, "REPLICA_UNHEALTHY_SECONDS", 30)
+
+
+def get_client_key(request):
+    """
+    Function to get the key a client is kept on the primary by, from its token or else its address.
+    """
+    client = request.META.get("HTTP_AUTHORIZATION") or request.META.get("REMOTE_ADDR", "")
+    return "replica_sticky:{}".format(hashlib.md5(client.encode()).hexdigest())
+
+
+def stick_to_primary(client_key):
+    """
+    Function to read from the primary for the next requests of a client, so it reads its own writes.
+    """
+    cache.set(client_key, True, get_sticky_seconds())
+
+
+def is_stuck_to_primary(client_key):
+    """
+    Function to check if a client wrote recently and must read from the primary.
+    """
+    return bool(cache.get(client_key))
+
+
+def can_read_from_replica(client_key):
+    """
+    Function to check if a client may read from a replica, never when the cache is process-local as the other
+    processes would not know the client wrote or a replica failed.
+    """
+    return is_cache_shared() and not is_stuck_to_primary(client_key)
+
+
+def get_unhealthy_key(alias):
+    """
+    Function to get the cache key marking a replica as unhealthy.
+    """
+    return "replica_unhealthy:{}".format(alias)
+
+
+# replicas this process checked recently, alias to whether they answered.
+checked_replicas = TTLCache(max_size=64, ttl=5)
+
+
+def mark_replica_unhealthy(alias):
+    """
+    Function to skip a replica in every process until REPLICA_UNHEALTHY_SECONDS passed.
+    """
+    cache.set(get_unhealthy_key(alias), True, get_unhealthy_seconds())
+    checked_replicas.set(alias, False)
+
+
+def is_replica_healthy(alias):
+    """
+    Function to check if a replica is not marked unhealthy and answers a connection, checked at most every few seconds.
+    """
+    healthy = checked_replicas.get(alias)
+    if healthy is None:
+        healthy = not cache.get(get_unhealthy_key(alias))
+        if healthy:
+            try:
+                connections[alias].ensure_connection()
+            except DatabaseError:
+                healthy = False
+                mark_replica_unhealthy(alias)
+        checked_replicas.set(alias, healthy)
+    return healthy
+
+
+class Routing(object):
+    """
+    Class for the routing of one request.
+    """
+
+    def __init__(self, client_key):
+        """
+        Constructor function for a request which reads from the primary until it is allowed to use a replica.
+        """
+        self.client_key = client_key
+        self.use_replica = False
+        self.replica = None
+        self.wrote = False
+
+    def get_read_alias(self):
+        """
+        Method to get the replica the request reads from, chosen on the first read, or None for the primary.
+        """
+        if not self.use_replica or self.wrote:
+            return None
+        if self.replica is None:
+            replicas = [alias for alias in get_replica_aliases() if is_replica_healthy(alias)]
+            self.replica = random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+        return None if self.replica == DEFAULT_DB_ALIAS else self.replica
+
+
+class ReadReplicaRouter(object):
+    """
+    Class for sending the reads of the read-only views to a replica and every write to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        """
+        Method to get the database a model is read from.
+        """
+        routing = current_routing.get()
+        return routing.get_read_alias() if routing is not None else None
+
+    def db_for_write(self, model, **hints):
+        """
+        Method to get the database a model is written to, always the primary.
+        """
+        routing = current_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """
+        Method to allow relations between rows of the primary and its replicas.
+        """
+        databases = {DEFAULT_DB_ALIAS, *get_replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """
+        Method to only migrate the primary, replicas are copies of it.
+        """
+        if db in get_replica_aliases():
+            return False
+        return None
@@ -0,0 +1,147 @@
+"""
+File for the shared test cases of the project.
+"""
+import itertools
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from common.models import CourseCategory, SubCourseCategory
+from courses.models import Courses, CourseChapter, CourseLesson, CourseRatings, EnrolledCourses
+from users.models import CustomUser, RolesPermission, SellerProfile
+from utilities.queries import get_query_budget
+from utilities.utils import get_tokens_for_user
+
+
+@override_settings(
+    QUERY_INSTRUMENTATION_ENABLED=True,
+    COURSE_FRAGMENT_CACHE_TIMEOUT=0,
+    SELLER_STOREFRONT_CACHE_TIMEOUT=0,
+    ENTITLEMENT_CACHE_TIMEOUT=0,
+)
+class QueryBudgetTestCase(TestCase):
+    """
+    Class for tests checking an endpoint stays within its query budget and runs as many queries whatever the data size.
+
+    The response caches are turned off so every request runs the queries of its
+    serializers, and every URL is requested once before it is measured so the
+    in-process registries are already loaded.
+    """
+    # numbers of rows the catalog is grown to between two measurements.
+    sizes = (1, 4, 12)
+    # numbers giving every course a title of its own, as its slug is the title with a random suffix.
+    course_numbers = itertools.count(1)
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Method to create the roles, a seller with a profile, a buyer and a category shared by the tests.
+        """
+        cls.seller_role = RolesPermission.objects.create(role_name="Seller", role_type=["SELLER"])
+        cls.buyer_role = RolesPermission.objects.create(role_name="Buyer", role_type=["BUYER"])
+        cls.seller = cls.create_user("seller@example.com", cls.seller_role)
+        cls.buyer = cls.create_user("buyer@example.com", cls.buyer_role)
+        cls.seller_profile = cls.create_seller_profile(cls.seller, "seller")
+        cls.category = CourseCategory.objects.create(name="Category", created_by=cls.seller, updated_by=cls.seller)
+        cls.sub_category = SubCourseCategory.objects.create(
+            name="Sub category", category=cls.category, created_by=cls.seller, updated_by=cls.seller,
+        )
+
+    @classmethod
+    def create_user(cls, email, role):
+        """
+        Method to create an active user with the password "password".
+        """
+        return CustomUser.objects.create_user(
+            email=email, first_name="First", last_name="Last", password="password", role_permission=role,
+            date_joined=timezone.now(),
+        )
+
+    @classmethod
+    def create_seller_profile(cls, user, slug_name):
+        """
+        Method to create the profile of a seller with the given slug, skipping save which generates a new one.
+        """
+        return SellerProfile.objects.bulk_create([
+            SellerProfile(user=user, slug_name=slug_name, designation="Teacher", created_by=user, updated_by=user)
+        ])[0]
+
+    def add_courses(self, count, seller=None, chapter_count=2, lesson_count=2):
+        """
+        Method to add published courses with chapters, lessons, a rating and an enrollment of the buyer.
+        """
+        seller = seller or self.seller
+        for _number in range(count):
+            course = Courses.objects.create(
+                seller=seller, title="Course {}".format(next(self.course_numbers)), category=self.category, sub_category=self.sub_category,
+                course_status="PUBLISHED", sale_price=10, created_by=seller, updated_by=seller,
+            )
+            for chapter_number in range(chapter_count):
+                chapter = CourseChapter.objects.create(
+                    title="Chapter", course=course, order_no=chapter_number, created_by=seller, updated_by=seller,
+                )
+                for lesson_number in range(lesson_count):
+                    CourseLesson.objects.create(
+                        chapter=chapter, title="Lesson", video="videos/{}.mp4".format(lesson_number),
+                        order_no=lesson_number, duration=timedelta(minutes=10), created_by=seller, updated_by=seller,
+                    )
+            CourseRatings.objects.create(
+                course=course, user=self.buyer, rating=4, title="Rating", created_by=self.buyer, updated_by=self.buyer,
+            )
+            EnrolledCourses.objects.create(course=course, user=self.buyer, created_by=self.buyer, updated_by=self.buyer)
+
+    def grow_courses(self, size):
+        """
+        Method to grow the catalog of the seller to size courses.
+        """
+        self.add_courses(size - Courses.objects.filter(seller=self.seller).count())
+
+    def get_token(self, user):
+        """
+        Method to get an access token of a user.
+        """
+        return get_tokens_for_user(user)["access"]
+
+    def request(self, path, method="get", data=None, token=None):
+        """
+        Method to request a URL twice from an empty cache and get the response and query record of the second request.
+        """
+        headers = {"HTTP_AUTHORIZATION": "Bearer {}".format(token)} if token else {}
+        cache.clear()
+        for _number in range(2):
+            response = getattr(self.client, method)(path, data, content_type="application/json", **headers)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response, response.wsgi_request.query_record
+
+    def assertWithinBudget(self, response, record):
+        """
+        Method to check a response ran at most the queries of the budget of its endpoint.
+        """
+        url_name = response.wsgi_request.resolver_match.url_name
+        budget = get_query_budget(url_name)
+        self.assertIsNotNone(budget, "{} has no query budget.".format(url_name))
+        self.assertLessEqual(
+            record.count, budget,
+            "{} ran {} queries, over its budget of {}. Duplicated: {}".format(
+                url_name, record.count, budget, record.get_duplicates()
+            ),
+        )
+
+    def assertQueriesDoNotGrow(self, path, grow=None, **kwargs):
+        """
+        Method to check an endpoint runs as many queries, within its budget, for every size the data is grown to.
+        """
+        grow = grow or self.grow_courses
+        counts = {}
+        for size in self.sizes:
+            grow(size)
+            response, record = self.request(path, **kwargs)
+            self.assertEqual(response.status_code, 200, "{} failed with {} rows.".format(path, size))
+            self.assertWithinBudget(response, record)
+            counts[size] = record.count
+        self.assertEqual(
+            len(set(counts.values())), 1, "Queries of {} grew with the data: {}".format(path, counts)
+        )
@@ -1,8 +1,20 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import exception_handler
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from . import messages
+
 
 class ResponseInfo(object):
     """
@@ -78,3 +90,154 @@ class CustomPagination(pagination.PageNumberPagination):
                 'results': data
             }
         ])
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Class for paginating with an opaque cursor over (sort key, id).
+
+    Page cost does not depend on how deep the page is and the total count is
+    only computed when requested with `count=true`.
+    """
+    page_size = 15
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    default_ordering = "created_at"
+
+    def get_ordering(self, request, view):
+        """
+        Method to get the sort key and direction from the ordering query parameter.
+        """
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM, "").split(",")[0].strip()
+        field_name = ordering.lstrip("-")
+        if field_name and field_name in getattr(view, "ordering_fields", ()):
+            return field_name, ordering.startswith("-")
+        return getattr(view, "keyset_default_ordering", self.default_ordering), False
+
+    def encode_value(self, value):
+        """
+        Method to encode a sort key value with its type.
+        """
+        if isinstance(value, Decimal):
+            return ["decimal", str(value)]
+        if isinstance(value, timedelta):
+            return ["duration", value // timedelta(microseconds=1)]
+        if isinstance(value, datetime):
+            return ["datetime", value.isoformat()]
+        return ["value", value]
+
+    def decode_value(self, encoded):
+        """
+        Method to decode a sort key value encoded with encode_value.
+        """
+        value_type, value = encoded
+        if value is None:
+            return None
+        if value_type == "decimal":
+            return Decimal(value)
+        if value_type == "duration":
+            return timedelta(microseconds=value)
+        if value_type == "datetime":
+            return datetime.fromisoformat(value)
+        return value
+
+    def encode_cursor(self, row, reverse):
+        """
+        Method to build the opaque cursor pointing at a row.
+        """
+        position = {
+            "key": self.encode_value(getattr(row, self.ordering_field)),
+            "id": row.pk,
+            "reverse": reverse,
+        }
+        cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        """
+        Method to get the (key, id, reverse) position from the cursor query parameter, with the key checked against
+        the field the rows are ordered by.
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            value = self.decode_value(position["key"])
+            if value is not None:
+                value = model._meta.get_field(self.ordering_field).to_python(value)
+            return value, int(position["id"]), bool(position["reverse"])
+        except (TypeError, ValueError, KeyError, ArithmeticError, ValidationError):
+            raise NotFound(messages.INVALID_CURSOR)
+
+    def get_position_filter(self, value, row_id, descending):
+        """
+        Method to get the filter for rows after a position, nulls sorting first ascending and last descending.
+        """
+        key = self.ordering_field
+        if not descending:
+            if value is None:
+                return Q(**{key + "__isnull": False}) | Q(**{key + "__isnull": True, "pk__gt": row_id})
+            return Q(**{key + "__gt": value}) | Q(**{key: value, "pk__gt": row_id})
+        if value is None:
+            return Q(**{key + "__isnull": True, "pk__lt": row_id})
+        return Q(**{key + "__lt": value}) | Q(**{key: value, "pk__lt": row_id}) | Q(**{key + "__isnull": True})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Method to get the rows of the page the cursor points at.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.ordering_field, descending = self.get_ordering(request, view)
+        position = self.decode_cursor(request, queryset.model)
+        reverse = bool(position and position[2])
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ("True", "true"):
+            self.count = queryset.count()
+
+        query_descending = descending != reverse
+        if query_descending:
+            queryset = queryset.order_by(F(self.ordering_field).desc(nulls_last=True), "-pk")
+        else:
+            queryset = queryset.order_by(F(self.ordering_field).asc(nulls_first=True), "pk")
+        if position:
+            queryset = queryset.filter(self.get_position_filter(position[0], position[1], query_descending))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_row = rows[-1] if rows and (has_more if not reverse else True) else None
+        self.previous_row = rows[0] if rows and (has_more if reverse else position is not None) else None
+        return rows
+
+    def get_next_link(self):
+        """
+        Method to get the link of the next page.
+        """
+        if self.next_row is None:
+            return None
+        return self.encode_cursor(self.next_row, reverse=False)
+
+    def get_previous_link(self):
+        """
+        Method to get the link of the previous page.
+        """
+        if self.previous_row is None:
+            return None
+        return self.encode_cursor(self.previous_row, reverse=True)
+
+    def get_paginated_response(self, data):
+        page = {
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+        }
+        if self.count is not None:
+            page['count'] = self.count
+        page['results'] = data
+        return Response([page])